@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Batch File
+Lotes de envio em JSON Lines (um contato por linha): a seleção grava e o
+envio lê sem passar por planilha; o XLSX fica só como cópia de auditoria
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+
+BATCH_SUFFIX = ".jsonl"
+
+# Colunas dos lotes gerados pelos scripts shell
+HEADERS = ("Nome", "Telefone", "Endereço", "Avaliação", "Website")
+GLOBAL_HEADERS = HEADERS + ("Campanha", "Mensagem", "Tipo", "MsgAnterior")
+REMARKETING_HEADERS = HEADERS + ("Msg_Anterior",)
+
+
+def is_batch_file(path: str) -> bool:
+    return path.endswith(BATCH_SUFFIX)
+
+
+def write_batch(path: str, rows: Iterable[tuple], headers: tuple = HEADERS) -> int:
+    """
+    Grava o lote de uma vez (arquivo temporário + os.replace): quem lê
+    nunca vê um lote pela metade.
+
+    A primeira linha é o cabeçalho ({"colunas": [...], "criado": ...});
+    as demais, uma lista JSON por contato.
+
+    Returns:
+        Quantidade de contatos gravados
+    """
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"colunas": list(headers), "criado": datetime.now().isoformat()},
+                           ensure_ascii=False) + "\n")
+        for row in rows:
+            f.write(json.dumps(list(row), ensure_ascii=False, default=str) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_batch(path: str) -> Iterator[tuple]:
+    """Contatos de um lote .jsonl, na ordem em que foram selecionados"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('['):
+                yield tuple(json.loads(line))
+
+
+def read_batch(path: str) -> list[tuple]:
+    return list(iter_batch(path))
+
+
+def count_batch(path: str) -> int:
+    """Contatos no lote (0 se não existir)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return sum(1 for line in f if line.startswith('['))
+    except FileNotFoundError:
+        return 0
+
+
+def iter_batch_rows(path: str) -> Iterator[tuple]:
+    """Linhas de um lote, seja .jsonl ou uma planilha XLSX (lotes antigos ou montados à mão)"""
+    if is_batch_file(path):
+        return iter_batch(path)
+    from contacts import iter_xlsx_rows
+    return iter_xlsx_rows(path)
+
+
+def export_xlsx(path: str, rows: Iterable[tuple], headers: tuple = HEADERS,
+                color: str = "4472C4", title: str = "Batch"):
+    """
+    Cópia do lote em XLSX para auditoria (modo write-only, sem montar
+    célula por célula).
+
+    Args:
+        path: Planilha de destino
+        rows: Contatos do lote
+        headers: Cabeçalho
+        color: Cor de fundo do cabeçalho
+        title: Nome da aba
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+
+    from contacts import COLUMN_WIDTHS
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    for column, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+
+    header = []
+    for value in headers:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+        header.append(cell)
+    ws.append(header)
+    for row in rows:
+        ws.append(tuple(row))
+
+    tmp_path = f"{path}.tmp"
+    wb.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _headers(path: str) -> Optional[tuple]:
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+    if first.startswith('{'):
+        return tuple(json.loads(first).get("colunas") or ()) or None
+    return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python3 batch_file.py count <lote.jsonl>
+    #      python3 batch_file.py xlsx <lote.jsonl> [saida.xlsx]
+    if len(sys.argv) == 3 and sys.argv[1] == "count":
+        print(count_batch(sys.argv[2]))
+    elif len(sys.argv) in (3, 4) and sys.argv[1] == "xlsx":
+        source = sys.argv[2]
+        target = sys.argv[3] if len(sys.argv) == 4 else source[:-len(BATCH_SUFFIX)] + ".xlsx"
+        rows = read_batch(source)
+        export_xlsx(target, rows, _headers(source) or HEADERS)
+        print(f"📄 {len(rows)} contato(s) exportados para {target}")
+    else:
+        print("Uso: python3 batch_file.py count <lote.jsonl> | xlsx <lote.jsonl> [saida.xlsx]")
+        sys.exit(1)
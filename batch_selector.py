@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Batch Selector
+Monta o lote diário intercalando as campanhas (heap), com pesos, rodízio
+justo e regras de prioridade, lendo cada campanha só até o lote encher
+"""
+
+import heapq
+import os
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Iterator, Optional
+
+from lead_filters import needs_professional_site
+from phone_numbers import phone_key
+
+
+# Contatos lidos à frente em cada campanha para aplicar a prioridade
+DEFAULT_WINDOW = 20
+
+
+def _rating(value) -> float:
+    try:
+        return float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Regras de prioridade sobre a linha (nome, telefone, endereco, avaliacao, website, ...):
+# chave de ordenação, menor = enviado antes
+PRIORITY_RULES: dict[str, Callable[[tuple], object]] = {
+    "sem_site": lambda row: not needs_professional_site(row[4]),
+    "avaliacao": lambda row: -_rating(row[3]),
+    "com_avaliacao": lambda row: row[3] in (None, '', 'N/A'),
+}
+
+
+def priority_from_spec(spec: Optional[str]) -> Optional[Callable[[tuple], tuple]]:
+    """
+    Combina regras pelo nome, em ordem de importância (ex: "sem_site,avaliacao").
+
+    Raises:
+        ValueError: regra desconhecida
+    """
+    names = [name.strip() for name in (spec or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in PRIORITY_RULES]
+    if unknown:
+        raise ValueError(f"Regras de prioridade desconhecidas: {', '.join(unknown)} "
+                         f"(disponíveis: {', '.join(PRIORITY_RULES)})")
+    if not names:
+        return None
+    rules = [PRIORITY_RULES[name] for name in names]
+    return lambda row: tuple(rule(row) for rule in rules)
+
+
+def campaign_weight(campaign_dir: str) -> float:
+    """Peso da campanha no rodízio (arquivo peso.txt na pasta; padrão 1)"""
+    try:
+        with open(os.path.join(campaign_dir, "peso.txt")) as f:
+            weight = float(f.read().strip().replace(',', '.'))
+    except (OSError, ValueError):
+        return 1.0
+    return weight if weight > 0 else 1.0
+
+
+def daily_offset(count: int, day: Optional[date] = None) -> int:
+    """Campanha que abre o rodízio hoje (muda a cada dia, para nenhuma ser sempre a primeira)"""
+    return (day or date.today()).toordinal() % count if count else 0
+
+
+@dataclass
+class Source:
+    """Campanha (ou qualquer fonte) de candidatos, aberta só quando chega a sua vez"""
+    name: str
+    open: Callable[[], Iterator[tuple]]
+    weight: float = 1.0
+    rows: Optional[Iterator[tuple]] = field(default=None, repr=False)
+    buffer: list = field(default_factory=list, repr=False)
+
+
+class BatchSelector:
+    """
+    Intercala várias fontes num lote, sem ler além do necessário.
+
+    Cada fonte entra num heap pelo seu "tempo virtual" (quantos contatos já
+    cedeu / peso): a de menor tempo cede o próximo contato, o que dá rodízio
+    justo entre campanhas e proporção pelos pesos. Empates seguem a ordem
+    rotacionada por `start`. Dentro de cada fonte, a prioridade escolhe o
+    melhor entre os próximos `window` contatos lidos; a fonte só é aberta
+    quando chega a sua vez e só é lida até o lote encher, então o custo
+    depende do tamanho do lote, não do total de contatos.
+    """
+
+    def __init__(self, sources: list[Source], priority: Optional[Callable[[tuple], object]] = None,
+                 window: int = DEFAULT_WINDOW, start: int = 0, seen: Optional[set] = None,
+                 phone: Callable[[tuple], str] = lambda row: row[-1]):
+        """
+        Args:
+            sources: Fontes na ordem de desempate
+            priority: Função linha -> chave (menor = antes); None mantém a ordem da fonte
+            window: Contatos lidos à frente em cada fonte para aplicar a prioridade
+            start: Índice da fonte que abre o rodízio (ex: daily_offset)
+            seen: Números já escolhidos (compartilhe entre seletores para não repetir)
+            phone: Função linha -> número (chave de deduplicação)
+        """
+        self.sources = sources
+        self.priority = priority
+        self.window = max(1, window) if priority else 1
+        self.seen = seen if seen is not None else set()
+        self.phone = phone
+        self._seq = 0
+        count = len(sources)
+        self._heap = [(0.0, (index - start) % count, index) for index in range(count)]
+        heapq.heapify(self._heap)
+
+    def _fill(self, source: Source):
+        """Completa a janela da fonte (pulando números já escolhidos)"""
+        if source.rows is None:
+            source.rows = iter(source.open())
+        while len(source.buffer) < self.window:
+            row = next(source.rows, None)
+            if row is None:
+                break
+            key = phone_key(self.phone(row))
+            if key in self.seen:
+                continue
+            self._seq += 1
+            heapq.heappush(source.buffer, (self.priority(row) if self.priority else 0, self._seq, key, row))
+
+    def take(self, limit: int) -> list[tuple[Source, tuple]]:
+        """Próximos `limit` contatos (ou menos, se as fontes acabarem); pode ser chamado de novo"""
+        batch = []
+        while len(batch) < limit and self._heap:
+            vtime, rank, index = heapq.heappop(self._heap)
+            source = self.sources[index]
+            picked = None
+            while picked is None:
+                self._fill(source)
+                if not source.buffer:
+                    break
+                _, _, key, row = heapq.heappop(source.buffer)
+                if key not in self.seen:  # outro seletor pode ter escolhido antes
+                    picked = row
+                    self.seen.add(key)
+            if picked is None:
+                continue  # fonte esgotada: sai do rodízio
+            batch.append((source, picked))
+            heapq.heappush(self._heap, (vtime + 1 / source.weight, rank, index))
+        return batch
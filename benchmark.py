@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Benchmark
+Mede leitura de planilhas, normalização, templates, seleção de lotes e
+envio ponta a ponta (contra a Evolution API falsa, com delays zerados),
+gravando os resultados em JSON para comparar entre versões
+"""
+
+import contextlib
+import dataclasses
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+CASES = ("xlsx_load", "normalize", "lead_filter", "suppression", "render", "store_sync", "select", "select_global", "e2e_send", "e2e_media", "e2e_faults")
+TEMPLATE = "Olá, {nome}! Vi que vocês ficam em {endereco} (nota {avaliacao}). Posso ajudar com {website}?"
+# Regressão: vazão abaixo de (1 - tolerância) x a da base
+DEFAULT_TOLERANCE = 0.2
+
+
+# Sites próprios e plataformas genéricas, inclusive as variantes .com.br
+WEBSITES = (
+    "https://empresa{i}.com.br",
+    "https://www.olx.com.br/perfil/empresa{i}",
+    "https://empresa{i}.com.br/contato",
+    "http://www.instagram.com.br/empresa{i}",
+    "https://www.ifood.com.br/delivery/empresa{i}",
+    "https://www.empresa{i}.net.br",
+    "https://www.google.com.br/maps/place/empresa{i}",
+    "https://www.mercadolivre.com.br/perfil/empresa{i}",
+    "https://instagram.com/empresa{i}",
+    "https://www.getninjas.com.br/empresa{i}",
+    "https://www.rappi.com.br/restaurantes/empresa{i}",
+)
+
+
+def _make_rows(total: int, seed: int = 42) -> list[tuple]:
+    """Linhas no formato do Google Scraper, com telefones em formatos variados e repetidos"""
+    rng = random.Random(seed)
+    formats = [
+        lambda d: f"({d[:2]}) 9{d[2:6]}-{d[6:10]}",
+        lambda d: f"+55 {d[:2]} 9{d[2:6]}-{d[6:10]}",
+        lambda d: f"55{d[:2]}9{d[2:10]}",
+        lambda d: f"0{d[:2]} 9{d[2:6]} {d[6:10]}",
+        lambda d: f"+351 9{d[:8]}",
+    ]
+    rows = []
+    for i in range(total):
+        digits = f"{rng.randrange(11, 10 ** 10):010d}".replace('0', '1', 2)
+        phone = formats[i % len(formats)](digits) if i % 20 else "N/A"
+        website = WEBSITES[i % len(WEBSITES)].format(i=i) if i % 3 else None
+        rows.append((f"Empresa {i}", phone, f"Rua {i % 500}, {i}", f"{rng.uniform(3, 5):.1f}", website))
+    return rows
+
+
+def _write_xlsx(path: str, rows: list[tuple]):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(("Nome", "Telefone", "Endereço", "Avaliação", "Website"))
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def _quiet():
+    """Descarta o print dos módulos medidos"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _timed(fn: Callable[[], int]) -> tuple[int, float]:
+    """Executa fn() e devolve (operações, segundos); o preparo fica fora da medição"""
+    start = time.perf_counter()
+    ops = fn()
+    return ops, time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def _patched(module, name: str, value):
+    """Troca um atributo do módulo durante o bloco"""
+    original = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+
+def _memory_verifier(cls):
+    """NumberVerifier com cache só em memória (não lê nem grava campanhas/verificados.log)"""
+    return lambda api, instance_name: cls(api, instance_name, cache_path=None)
+
+
+class Workspace:
+    """Pasta temporária com a planilha sintética de cada tamanho"""
+
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix="bench_whatsapp_")
+        self._rows: dict[int, list[tuple]] = {}
+
+    def rows(self, size: int) -> list[tuple]:
+        if size not in self._rows:
+            self._rows[size] = _make_rows(size)
+        return self._rows[size]
+
+    def xlsx(self, size: int) -> str:
+        path = os.path.join(self.root, f"contatos_{size}.xlsx")
+        if not os.path.exists(path):
+            _write_xlsx(path, self.rows(size))
+        return path
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# ==================== Casos ====================
+
+def bench_xlsx_load(ws: Workspace, size: int) -> tuple[int, float]:
+    """WhatsAppSender.load_contacts_from_xlsx (leitura + normalização por linha)"""
+    from number_verifier import NumberVerifier
+    from phone_numbers import normalize_phone
+    import whatsapp_sender
+
+    path = ws.xlsx(size)
+    with _patched(whatsapp_sender, "NumberVerifier", _memory_verifier(NumberVerifier)):
+        sender = whatsapp_sender.WhatsAppSender()
+    normalize_phone.cache_clear()
+    ops = _timed(lambda: len(sender.load_contacts_from_xlsx(path)))
+    sender.verifier.close()
+    return ops
+
+
+def bench_normalize(ws: Workspace, size: int) -> tuple[int, float]:
+    """normalize_many numa coluna de telefones"""
+    from phone_numbers import normalize_many
+
+    phones = [row[1] for row in ws.rows(size)]
+    return _timed(lambda: len(normalize_many(phones)))
+
+
+def bench_lead_filter(ws: Workspace, size: int) -> tuple[int, float]:
+    """LeadPipeline com todos os filtros (blocklist, enviados, site, avaliação)"""
+    from lead_filters import FilterConfig, LeadPipeline
+    from phone_numbers import normalize_many
+
+    rows = ws.rows(size)
+    keys = normalize_many([row[1] for row in rows], keys=True)
+    pipeline = LeadPipeline(FilterConfig(site="sem_site", min_rating=4.0),
+                            blocked=set(keys[::50]), sent=set(keys[1::7]))
+
+    def run() -> int:
+        for _ in pipeline.filter(rows):
+            pass
+        return len(rows)
+    return _timed(run)
+
+
+def bench_suppression(ws: Workspace, size: int) -> tuple[int, float]:
+    """SuppressionIndex (blocklist mapeada) consultado com a coluna inteira, metade bloqueada"""
+    from phone_numbers import normalize_many
+    from suppression_index import SuppressionIndex
+
+    keys = normalize_many([row[1] for row in ws.rows(size)], keys=True)
+    directory = os.path.join(ws.root, f"suppression_{size}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "blocklist.log"), 'w') as f:
+        f.writelines(f"{key}|bench|2024-01-01\n" for key in keys[::2])
+    SuppressionIndex(directory).close()  # compila fora da medição
+    with SuppressionIndex(directory) as index:
+        return _timed(lambda: len(index.blocked_many(keys)))
+
+
+def bench_render(ws: Workspace, size: int) -> tuple[int, float]:
+    """Template pré-compilado renderizado para cada contato"""
+    from contacts import Contact
+    from message_templates import compile_template
+
+    contacts = [Contact(*row) for row in ws.rows(size)]
+    render = compile_template(TEMPLATE).render_contact
+    return _timed(lambda: len([render(contact) for contact in contacts]))
+
+
+def _store_dir(ws: Workspace, size: int) -> str:
+    """Árvore campanhas/ com uma campanha e metade dos contatos já enviados"""
+    base = os.path.join(ws.root, f"store_{size}")
+    campaign = os.path.join(base, "campanhas", "bench", "cidade")
+    if not os.path.exists(campaign):
+        os.makedirs(campaign)
+        shutil.copy(ws.xlsx(size), os.path.join(campaign, "contatos.xlsx"))
+        with open(os.path.join(campaign, "enviados.log"), 'w') as f:
+            for i, row in enumerate(ws.rows(size)[::2]):
+                if row[1] != "N/A":
+                    f.write(f"{row[1]}|2024-01-{1 + i % 28:02d}T10:00:00|1|business_sender\n")
+    return base
+
+
+def bench_store_sync(ws: Workspace, size: int) -> tuple[int, float]:
+    """Importação completa das planilhas e logs no CampaignStore (índice frio)"""
+    from campaign_store import CampaignStore
+
+    base = _store_dir(ws, size)
+    db_path = os.path.join(base, "estado.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    with CampaignStore(db_path, os.path.join(base, "campanhas")) as store:
+        return _timed(lambda: store.sync() or size)
+
+
+def bench_select(ws: Workspace, size: int) -> tuple[int, float]:
+    """Seleção de lotes (pendentes + follow-up), 50 vezes, com o índice já quente"""
+    from campaign_store import CampaignStore
+
+    base = _store_dir(ws, size)
+    with CampaignStore(os.path.join(base, "estado.db"), os.path.join(base, "campanhas")) as store:
+        store.sync()
+
+        def select():
+            for _ in range(50):
+                store.pending(limit=20)
+                store.followup_due(limit=20)
+            return 50
+
+        return _timed(select)
+
+
+def bench_select_global(ws: Workspace, size: int) -> tuple[int, float]:
+    """Lote diário do cron (BatchSelector: follow-up + novos intercalados), 50 vezes"""
+    from batch_selector import BatchSelector, Source, priority_from_spec
+    from campaign_store import CampaignStore
+
+    base = _store_dir(ws, size)
+    with CampaignStore(os.path.join(base, "estado.db"), os.path.join(base, "campanhas")) as store:
+        store.sync()
+        campaigns = store.campaign_dirs()
+        priority = priority_from_spec("sem_site,avaliacao")
+
+        def select():
+            for _ in range(50):
+                seen = set()
+                followups = BatchSelector([Source(d, lambda d=d: store.iter_followup_due(d)) for d in campaigns],
+                                          priority, seen=seen)
+                novos = BatchSelector([Source(d, lambda d=d: store.iter_pending(d)) for d in campaigns],
+                                      priority, seen=seen)
+                followups.take(10)
+                novos.take(10)
+            return 50
+
+        return _timed(select)
+
+
+def _e2e(ws: Workspace, size: int, config, media: Optional[str] = None) -> tuple[int, float]:
+    from contacts import Contact
+    from fake_evolution import FakeEvolutionServer
+    from media_cache import MediaCache
+    from number_verifier import NumberVerifier
+    from resilience import DEFAULT_POLICIES
+    import whatsapp_sender
+
+    contacts = [Contact(*row) for row in ws.rows(size) if row[1] != "N/A"]
+    with FakeEvolutionServer(config) as fake:
+        with _patched(whatsapp_sender, "NumberVerifier", _memory_verifier(NumberVerifier)):
+            sender = whatsapp_sender.WhatsAppSender(api_url=fake.url)
+        sender.api.media = MediaCache(os.path.join(ws.root, "media"))
+        # Backoff zerado: só a latência do servidor falso conta
+        sender.api.policies = {prefix: dataclasses.replace(policy, base_delay=0, max_delay=0)
+                               for prefix, policy in DEFAULT_POLICIES.items()}
+        with _quiet():
+            ops = _timed(lambda: sender.send_messages(contacts, TEMPLATE, delay_seconds=0, verify_whatsapp=True,
+                                                      typing_delay=0, jitter=0, media=media)["total"])
+        sender.verifier.close()
+        sender.api.close()
+    return ops
+
+
+def bench_e2e_send(ws: Workspace, size: int) -> tuple[int, float]:
+    """send_messages completo (verificação + presença + envio) sem latência nem erros"""
+    from fake_evolution import FakeConfig
+
+    return _e2e(ws, size, FakeConfig(seed=1))
+
+
+def bench_e2e_media(ws: Workspace, size: int) -> tuple[int, float]:
+    """send_messages com uma imagem de 64 KB anexada (mesma mídia para todos)"""
+    from fake_evolution import FakeConfig
+
+    path = os.path.join(ws.root, "folheto.png")
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(random.Random(7).randbytes(64 * 1024))
+    return _e2e(ws, size, FakeConfig(seed=1), media=path)
+
+
+def bench_e2e_faults(ws: Workspace, size: int) -> tuple[int, float]:
+    """send_messages com 2 ms de latência, 1% de 500 e 1% de 429 (retries sem espera)"""
+    from fake_evolution import FakeConfig
+
+    return _e2e(ws, size, FakeConfig(latency=0.002, error_rate=0.01, throttle_rate=0.01, seed=1))
+
+
+BENCHMARKS: dict[str, Callable[[Workspace, int], tuple[int, float]]] = {
+    "xlsx_load": bench_xlsx_load,
+    "normalize": bench_normalize,
+    "lead_filter": bench_lead_filter,
+    "suppression": bench_suppression,
+    "render": bench_render,
+    "store_sync": bench_store_sync,
+    "select": bench_select,
+    "select_global": bench_select_global,
+    "e2e_send": bench_e2e_send,
+    "e2e_media": bench_e2e_media,
+    "e2e_faults": bench_e2e_faults,
+}
+
+
+# ==================== Execução ====================
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, cases=CASES) -> dict:
+    """
+    Executa os casos em cada tamanho.
+
+    Returns:
+        {"timestamp", "commit", "python", "platform", "results": [
+            {"case", "size", "ops", "seconds", "ops_per_s"}, ...]}
+    """
+    ws = Workspace()
+    results = []
+    try:
+        for size in sizes:
+            for case in cases:
+                ops, seconds = BENCHMARKS[case](ws, size)
+                entry = {"case": case, "size": size, "ops": ops, "seconds": round(seconds, 4),
+                         "ops_per_s": round(ops / seconds, 1) if seconds > 0 else None}
+                results.append(entry)
+                print(f"  {case:<13} {size:>8,}  {seconds:8.3f}s  {entry['ops_per_s'] or 0:>12,.0f} ops/s")
+    finally:
+        ws.cleanup()
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """
+    Compara a vazão com a de um relatório anterior.
+
+    Returns:
+        Casos que ficaram mais lentos que (1 - tolerância) x a base
+    """
+    base = {(r["case"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for entry in report["results"]:
+        old = base.get((entry["case"], entry["size"]))
+        if not old or not old.get("ops_per_s") or not entry.get("ops_per_s"):
+            continue
+        ratio = entry["ops_per_s"] / old["ops_per_s"]
+        marker = "❌" if ratio < 1 - tolerance else "✓"
+        print(f"  {marker} {entry['case']:<11} {entry['size']:>8,}  {ratio:6.2f}x da base")
+        if ratio < 1 - tolerance:
+            regressions.append(dict(entry, baseline_ops_per_s=old["ops_per_s"], ratio=round(ratio, 3)))
+    return regressions
+
+
+def main():
+    # Uso: python3 benchmark.py [--sizes=1000,10000] [--cases=normalize,render]
+    #                           [--output=resultado.json] [--compare=base.json] [--tolerance=0.2]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    unknown = set(options) - {"sizes", "cases", "output", "compare", "tolerance"}
+    if unknown or any(not arg.startswith('--') or '=' not in arg for arg in sys.argv[1:]):
+        print("Uso: python3 benchmark.py [--sizes=1000,10000,100000] [--cases=" + ','.join(CASES) + "]")
+        print("                          [--output=resultado.json] [--compare=base.json] [--tolerance=0.2]")
+        sys.exit(1)
+
+    sizes = [int(size) for size in options["sizes"].split(',')] if "sizes" in options else DEFAULT_SIZES
+    cases = options["cases"].split(',') if "cases" in options else CASES
+    invalid = [case for case in cases if case not in BENCHMARKS]
+    if invalid:
+        print(f"❌ Casos desconhecidos: {', '.join(invalid)} (disponíveis: {', '.join(CASES)})")
+        sys.exit(1)
+
+    print(f"⏱️  Benchmark: {', '.join(cases)} em {', '.join(f'{size:,}' for size in sizes)} contatos")
+    report = run(sizes, cases)
+
+    output = options.get("output") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "logs", f"benchmark_{datetime.now():%Y-%m-%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Resultados em {output}")
+
+    if "compare" in options:
+        with open(options["compare"]) as f:
+            baseline = json.load(f)
+        print(f"\n📊 Comparação com {options['compare']} ({baseline.get('commit') or '?'}):")
+        regressions = compare(report, baseline, float(options.get("tolerance", DEFAULT_TOLERANCE)))
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressão(ões) de desempenho")
+            sys.exit(1)
+        print("\n✓ Sem regressões")
+
+
+if __name__ == "__main__":
+    main()
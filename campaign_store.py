@@ -0,0 +1,874 @@
+#!/usr/bin/env python3
+"""
+Campaign Store
+Índice SQLite (modo WAL) do estado das campanhas: contatos, envios e blocklist
+"""
+
+import glob
+import hashlib
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from contact_snapshot import iter_rows, load_snapshot
+from contacts import append_xlsx_rows, is_valid_row, iter_xlsx_rows
+from phone_numbers import normalize_many, phone_key
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CAMPANHAS_DIR = os.path.join(BASE_DIR, "campanhas")
+DEFAULT_DB_PATH = os.path.join(DEFAULT_CAMPANHAS_DIR, "estado.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contacts (
+    campaign_id INTEGER NOT NULL,
+    numero TEXT NOT NULL,
+    row_idx INTEGER NOT NULL,
+    nome TEXT,
+    telefone TEXT,
+    endereco TEXT,
+    avaliacao TEXT,
+    website TEXT,
+    PRIMARY KEY (campaign_id, numero)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_contacts_order ON contacts (campaign_id, row_idx);
+CREATE INDEX IF NOT EXISTS idx_contacts_numero ON contacts (numero);
+CREATE TABLE IF NOT EXISTS sends (
+    campaign_id INTEGER NOT NULL,
+    numero TEXT NOT NULL,
+    telefone TEXT,
+    sent_at TEXT NOT NULL,
+    msg_num INTEGER NOT NULL,
+    instance TEXT,
+    UNIQUE (campaign_id, numero, sent_at, msg_num)
+);
+CREATE TABLE IF NOT EXISTS contact_state (
+    campaign_id INTEGER NOT NULL,
+    numero TEXT NOT NULL,
+    last_sent_at TEXT NOT NULL,
+    msg_num INTEGER NOT NULL,
+    instance TEXT,
+    due_at TEXT,
+    PRIMARY KEY (campaign_id, numero)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_state_numero ON contact_state (numero);
+CREATE TABLE IF NOT EXISTS suppression (
+    numero TEXT PRIMARY KEY,
+    telefone TEXT,
+    motivo TEXT,
+    created_at TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS replies (
+    numero TEXT PRIMARY KEY,
+    replied_at TEXT,
+    instance TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS discards (
+    campaign_id INTEGER NOT NULL,
+    numero TEXT NOT NULL,
+    status TEXT,
+    discarded_at TEXT NOT NULL,
+    instance TEXT,
+    PRIMARY KEY (campaign_id, numero)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_discards_numero ON discards (numero);
+CREATE TABLE IF NOT EXISTS campaign_stats (
+    campaign_id INTEGER PRIMARY KEY,
+    rows INTEGER,
+    valid INTEGER,
+    sent INTEGER,
+    pending INTEGER,
+    followup INTEGER,
+    blocked INTEGER,
+    replied INTEGER,
+    params TEXT,
+    due_until TEXT
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    offset INTEGER,
+    fingerprint TEXT
+);
+"""
+
+# Versão das chaves de telefone: quando a normalização muda, o índice é
+# reconstruído a partir dos arquivos na próxima sincronização
+KEY_VERSION = 1
+
+# Colunas devolvidas nas seleções: as 5 da planilha + campanha + nº da última mensagem
+CONTACT_COLUMNS = "c.nome, c.telefone, c.endereco, c.avaliacao, c.website, p.path"
+
+# Parâmetros por consulta IN (...) (limite do SQLite: 999 nas versões antigas)
+_IN_CHUNK = 500
+
+# Índices do próximo follow-up (criados depois da migração de bancos antigos)
+DUE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_state_next ON contact_state (due_at);
+CREATE INDEX IF NOT EXISTS idx_state_campaign_next ON contact_state (campaign_id, due_at);
+DROP INDEX IF EXISTS idx_state_due;
+DROP INDEX IF EXISTS idx_state_campaign_due;
+"""
+
+# Cadência de follow-up: horas de espera depois da 1ª, 2ª... mensagem; depois
+# da última etapa o contato sai da fila. Padrão: 2 follow-ups, 48h cada.
+DEFAULT_CADENCE = (48.0, 48.0)
+_UNITS = {"m": 1 / 60, "h": 1.0, "d": 24.0}
+
+
+def parse_cadence(text: str) -> tuple[float, ...]:
+    """
+    Lê uma cadência como "48h, 7d" (m = minutos, h = horas, d = dias;
+    sem unidade = horas).
+
+    Raises:
+        ValueError: etapa inválida ou cadência vazia
+    """
+    steps = []
+    for step in text.replace(';', ',').replace('\n', ',').split(','):
+        step = step.split('#', 1)[0].strip().lower()
+        if not step:
+            continue
+        unit = _UNITS.get(step[-1])
+        hours = float((step[:-1] if unit else step).strip().replace(',', '.')) * (unit or 1.0)
+        if hours <= 0:
+            raise ValueError(f"etapa '{step}' precisa ser maior que zero")
+        steps.append(hours)
+    if not steps:
+        raise ValueError("cadência vazia")
+    return tuple(steps)
+
+
+def load_cadence(campaign_dir: str) -> tuple[float, ...]:
+    """Cadência da campanha (arquivo cadencia.txt na pasta; padrão DEFAULT_CADENCE)"""
+    try:
+        with open(os.path.join(campaign_dir, "cadencia.txt"), 'r') as f:
+            return parse_cadence(f.read())
+    except FileNotFoundError:
+        return DEFAULT_CADENCE
+    except ValueError as e:
+        print(f"⚠️  {campaign_dir}/cadencia.txt: {e} (usando {format_cadence(DEFAULT_CADENCE)})")
+        return DEFAULT_CADENCE
+
+
+def format_cadence(cadence: tuple[float, ...]) -> str:
+    return ", ".join(f"{hours / 24:g}d" if hours >= 24 and hours % 24 == 0 else f"{hours:g}h"
+                     for hours in cadence)
+
+
+def due_at(sent_at: str, msg_num: int, cadence: tuple[float, ...]) -> Optional[str]:
+    """Quando o contato vence para a próxima mensagem (None: cadência encerrada)"""
+    if not sent_at or not 1 <= msg_num <= len(cadence):
+        return None
+    try:
+        return (datetime.fromisoformat(sent_at) + timedelta(hours=cadence[msg_num - 1])).isoformat()
+    except ValueError:
+        return None
+
+
+class CampaignStats(NamedTuple):
+    """Agregados de uma campanha"""
+    path: str
+    rows: int       # linhas da planilha (inclusive sem telefone)
+    valid: int      # contatos válidos (números distintos)
+    sent: int       # contatados por esta campanha
+    pending: int    # nunca contatados por nenhuma campanha, fora da blocklist
+    followup: int   # follow-ups vencidos agora (pela cadência da campanha)
+    blocked: int    # na blocklist
+    replied: int    # responderam (webhook)
+
+
+def normalize_phone(phone) -> str:
+    """Chave canônica do telefone (somente dígitos, com código do país)"""
+    return phone_key(phone)
+
+
+class CampaignStore:
+    """
+    Estado das campanhas num banco SQLite indexado.
+
+    Os arquivos de texto (enviados.log, descartados.log, blocklist.log, respostas.log) e as planilhas
+    continuam sendo a fonte: sync() importa só o que mudou desde a última
+    vez (logs a partir do último byte lido, planilhas quando mudam tamanho
+    ou data). A seleção de lotes vira uma consulta indexada, cujo custo não
+    cresce com o histórico das campanhas.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, campanhas_dir: str = DEFAULT_CAMPANHAS_DIR):
+        self.db_path = db_path
+        self.campanhas_dir = campanhas_dir
+        self.blocklist_path = os.path.join(campanhas_dir, "blocklist.log")
+        self.replies_path = os.path.join(campanhas_dir, "respostas.log")
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._cadences: dict[int, tuple[float, ...]] = {}
+        self._migrate()
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != KEY_VERSION:
+            with self.conn:
+                self.conn.execute("DELETE FROM sources")
+                self.conn.execute("DELETE FROM suppression")
+            self.conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+    def _migrate(self):
+        """Bancos anteriores à fila de follow-up: cria due_at e agenda o histórico uma vez"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(contact_state)")}
+        if "due_at" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE contact_state ADD COLUMN due_at TEXT")
+                for (campaign_id,) in self.conn.execute("SELECT id FROM campaigns").fetchall():
+                    self._reschedule(campaign_id)
+                self._invalidate()
+        self.conn.executescript(DUE_INDEXES)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ==================== Importação incremental ====================
+
+    @staticmethod
+    def _fingerprint(f, offset: int) -> str:
+        """Hash do início e do trecho final já lido (detecta arquivo reescrito)"""
+        digest = hashlib.sha1()
+        f.seek(0)
+        digest.update(f.read(min(offset, 4096)))
+        f.seek(max(0, offset - 256))
+        digest.update(f.read(min(offset, 256)))
+        return digest.hexdigest()
+
+    def _source(self, path: str) -> Optional[tuple]:
+        return self.conn.execute(
+            "SELECT size, mtime, offset, fingerprint FROM sources WHERE path = ?", (path,)
+        ).fetchone()
+
+    def _save_source(self, path: str, size: int, mtime: float, offset: int, fingerprint: str = ""):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sources (path, size, mtime, offset, fingerprint) VALUES (?, ?, ?, ?, ?)",
+            (path, size, mtime, offset, fingerprint)
+        )
+
+    def _read_log(self, path: str) -> Optional[tuple[bool, list[str]]]:
+        """
+        Lê apenas as linhas novas de um log.
+
+        Returns:
+            (reimportar_tudo, linhas) ou None se nada mudou
+        """
+        source = self._source(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if source and source[2]:
+                self._save_source(path, 0, 0, 0)
+                return True, []
+            return None
+
+        with open(path, 'rb') as f:
+            offset = source[2] if source else 0
+            if source and st.st_size >= offset and self._fingerprint(f, offset) == source[3]:
+                if st.st_size == offset:
+                    return None
+                reset = False
+            else:
+                offset, reset = 0, True
+
+            f.seek(offset)
+            data = f.read()
+            # Só consome linhas completas (a última pode estar sendo escrita)
+            complete = data.rfind(b'\n') + 1
+            new_offset = offset + complete
+            fingerprint = self._fingerprint(f, new_offset)
+
+        self._save_source(path, st.st_size, st.st_mtime, new_offset, fingerprint)
+        lines = data[:complete].decode('utf-8', errors='replace').splitlines()
+        return reset, lines
+
+    def _existing_campaign_id(self, path: str) -> Optional[int]:
+        """Id da campanha já importada (sem escrever no banco)"""
+        row = self.conn.execute("SELECT id FROM campaigns WHERE path = ?",
+                                (os.path.normpath(os.path.abspath(path)),)).fetchone()
+        return row[0] if row else None
+
+    def _campaign_id(self, path: str) -> int:
+        path = os.path.normpath(os.path.abspath(path))
+        self.conn.execute("INSERT OR IGNORE INTO campaigns (path) VALUES (?)", (path,))
+        return self.conn.execute("SELECT id FROM campaigns WHERE path = ?", (path,)).fetchone()[0]
+
+    def _invalidate(self, campaign_ids: Optional[Iterable[int]] = None):
+        """Descarta os agregados em cache (de algumas campanhas ou de todas)"""
+        if campaign_ids is None:
+            self.conn.execute("DELETE FROM campaign_stats")
+            return
+        self.conn.executemany("DELETE FROM campaign_stats WHERE campaign_id = ?",
+                              ((campaign_id,) for campaign_id in set(campaign_ids)))
+
+    def _invalidate_numbers(self, numeros: Iterable[str]):
+        """Descarta os agregados das campanhas que contêm estes números"""
+        numeros = list(set(numeros))
+        for i in range(0, len(numeros), _IN_CHUNK):
+            chunk = numeros[i:i + _IN_CHUNK]
+            self.conn.execute(
+                f"""DELETE FROM campaign_stats WHERE campaign_id IN (
+                    SELECT DISTINCT campaign_id FROM contacts WHERE numero IN ({', '.join('?' * len(chunk))}))""",
+                chunk
+            )
+
+    def _cadence(self, campaign_id: int) -> tuple[float, ...]:
+        cadence = self._cadences.get(campaign_id)
+        if cadence is None:
+            row = self.conn.execute("SELECT path FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+            cadence = self._cadences[campaign_id] = load_cadence(row[0]) if row else DEFAULT_CADENCE
+        return cadence
+
+    def _reschedule(self, campaign_id: int):
+        """Recalcula o vencimento de todos os contatos da campanha (só quando a cadência muda)"""
+        cadence = self._cadence(campaign_id)
+        self.conn.executemany(
+            "UPDATE contact_state SET due_at = ? WHERE campaign_id = ? AND numero = ?",
+            [(due_at(sent_at, msg_num, cadence), campaign_id, numero)
+             for numero, sent_at, msg_num in self.conn.execute(
+                 "SELECT numero, last_sent_at, msg_num FROM contact_state WHERE campaign_id = ?",
+                 (campaign_id,))]
+        )
+
+    def _import_cadence(self, campaign_id: int, campaign_dir: str):
+        """Relê cadencia.txt e reagenda a campanha se a cadência mudou"""
+        cadence = self._cadences[campaign_id] = load_cadence(campaign_dir)
+        path = os.path.join(os.path.normpath(os.path.abspath(campaign_dir)), "cadencia.txt")
+        source = self._source(path)
+        current = format_cadence(cadence)
+        previous = source[3] if source else format_cadence(DEFAULT_CADENCE)
+        if current != previous:
+            self._reschedule(campaign_id)
+            self._invalidate([campaign_id])
+        if source is None or current != previous:
+            self._save_source(path, 0, 0, 0, current)
+
+    def _import_contacts(self, campaign_id: int, xlsx_path: str):
+        """Reimporta a planilha da campanha se ela mudou"""
+        st = os.stat(xlsx_path)
+        source = self._source(xlsx_path)
+        if source and source[0] == st.st_size and source[1] == st.st_mtime:
+            return
+
+        rows = [row for row in iter_rows(xlsx_path) if is_valid_row(row)]
+        numeros = normalize_many((row[1] for row in rows), keys=True)
+        self.conn.execute("DELETE FROM contacts WHERE campaign_id = ?", (campaign_id,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO contacts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (campaign_id, numero, idx, row[0], str(row[1]).strip(),
+                 row[2] if len(row) > 2 else None,
+                 str(row[3]) if len(row) > 3 and row[3] is not None else None,
+                 row[4] if len(row) > 4 else None)
+                for idx, (row, numero) in enumerate(zip(rows, numeros))
+            )
+        )
+        self._save_source(xlsx_path, st.st_size, st.st_mtime, 0)
+        self._invalidate([campaign_id])
+
+    def _import_sends(self, campaign_id: int, log_path: str):
+        """Importa as linhas novas do enviados.log (telefone|timestamp|msg_num|instancia)"""
+        changed = self._read_log(log_path)
+        if changed is None:
+            return
+        reset, lines = changed
+        if reset:
+            self.conn.execute("DELETE FROM sends WHERE campaign_id = ?", (campaign_id,))
+            self.conn.execute("DELETE FROM contact_state WHERE campaign_id = ?", (campaign_id,))
+            self._invalidate()
+        else:
+            # Um envio muda os pendentes de toda campanha que tem o mesmo número
+            self._invalidate([campaign_id])
+            self._invalidate_numbers(normalize_phone(line.split('|', 1)[0]) for line in lines if line.strip())
+
+        for line in lines:
+            parts = line.strip().split('|')
+            if not parts[0]:
+                continue
+            sent_at = parts[1] if len(parts) >= 3 else ''
+            try:
+                msg_num = int(parts[2]) if len(parts) >= 3 else 1
+            except ValueError:
+                continue
+            instance = parts[3] if len(parts) >= 4 else None
+            self.add_send(campaign_id, parts[0], sent_at, msg_num, instance)
+
+    def _import_discards(self, campaign_id: int, log_path: str):
+        """
+        Importa as linhas novas do descartados.log (telefone|timestamp|status|instancia):
+        contatos sem WhatsApp ou com falha definitiva, que não voltam aos lotes
+        """
+        changed = self._read_log(log_path)
+        if changed is None:
+            return
+        reset, lines = changed
+        if reset:
+            self.conn.execute("DELETE FROM discards WHERE campaign_id = ?", (campaign_id,))
+            self._invalidate()
+        rows = []
+        for line in lines:
+            parts = line.strip().split('|')
+            if parts[0] and len(parts) >= 2:
+                rows.append((campaign_id, normalize_phone(parts[0]), parts[2] if len(parts) > 2 else None,
+                             parts[1], parts[3] if len(parts) > 3 else None))
+        self.conn.executemany(
+            """
+            INSERT INTO discards VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (campaign_id, numero) DO UPDATE SET
+                status = excluded.status,
+                discarded_at = excluded.discarded_at,
+                instance = excluded.instance
+            WHERE excluded.discarded_at >= discards.discarded_at
+            """,
+            rows
+        )
+        if not reset:
+            self._invalidate([campaign_id])
+            self._invalidate_numbers(row[1] for row in rows)
+
+    def _import_suppression(self):
+        """Importa a blocklist global (telefone|motivo|timestamp)"""
+        changed = self._read_log(self.blocklist_path)
+        if changed is None:
+            return
+        reset, lines = changed
+        if reset:
+            self.conn.execute("DELETE FROM suppression")
+            self._invalidate()
+        rows = []
+        for line in lines:
+            parts = line.strip().split('|')
+            if parts[0]:
+                rows.append((normalize_phone(parts[0]), parts[0],
+                             parts[1] if len(parts) > 1 else None,
+                             parts[2] if len(parts) > 2 else None))
+        self.conn.executemany("INSERT OR REPLACE INTO suppression VALUES (?, ?, ?, ?)", rows)
+        self._invalidate_numbers(row[0] for row in rows)
+
+    def _import_replies(self):
+        """Importa as respostas recebidas pelo webhook (telefone|timestamp|instancia|trecho)"""
+        changed = self._read_log(self.replies_path)
+        if changed is None:
+            return
+        reset, lines = changed
+        if reset:
+            self.conn.execute("DELETE FROM replies")
+            self._invalidate()
+        rows = []
+        for line in lines:
+            parts = line.strip().split('|')
+            if parts[0]:
+                rows.append((normalize_phone(parts[0]), parts[1] if len(parts) > 1 else None,
+                             parts[2] if len(parts) > 2 else None))
+        self.conn.executemany("INSERT OR REPLACE INTO replies VALUES (?, ?, ?)", rows)
+        self._invalidate_numbers(row[0] for row in rows)
+
+    def add_send(self, campaign_id: int, telefone: str, sent_at: str, msg_num: int, instance: Optional[str] = None):
+        """Registra um envio e reagenda o próximo follow-up do contato pela cadência"""
+        numero = normalize_phone(telefone)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO sends VALUES (?, ?, ?, ?, ?, ?)",
+            (campaign_id, numero, telefone, sent_at, msg_num, instance)
+        )
+        self.conn.execute(
+            """
+            INSERT INTO contact_state (campaign_id, numero, last_sent_at, msg_num, instance, due_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (campaign_id, numero) DO UPDATE SET
+                last_sent_at = excluded.last_sent_at,
+                msg_num = excluded.msg_num,
+                instance = excluded.instance,
+                due_at = excluded.due_at
+            WHERE excluded.last_sent_at >= contact_state.last_sent_at
+            """,
+            (campaign_id, numero, sent_at, msg_num, instance, due_at(sent_at, msg_num, self._cadence(campaign_id)))
+        )
+
+    def campaign_dirs(self) -> list[str]:
+        """Pastas de campanha (campanhas/tipo/cidade/) com contatos.xlsx"""
+        return sorted(
+            os.path.normpath(path)
+            for path in glob.glob(os.path.join(self.campanhas_dir, "*", "*", ""))
+            if os.path.exists(os.path.join(path, "contatos.xlsx"))
+        )
+
+    def sync(self, campaign_dir: Optional[str] = None):
+        """
+        Importa o que mudou nas planilhas e logs.
+
+        Args:
+            campaign_dir: Sincroniza só esta campanha (padrão: todas)
+        """
+        dirs = [campaign_dir] if campaign_dir else self.campaign_dirs()
+        with self.conn:
+            self._import_suppression()
+            self._import_replies()
+            for path in dirs:
+                campaign_id = self._campaign_id(path)
+                self._import_cadence(campaign_id, path)
+                xlsx_path = os.path.join(path, "contatos.xlsx")
+                if os.path.exists(xlsx_path):
+                    self._import_contacts(campaign_id, xlsx_path)
+                self._import_sends(campaign_id, os.path.join(path, "enviados.log"))
+                self._import_discards(campaign_id, os.path.join(path, "descartados.log"))
+
+    # ==================== Deduplicação global ====================
+
+    def known_numbers(self, numeros: Iterable[str]) -> set[str]:
+        """Quais destes números (chaves) já estão em alguma campanha"""
+        numeros = list(numeros)
+        known = set()
+        for i in range(0, len(numeros), _IN_CHUNK):
+            chunk = numeros[i:i + _IN_CHUNK]
+            known.update(numero for (numero,) in self.conn.execute(
+                f"SELECT DISTINCT numero FROM contacts WHERE numero IN ({', '.join('?' * len(chunk))})", chunk))
+        return known
+
+    def merge_contacts(self, campaign_dir: str, new_xlsx: str) -> tuple[int, int, int]:
+        """
+        Acrescenta à campanha os contatos de uma nova pesquisa que ainda não
+        existem em nenhuma campanha.
+
+        A checagem usa o índice global de números (não relê as planilhas
+        existentes) e os contatos novos entram no índice direto, sem
+        reimportar a planilha inteira: o custo acompanha as linhas novas.
+
+        Args:
+            campaign_dir: Pasta da campanha (contatos.xlsx é criado se faltar)
+            new_xlsx: Planilha gerada pelo scraper
+
+        Returns:
+            (adicionados, repetidos na própria campanha, já em outras campanhas)
+        """
+        self.sync()
+        xlsx_path = os.path.join(campaign_dir, "contatos.xlsx")
+        campaign_id = self._campaign_id(campaign_dir)
+
+        rows = [row for row in iter_xlsx_rows(new_xlsx) if is_valid_row(row)]
+        numeros = normalize_many((row[1] for row in rows), keys=True)
+        known = self.known_numbers(set(numeros))
+        here = {numero for (numero,) in self.conn.execute(
+            "SELECT numero FROM contacts WHERE campaign_id = ?", (campaign_id,))} & known
+
+        added, local, elsewhere = [], 0, 0
+        seen = set()
+        for row, numero in zip(rows, numeros):
+            if numero in here or numero in seen:
+                local += 1
+            elif numero in known:
+                elsewhere += 1
+            else:
+                seen.add(numero)
+                added.append((row, numero))
+        if not added and os.path.exists(xlsx_path):
+            return 0, local, elsewhere
+
+        append_xlsx_rows(xlsx_path, [row for row, _ in added])
+        start = self.conn.execute(
+            "SELECT COALESCE(MAX(row_idx), -1) + 1 FROM contacts WHERE campaign_id = ?", (campaign_id,)
+        ).fetchone()[0]
+        st = os.stat(xlsx_path)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO contacts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (campaign_id, numero, start + idx, row[0], str(row[1]).strip(),
+                     row[2] if len(row) > 2 else None,
+                     str(row[3]) if len(row) > 3 and row[3] is not None else None,
+                     row[4] if len(row) > 4 else None)
+                    for idx, (row, numero) in enumerate(added)
+                )
+            )
+            # A planilha reescrita já está refletida no índice: sync() não a reimporta
+            self._save_source(xlsx_path, st.st_size, st.st_mtime, 0)
+            self._invalidate([campaign_id])
+        return len(added), local, elsewhere
+
+    # ==================== Consultas ====================
+
+    def _campaign_filter(self, campaign_dirs) -> tuple[str, list]:
+        if campaign_dirs is None:
+            return "", []
+        paths = [os.path.normpath(os.path.abspath(path)) for path in campaign_dirs]
+        if not paths:
+            return " AND 0", []
+        return f" AND p.path IN ({', '.join('?' * len(paths))})", paths
+
+    def pending(self, campaign_dirs: Optional[list[str]] = None, limit: int = 20,
+                any_campaign: bool = True) -> list[tuple]:
+        """
+        Contatos nunca enviados, nem descartados (sem WhatsApp ou com falha
+        definitiva), e fora da blocklist, na ordem da planilha.
+
+        Args:
+            campaign_dirs: Campanhas consideradas (padrão: todas)
+            limit: Tamanho do lote
+            any_campaign: Descarta números já contatados por qualquer campanha
+                          (e repetidos entre campanhas saem uma vez só)
+
+        Returns:
+            Tuplas (nome, telefone, endereco, avaliacao, website, campanha)
+        """
+        where, params = self._campaign_filter(campaign_dirs)
+        if any_campaign:
+            # Campanha por campanha pelo índice (campaign_id, row_idx): a leitura
+            # para quando o lote completa, sem ordenar os pendentes de todas
+            paths = [path for path, in self.conn.execute(
+                f"SELECT p.path FROM campaigns p WHERE 1 {where} ORDER BY p.path", params)]
+            batch, seen = [], set()
+            for path in paths:
+                for row in self.iter_pending(path):
+                    if row[-1] in seen:
+                        continue
+                    seen.add(row[-1])
+                    batch.append(row[:-1])
+                    if len(batch) >= limit:
+                        return batch
+            return batch
+
+        return [row[:-1] for row in self.conn.execute(
+            f"""
+            SELECT {CONTACT_COLUMNS}, c.numero
+            FROM contacts c
+            JOIN campaigns p ON p.id = c.campaign_id
+            WHERE NOT EXISTS (SELECT 1 FROM contact_state s WHERE s.campaign_id = c.campaign_id
+                              AND s.numero = c.numero)
+              AND NOT EXISTS (SELECT 1 FROM discards d WHERE d.campaign_id = c.campaign_id
+                              AND d.numero = c.numero)
+              AND NOT EXISTS (SELECT 1 FROM suppression b WHERE b.numero = c.numero)
+              {where}
+            ORDER BY p.path, c.row_idx
+            LIMIT ?
+            """,
+            params + [limit]
+        )]
+
+    def followup_due(self, campaign_dirs: Optional[list[str]] = None,
+                     limit: Optional[int] = None) -> list[tuple]:
+        """
+        Contatos com follow-up vencido pela cadência da campanha (due_at já
+        passou) e nenhuma resposta recebida.
+
+        Returns:
+            Tuplas (nome, telefone, endereco, avaliacao, website, campanha, msg_num)
+        """
+        now = datetime.now().isoformat()
+        where, params = self._campaign_filter(campaign_dirs)
+        return self.conn.execute(
+            f"""
+            SELECT {CONTACT_COLUMNS}, s.msg_num
+            FROM contact_state s
+            JOIN contacts c ON c.campaign_id = s.campaign_id AND c.numero = s.numero
+            JOIN campaigns p ON p.id = s.campaign_id
+            WHERE s.due_at <= ?
+              AND NOT EXISTS (SELECT 1 FROM suppression b WHERE b.numero = s.numero)
+              AND NOT EXISTS (SELECT 1 FROM replies r WHERE r.numero = s.numero)
+              AND NOT EXISTS (SELECT 1 FROM discards d WHERE d.campaign_id = s.campaign_id
+                              AND d.numero = s.numero AND d.discarded_at >= s.last_sent_at)
+              {where}
+            ORDER BY p.path, c.row_idx
+            LIMIT ?
+            """,
+            [now] + params + [limit if limit is not None else -1]
+        ).fetchall()
+
+    def iter_pending(self, campaign_dir: str) -> Iterator[tuple]:
+        """
+        Pendentes de uma campanha, na ordem da planilha, lidos sob demanda
+        pelo índice (campaign_id, row_idx): parar de iterar é parar de ler.
+
+        Yields:
+            Tuplas (nome, telefone, endereco, avaliacao, website, campanha, numero)
+        """
+        campaign_id = self._existing_campaign_id(campaign_dir)
+        if campaign_id is None:
+            return
+        yield from self.conn.execute(
+            f"""
+            SELECT {CONTACT_COLUMNS}, c.numero
+            FROM contacts c
+            JOIN campaigns p ON p.id = c.campaign_id
+            WHERE c.campaign_id = ?
+              AND NOT EXISTS (SELECT 1 FROM contact_state s WHERE s.numero = c.numero)
+              AND NOT EXISTS (SELECT 1 FROM discards d WHERE d.numero = c.numero)
+              AND NOT EXISTS (SELECT 1 FROM suppression b WHERE b.numero = c.numero)
+            ORDER BY c.row_idx
+            """,
+            (campaign_id,)
+        )
+
+    def iter_followup_due(self, campaign_dir: str) -> Iterator[tuple]:
+        """
+        Follow-ups vencidos de uma campanha, do que venceu primeiro ao mais
+        recente: só o prefixo pronto da fila (campaign_id, due_at) é lido,
+        sob demanda, sem passar pelo histórico de envios.
+
+        Yields:
+            Tuplas (nome, telefone, endereco, avaliacao, website, campanha, msg_num, numero)
+        """
+        campaign_id = self._existing_campaign_id(campaign_dir)
+        if campaign_id is None:
+            return
+        now = datetime.now().isoformat()
+        yield from self.conn.execute(
+            f"""
+            SELECT {CONTACT_COLUMNS}, s.msg_num, s.numero
+            FROM contact_state s
+            JOIN contacts c ON c.campaign_id = s.campaign_id AND c.numero = s.numero
+            JOIN campaigns p ON p.id = s.campaign_id
+            WHERE s.campaign_id = ? AND s.due_at <= ?
+              AND NOT EXISTS (SELECT 1 FROM suppression b WHERE b.numero = s.numero)
+              AND NOT EXISTS (SELECT 1 FROM replies r WHERE r.numero = s.numero)
+              AND NOT EXISTS (SELECT 1 FROM discards d WHERE d.campaign_id = s.campaign_id
+                              AND d.numero = s.numero AND d.discarded_at >= s.last_sent_at)
+            ORDER BY s.due_at
+            """,
+            (campaign_id, now)
+        )
+
+    def _compute_stats(self, campaign_ids: list[int]) -> dict[int, tuple]:
+        """Agregados de várias campanhas numa única passada pelos contatos"""
+        now = datetime.now().isoformat()
+        computed = {}
+        for i in range(0, len(campaign_ids), _IN_CHUNK):
+            chunk = campaign_ids[i:i + _IN_CHUNK]
+            for row in self.conn.execute(
+                f"""
+                SELECT c.campaign_id,
+                       COUNT(*),
+                       COUNT(s.numero),
+                       SUM(s.numero IS NULL AND b.numero IS NULL
+                           AND NOT EXISTS (SELECT 1 FROM contact_state x WHERE x.numero = c.numero)
+                           AND NOT EXISTS (SELECT 1 FROM discards d WHERE d.numero = c.numero)),
+                       SUM(s.due_at <= :now AND b.numero IS NULL AND r.numero IS NULL
+                           AND (d.discarded_at IS NULL OR d.discarded_at < s.last_sent_at)),
+                       COUNT(b.numero),
+                       COUNT(r.numero),
+                       MIN(CASE WHEN s.due_at > :now AND b.numero IS NULL AND r.numero IS NULL
+                                THEN s.due_at END)
+                FROM contacts c
+                LEFT JOIN contact_state s ON s.campaign_id = c.campaign_id AND s.numero = c.numero
+                LEFT JOIN suppression b ON b.numero = c.numero
+                LEFT JOIN replies r ON r.numero = c.numero
+                LEFT JOIN discards d ON d.campaign_id = c.campaign_id AND d.numero = c.numero
+                WHERE c.campaign_id IN ({', '.join(':c' + str(n) for n in range(len(chunk)))})
+                GROUP BY c.campaign_id
+                """,
+                {"now": now, **{f"c{n}": cid for n, cid in enumerate(chunk)}}
+            ):
+                # O último campo é o próximo a vencer: até lá, os follow-ups não mudam sozinhos
+                campaign_id, valid, sent, pending, followup, blocked, replied, due_until = row
+                computed[campaign_id] = (valid, sent, pending or 0, followup or 0, blocked, replied, due_until)
+        return computed
+
+    def stats(self, campaign_dirs: Optional[list[str]] = None) -> list[CampaignStats]:
+        """
+        Agregados por campanha (total, válidos, enviados, pendentes,
+        follow-up, bloqueados, responderam).
+
+        Ficam em cache no banco: sync() descarta só os das campanhas
+        afetadas pelo que mudou (planilha, envios, descartes, blocklist, respostas,
+        cadência) e os de follow-up expiram quando o próximo contato vence. Com tudo em
+        cache, a consulta não passa pelos contatos.
+
+        Returns:
+            CampaignStats por campanha, na ordem do caminho
+        """
+        where, params = self._campaign_filter(campaign_dirs)
+        campaigns = self.conn.execute(
+            f"SELECT p.id, p.path FROM campaigns p WHERE 1 {where} ORDER BY p.path", params
+        ).fetchall()
+        key = "cadencia"  # follow-ups pelo due_at (caches antigos, por min_hours|max_msgs, são refeitos)
+        now = datetime.now().isoformat()
+        cached = {
+            row[0]: row[1:]
+            for row in self.conn.execute(
+                "SELECT campaign_id, rows, valid, sent, pending, followup, blocked, replied "
+                "FROM campaign_stats WHERE params = ? AND (due_until IS NULL OR due_until > ?)",
+                (key, now)
+            )
+        }
+
+        stale = [campaign_id for campaign_id, _ in campaigns if campaign_id not in cached]
+        if stale:
+            computed = self._compute_stats(stale)
+            paths = dict(campaigns)
+            with self.conn:
+                for campaign_id in stale:
+                    valid, sent, pending, followup, blocked, replied, due_until = computed.get(
+                        campaign_id, (0, 0, 0, 0, 0, 0, None))
+                    snapshot = load_snapshot(os.path.join(paths[campaign_id], "contatos.xlsx"))
+                    rows = len(snapshot) if snapshot is not None else valid
+                    cached[campaign_id] = (rows, valid, sent, pending, followup, blocked, replied)
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO campaign_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (campaign_id, rows, valid, sent, pending, followup, blocked, replied, key, due_until)
+                    )
+        return [CampaignStats(path, *cached[campaign_id]) for campaign_id, path in campaigns]
+
+    def is_suppressed(self, phone) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM suppression WHERE numero = ?", (normalize_phone(phone),)
+        ).fetchone() is not None
+
+    def sends_by_instance(self, since: str) -> dict[str, int]:
+        """Envios de cada instância a partir de `since` (ISO, ex: "2024-05-01" para o dia todo)"""
+        return dict(self.conn.execute(
+            "SELECT instance, COUNT(*) FROM sends WHERE sent_at >= ? AND instance IS NOT NULL GROUP BY instance",
+            (since,)
+        ))
+
+
+def export_metrics(campanhas_dir: str = DEFAULT_CAMPANHAS_DIR, db_path: str = DEFAULT_DB_PATH):
+    """
+    Publica os agregados das campanhas no /metrics e no JSONL
+    (campaign_contacts), atualizados pelo cache a cada leitura.
+    """
+    import metrics
+
+    def collect():
+        with CampaignStore(db_path, campanhas_dir) as store:
+            store.sync()
+            for row in store.stats():
+                campaign = os.path.relpath(row.path, campanhas_dir)
+                for status in CampaignStats._fields[1:]:
+                    metrics.CAMPAIGN_CONTACTS.set(getattr(row, status), campaign=campaign, status=status)
+
+    metrics.REGISTRY.add_collector(collect)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Uso: python3 campaign_store.py sync
+    #      python3 campaign_store.py merge <pasta_campanha> <novos.xlsx>
+    if len(sys.argv) == 2 and sys.argv[1] == "sync":
+        start = time.time()
+        with CampaignStore() as store:
+            store.sync()
+        print(f"✓ Estado sincronizado em {time.time() - start:.2f}s")
+    elif len(sys.argv) == 4 and sys.argv[1] == "merge":
+        with CampaignStore() as store:
+            added, local, elsewhere = store.merge_contacts(sys.argv[2], sys.argv[3])
+        print(f"MERGED:{added}")
+        print(f"   🆕 {added} novos, 🔁 {local} já na campanha, 🌐 {elsewhere} já em outras campanhas")
+    else:
+        print("Uso: python3 campaign_store.py sync | merge <pasta_campanha> <novos.xlsx>")
+        sys.exit(1)
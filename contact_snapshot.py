@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Contact Snapshot
+Cópia colunar e binária de uma planilha de contatos (contatos.xlsx.snap),
+lida por mmap: a planilha só é interpretada de novo quando muda
+"""
+
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from typing import IO, Iterator, Optional
+
+from contacts import is_valid_row, iter_xlsx_rows
+
+
+MAGIC = b"WSNAP\x01\x00\x00"
+# mtime_ns, tamanho da planilha, linhas, colunas, linhas válidas
+_HEADER = struct.Struct("<8sQQIII")
+# Por coluna: início dos tipos, dos offsets e do texto; tamanho do texto
+_COLUMN = struct.Struct("<QQQQ")
+
+# Tipo de cada célula (o texto guarda a representação em str; datas e
+# outros tipos voltam como texto)
+_NONE, _STR, _INT, _FLOAT, _BOOL = 0, 1, 2, 3, 4
+_DECODE = {_STR: str, _INT: int, _FLOAT: float, _BOOL: lambda text: text == "True"}
+
+# Colunas da planilha do Google Scraper
+FIELDS = ("nome", "telefone", "endereco", "avaliacao", "website")
+
+
+def snapshot_path(xlsx_path: str) -> str:
+    """Snapshot que acompanha a planilha (contatos.xlsx.snap)"""
+    return f"{xlsx_path}.snap"
+
+
+def _encode(value) -> tuple[int, bytes]:
+    if value is None:
+        return _NONE, b""
+    if isinstance(value, bool):
+        return _BOOL, str(value).encode()
+    if isinstance(value, int):
+        return _INT, str(value).encode()
+    if isinstance(value, float):
+        return _FLOAT, repr(value).encode()
+    return _STR, str(value).encode()
+
+
+def build_snapshot(xlsx_path: str, path: Optional[str] = None) -> str:
+    """
+    Converte a planilha num snapshot colunar.
+
+    Cada coluna vira três blocos contíguos: o tipo de cada célula (1 byte),
+    os offsets (uint32) e o texto UTF-8 de todas as células juntas. A
+    planilha é lida numa passada só: tipos e offsets ficam em arrays
+    compactos e o texto de cada coluna vai direto para um arquivo
+    temporário. O arquivo é gravado num temporário e trocado de uma vez,
+    então leitores com o snapshot antigo mapeado não são afetados.
+
+    Returns:
+        Caminho do snapshot
+    """
+    path = path or snapshot_path(xlsx_path)
+    st = os.stat(xlsx_path)
+    directory = os.path.dirname(path) or '.'
+
+    # Por coluna: tipos, offsets e o texto (em disco); uma coluna que só
+    # aparece no meio da planilha começa com None nas linhas anteriores
+    columns: list[tuple[bytearray, array, IO[bytes]]] = []
+    nrows = valid = 0
+    try:
+        for row in iter_xlsx_rows(xlsx_path):
+            while len(columns) < len(row):
+                columns.append((bytearray(nrows), array('I', [0]) * (nrows + 1),
+                                tempfile.TemporaryFile(dir=directory)))
+            for column, (types, offsets, text) in enumerate(columns):
+                kind, data = _encode(row[column] if column < len(row) else None)
+                types.append(kind)
+                if data:
+                    text.write(data)
+                offsets.append(offsets[-1] + len(data))
+            nrows += 1
+            valid += is_valid_row(row)
+        if not nrows:
+            columns = [(bytearray(), array('I', [0]), tempfile.TemporaryFile(dir=directory)) for _ in FIELDS]
+
+        position = _HEADER.size + _COLUMN.size * len(columns)
+        table = []
+        for types, offsets, text in columns:
+            text_size = offsets[-1]
+            offsets_size = offsets.itemsize * len(offsets)
+            table.append(_COLUMN.pack(position, position + len(types),
+                                      position + len(types) + offsets_size, text_size))
+            position += len(types) + offsets_size + text_size
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, st.st_mtime_ns, st.st_size, nrows, len(columns), valid))
+                f.writelines(table)
+                for types, offsets, text in columns:
+                    f.write(types)
+                    offsets.tofile(f)
+                    text.seek(0)
+                    shutil.copyfileobj(text, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    finally:
+        for _, _, text in columns:
+            text.close()
+    return path
+
+
+class ContactView:
+    """
+    Linha do snapshot sem cópia: os campos são lidos do mmap quando
+    acessados. Mesmos atributos de Contact (nome, telefone...).
+    """
+
+    __slots__ = ("_snapshot", "_index")
+
+    def __init__(self, snapshot: "ContactSnapshot", index: int):
+        self._snapshot = snapshot
+        self._index = index
+
+    def __getitem__(self, column: int):
+        return self._snapshot.cell(self._index, column)
+
+    def __len__(self) -> int:
+        return self._snapshot.ncols
+
+    @property
+    def nome(self):
+        return self._snapshot.cell(self._index, 0)
+
+    @property
+    def telefone(self):
+        return self._snapshot.cell(self._index, 1)
+
+    @property
+    def endereco(self):
+        return self._snapshot.cell(self._index, 2)
+
+    @property
+    def avaliacao(self):
+        return self._snapshot.cell(self._index, 3)
+
+    @property
+    def website(self):
+        return self._snapshot.cell(self._index, 4)
+
+    def row(self) -> tuple:
+        return tuple(self._snapshot.cell(self._index, column) for column in range(self._snapshot.ncols))
+
+    def __repr__(self):
+        return f"ContactView({self._index}, {self.row()!r})"
+
+
+class ContactSnapshot:
+    """
+    Snapshot aberto por mmap (somente leitura).
+
+    As páginas vêm do cache do sistema operacional e são compartilhadas
+    entre processos (daemon, scripts, cron). Leitura por coluna inteira
+    (column) ou por linha (view/rows).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.mtime_ns, self.size, self.nrows, self.ncols, self.valid = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"Snapshot inválido: {path}")
+        buffer = memoryview(self._mmap)
+        self._columns = []
+        for column in range(self.ncols):
+            types_at, offsets_at, text_at, text_size = _COLUMN.unpack_from(
+                self._mmap, _HEADER.size + _COLUMN.size * column)
+            self._columns.append((
+                buffer[types_at:types_at + self.nrows],
+                buffer[offsets_at:offsets_at + 4 * (self.nrows + 1)].cast('I'),
+                buffer[text_at:text_at + text_size],
+            ))
+
+    def matches(self, xlsx_path: str) -> bool:
+        """O snapshot corresponde à versão atual da planilha?"""
+        try:
+            st = os.stat(xlsx_path)
+        except FileNotFoundError:
+            return False
+        return (st.st_mtime_ns, st.st_size) == (self.mtime_ns, self.size)
+
+    def __len__(self) -> int:
+        return self.nrows
+
+    def cell(self, index: int, column: int):
+        if column >= self.ncols:
+            return None
+        types, offsets, text = self._columns[column]
+        kind = types[index]
+        if kind == _NONE:
+            return None
+        return _DECODE[kind](str(text[offsets[index]:offsets[index + 1]], 'utf-8'))
+
+    def column(self, column: int) -> list:
+        """Coluna inteira decodificada (uma cópia do texto da coluna, sem XML)"""
+        if column >= self.ncols:
+            return [None] * self.nrows
+        types, offsets, text = self._columns[column]
+        data = bytes(text)
+        values = []
+        append = values.append
+        start = 0
+        for index in range(self.nrows):
+            end = offsets[index + 1]
+            kind = types[index]
+            if kind == _NONE:
+                append(None)
+            elif kind == _STR:
+                append(data[start:end].decode('utf-8'))
+            else:
+                append(_DECODE[kind](data[start:end].decode('ascii')))
+            start = end
+        return values
+
+    def rows(self) -> Iterator[tuple]:
+        """Linhas como tuplas (as de iter_xlsx_rows, completadas com None até ncols)"""
+        return zip(*(self.column(column) for column in range(self.ncols)))
+
+    def view(self, index: int) -> ContactView:
+        return ContactView(self, index)
+
+    def views(self) -> Iterator[ContactView]:
+        return (ContactView(self, index) for index in range(self.nrows))
+
+    def close(self):
+        self._columns = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_open: dict[str, ContactSnapshot] = {}
+
+
+def load_snapshot(xlsx_path: str) -> Optional[ContactSnapshot]:
+    """
+    Snapshot atualizado da planilha (reconstruído se a planilha mudou de
+    data ou tamanho). Fica aberto e é reaproveitado no mesmo processo.
+
+    Returns:
+        ContactSnapshot, ou None se não for possível gravar o snapshot
+    """
+    path = snapshot_path(xlsx_path)
+    current = _open.get(path)
+    if current is not None and current.matches(xlsx_path):
+        return current
+
+    # O snapshot antigo sai do cache e é fechado (mmap e descritor)
+    if current is not None:
+        del _open[path]
+        try:
+            current.close()
+        except BufferError:
+            pass  # ainda há uma leitura em andamento: o mmap é liberado com ela
+
+    try:
+        snapshot = ContactSnapshot(path) if os.path.exists(path) else None
+    except (OSError, ValueError, struct.error):
+        snapshot = None  # snapshot corrompido (gravação interrompida): reconstrói
+    try:
+        if snapshot is None or not snapshot.matches(xlsx_path):
+            if snapshot is not None:
+                snapshot.close()
+            build_snapshot(xlsx_path, path)
+            snapshot = ContactSnapshot(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    _open[path] = snapshot
+    return snapshot
+
+
+def iter_rows(xlsx_path: str) -> Iterator[tuple]:
+    """Linhas da planilha pelo snapshot (ou direto do XLSX se não houver)"""
+    snapshot = load_snapshot(xlsx_path)
+    if snapshot is None:
+        return iter_xlsx_rows(xlsx_path)
+    return snapshot.rows()
+
+
+def count_valid(xlsx_path: str) -> int:
+    """Linhas válidas da planilha, lidas do cabeçalho do snapshot"""
+    if not os.path.exists(xlsx_path):
+        return 0
+    snapshot = load_snapshot(xlsx_path)
+    if snapshot is None:
+        return sum(1 for row in iter_xlsx_rows(xlsx_path) if is_valid_row(row))
+    return snapshot.valid
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Uso: python3 contact_snapshot.py <contatos.xlsx> [...]
+    if len(sys.argv) < 2:
+        print("Uso: python3 contact_snapshot.py <contatos.xlsx> [...]")
+        sys.exit(1)
+    for xlsx in sys.argv[1:]:
+        start = time.perf_counter()
+        build_snapshot(xlsx)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        with ContactSnapshot(snapshot_path(xlsx)) as snap:
+            total = sum(1 for _ in snap.rows())
+        print(f"📦 {xlsx}: {total} linhas, snapshot em {built:.2f}s, leitura em {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Contacts
+Leitura em streaming dos contatos das planilhas XLSX (Google Scraper)
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+
+@dataclass(slots=True)
+class Contact:
+    """Representa um contato para envio (com __slots__: sem __dict__ por instância)"""
+    nome: str
+    telefone: str
+    endereco: Optional[str] = None
+    avaliacao: Optional[str] = None
+    website: Optional[str] = None
+
+
+def iter_xlsx_rows(filepath: str, min_row: int = 2) -> Iterator[tuple]:
+    """
+    Lê as linhas de uma planilha em modo somente-leitura, uma por vez.
+
+    O openpyxl em modo read_only não carrega a planilha inteira na
+    memória, então o consumo fica constante mesmo com centenas de
+    milhares de linhas.
+
+    Args:
+        filepath: Arquivo XLSX
+        min_row: Primeira linha lida (2 = pula o cabeçalho)
+
+    Yields:
+        Tuplas com os valores de cada linha
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filepath, read_only=True)
+    try:
+        yield from wb.active.iter_rows(min_row=min_row, values_only=True)
+    finally:
+        wb.close()
+
+
+def is_valid_row(row: tuple) -> bool:
+    """Linha com nome e telefone preenchidos"""
+    return bool(len(row) > 1 and row[0] and row[1] and str(row[1]) != 'N/A')
+
+
+def iter_contacts(filepath: str, normalize: Optional[Callable[[str], Optional[str]]] = None,
+                  snapshot: bool = False) -> Iterator[Contact]:
+    """
+    Gera os contatos válidos de uma planilha, sob demanda.
+
+    Args:
+        filepath: Arquivo XLSX ou lote .jsonl (batch_file)
+        normalize: Função que formata o telefone (retorna None se inválido)
+        snapshot: Lê pelo snapshot colunar (contact_snapshot), para planilhas
+                  lidas várias vezes; lotes de uso único leem direto o XLSX
+
+    Yields:
+        Contatos com nome e telefone válidos
+    """
+    if snapshot:
+        from contact_snapshot import iter_rows
+        rows = iter_rows(filepath)
+    elif filepath.endswith(".jsonl"):
+        from batch_file import iter_batch
+        rows = iter_batch(filepath)
+    else:
+        rows = iter_xlsx_rows(filepath)
+
+    for row in rows:
+        if not is_valid_row(row):
+            continue
+
+        telefone = str(row[1])
+        if normalize:
+            telefone = normalize(telefone)
+            if not telefone:
+                continue
+
+        avaliacao = row[3] if len(row) > 3 else None
+        yield Contact(
+            nome=row[0],
+            telefone=telefone,
+            endereco=row[2] if len(row) > 2 else None,
+            avaliacao=str(avaliacao) if avaliacao else None,
+            website=row[4] if len(row) > 4 else None
+        )
+
+
+HEADERS = ("Nome", "Telefone", "Endereço", "Avaliação", "Website")
+COLUMN_WIDTHS = {'A': 40, 'B': 18, 'C': 50, 'D': 10, 'E': 35}
+
+
+def append_xlsx_rows(filepath: str, rows: list[tuple]):
+    """
+    Acrescenta linhas ao final de uma planilha de contatos (cria se não existir).
+
+    O XLSX é um zip e não aceita escrita no fim do arquivo: as linhas
+    existentes são copiadas em streaming (read_only -> write_only, memória
+    constante, sem montar célula por célula) para um arquivo temporário,
+    que substitui o original de uma vez.
+
+    Args:
+        filepath: Planilha de destino (contatos.xlsx)
+        rows: Linhas novas (nome, telefone, endereço, avaliação, website)
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Resultados")
+    for column, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+
+    header = []
+    for title in HEADERS:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        header.append(cell)
+    ws.append(header)
+
+    if os.path.exists(filepath):
+        from contact_snapshot import iter_rows
+        for row in iter_rows(filepath):
+            ws.append(row[:5])
+    for row in rows:
+        ws.append(tuple(row[:5]))
+
+    tmp_path = f"{filepath}.tmp"
+    wb.save(tmp_path)
+    os.replace(tmp_path, filepath)
+
+
+def count_contacts(filepath: str) -> int:
+    """Conta as linhas válidas de uma planilha (0 se não existir), pelo snapshot"""
+    from contact_snapshot import count_valid
+    return count_valid(filepath)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso nos scripts shell: python3 contacts.py count <arquivo.xlsx>
+    if len(sys.argv) == 3 and sys.argv[1] == "count":
+        print(count_contacts(sys.argv[2]))
+    else:
+        print("Uso: python3 contacts.py count <arquivo.xlsx>")
+        sys.exit(1)
@@ -4,32 +4,171 @@ Evolution API Client
 Cliente Python para interagir com a Evolution API (WhatsApp)
 """
 
+import asyncio
+import os
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
 import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import profiler
+from media_cache import MediaCache, MediaFile
+from phone_numbers import phone_key
+from resilience import (DEFAULT_POLICIES, TRANSIENT_STATUSES, CircuitBreaker, backoff_delay,
+                        instance_of, never_sent, parse_retry_after, resolve_policy)
+from webhook_receiver import wait_for_state
+
+
+# Receptor de webhooks (webhook_receiver.py) consultado para esperar conexões
+DEFAULT_EVENTS_URL = os.environ.get("WEBHOOK_RECEIVER_URL", "http://127.0.0.1:8090")
+# Espera máxima de cada consulta ao receptor; entre elas o estado é conferido na API
+# (o evento pode não chegar: token errado, webhook desligado, conexão anterior à espera)
+EVENTS_WAIT_SLICE = 10
 
 
 class EvolutionAPI:
     """Cliente para a Evolution API"""
     
-    def __init__(self, base_url: str = "http://localhost:8080", api_key: str = "whatsapp_sender_secret_key_2024"):
+    def __init__(self, base_url: str = "http://localhost:8080", api_key: str = "whatsapp_sender_secret_key_2024",
+                 pool_size: int = 10, timeout: float = 30, policies: Optional[dict] = None,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                 events_url: Optional[str] = DEFAULT_EVENTS_URL):
+        """
+        Args:
+            base_url: URL da Evolution API
+            api_key: Chave de autenticação
+            pool_size: Conexões keep-alive mantidas abertas com o servidor
+            timeout: Timeout padrão (segundos) dos endpoints sem política própria
+            policies: {prefixo do endpoint: RetryPolicy} (padrão: DEFAULT_POLICIES)
+            breaker_threshold: Falhas transitórias seguidas que abrem o circuito da instância
+            breaker_reset: Segundos até testar de novo uma instância com circuito aberto
+            events_url: Receptor de webhooks para esperar conexões sem polling (None = só polling)
+        """
         self.base_url = base_url.rstrip('/')
+        self.events_url = events_url
         self.api_key = api_key
+        self.timeout = timeout
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.media = MediaCache()
         self.headers = {
             "apikey": api_key,
             "Content-Type": "application/json"
         }
+        
+        # Sessão única: reaproveita conexões TCP entre presença, envio e verificação
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def breaker(self, instance_name: str) -> CircuitBreaker:
+        """Circuit breaker da instância (criado no primeiro uso)"""
+        breaker = self.breakers.get(instance_name)
+        if breaker is None:
+            breaker = self.breakers.setdefault(
+                instance_name, CircuitBreaker(self.breaker_threshold, self.breaker_reset))
+        return breaker
+    
+    def circuit_open(self, instance_name: str) -> bool:
+        """A instância está com o circuito aberto (falhando seguidamente)?"""
+        breaker = self.breakers.get(instance_name)
+        return breaker is not None and breaker.is_open()
     
-    def _request(self, method: str, endpoint: str, json_data: dict = None) -> dict:
-        """Faz uma requisição para a API"""
+    def _request(self, method: str, endpoint: str, json_data: dict = None,
+                 body: Optional[Callable[[], object]] = None) -> dict:
+        """
+        Faz uma requisição para a API, com a política de retry do endpoint.
+        
+        `body` substitui json_data por um corpo já serializado: uma função
+        que devolve um novo arquivo (lido em streaming) a cada tentativa.
+        
+        Erros vêm como {"error": True, "status": ..., "message": ...,
+        "transient": bool}: transient indica sobrecarga ou queda passageira
+        (429, 5xx, conexão, timeout), em que vale tentar de novo mais tarde;
+        os demais (400, 401, 404...) são permanentes. "in_doubt" marca uma
+        chamada não idempotente (envio) que caiu depois de chegar ao servidor.
+        """
         url = f"{self.base_url}{endpoint}"
-        try:
-            response = requests.request(method, url, headers=self.headers, json=json_data, timeout=30)
-            if response.status_code >= 400:
-                return {"error": True, "status": response.status_code, "message": response.text}
-            return response.json() if response.text else {}
-        except requests.exceptions.RequestException as e:
-            return {"error": True, "message": str(e)}
+        policy = resolve_policy(self.policies, endpoint)
+        instance = instance_of(endpoint)
+        route = endpoint.split('?', 1)[0]
+        if instance:
+            route = route[:-len(instance) - 1]
+        breaker = self.breaker(instance) if instance else None
+        if breaker is not None and not breaker.allow():
+            metrics.API_REQUESTS.inc(endpoint=route, instance=instance, status="circuit_open")
+            return {"error": True, "status": None, "transient": True, "circuit_open": True,
+                    "message": f"Circuito aberto para a instância '{instance}'"}
+        
+        timeout = policy.timeout or self.timeout
+        idempotent = policy.is_idempotent(method)
+        attempt = 0
+        while True:
+            retry_after = None
+            started = time.monotonic()
+            try:
+                with profiler.span(f"api {method} {route}", "api", instance=instance, attempt=attempt + 1) as span:
+                    if body is not None:
+                        response = self.session.request(method, url, data=body(), timeout=timeout)
+                    else:
+                        response = self.session.request(method, url, json=json_data, timeout=timeout)
+                    span.tag(status=response.status_code)
+            except requests.exceptions.RequestException as e:
+                metrics.API_LATENCY.observe(time.monotonic() - started, endpoint=route, instance=instance)
+                metrics.API_REQUESTS.inc(endpoint=route, instance=instance, status="error")
+                # Conexão recusada: o servidor não recebeu nada, sempre pode repetir.
+                # Timeout de leitura ou conexão caída no meio: só se for idempotente.
+                refused = never_sent(e)
+                transient = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                result = {"error": True, "status": None, "transient": transient, "message": str(e)}
+                if not refused and not idempotent:
+                    result["in_doubt"] = True  # o servidor pode ter processado
+                retry = refused or (transient and idempotent)
+            else:
+                metrics.API_LATENCY.observe(time.monotonic() - started, endpoint=route, instance=instance)
+                metrics.API_REQUESTS.inc(endpoint=route, instance=instance, status=response.status_code)
+                if response.status_code < 400:
+                    if breaker is not None:
+                        breaker.success()
+                    return response.json() if response.text else {}
+                status = response.status_code
+                transient = status in TRANSIENT_STATUSES
+                result = {"error": True, "status": status, "transient": transient, "message": response.text}
+                retry = status in policy.retry_statuses
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            
+            attempt += 1
+            if not retry or attempt >= policy.max_attempts:
+                break
+            with profiler.span("backoff", "backoff", instance=instance, endpoint=route):
+                time.sleep(backoff_delay(attempt - 1, policy, retry_after))
+        
+        if breaker is not None:
+            # 4xx permanente mostra que a instância responde: não conta como falha
+            if result["transient"]:
+                breaker.failure()
+            else:
+                breaker.success()
+        result["attempts"] = attempt
+        return result
+    
+    def close(self):
+        """Fecha as conexões do pool"""
+        self.session.close()
+        self.media.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
     
     # ==================== Instância ====================
     
@@ -147,10 +286,12 @@ class EvolutionAPI:
         Args:
             instance_name: Nome da instância
             phone: Número do telefone
-            media_url: URL da mídia
+            media_url: URL da mídia (ou caminho de um arquivo local)
             media_type: Tipo (image, video, audio, document)
             caption: Legenda opcional
         """
+        if os.path.isfile(media_url):
+            return self.send_media_file(instance_name, phone, media_url, caption, media_type)
         data = {
             "number": self._format_phone(phone),
             "mediatype": media_type,
@@ -159,6 +300,38 @@ class EvolutionAPI:
         }
         return self._request("POST", f"/message/sendMedia/{instance_name}", data)
     
+    def send_media_file(self, instance_name: str, phone: str, file_path: str, caption: str = "",
+                        media_type: Optional[str] = None) -> dict:
+        """
+        Envia um arquivo local como mídia em base64.
+        
+        O arquivo é codificado uma única vez (MediaCache, pelo hash do
+        conteúdo) e o corpo de cada envio é lido direto do cache, então
+        mandar a mesma mídia para muitos contatos custa quase o mesmo
+        que mandar texto.
+        
+        Args:
+            instance_name: Nome da instância
+            phone: Número do telefone
+            file_path: Arquivo (imagem, vídeo, áudio, PDF...)
+            caption: Legenda opcional
+            media_type: Tipo (padrão: deduzido da extensão)
+        """
+        return self._send_encoded(instance_name, phone, self.media.get(file_path), caption, media_type)
+    
+    def _send_encoded(self, instance_name: str, phone: str, media: MediaFile, caption: str,
+                      media_type: Optional[str]):
+        """Envia uma mídia já codificada (MediaFile do MediaCache)"""
+        fields = {
+            "number": self._format_phone(phone),
+            "mediatype": media_type or media.media_type,
+            "mimetype": media.mimetype,
+            "fileName": media.file_name,
+            "caption": caption
+        }
+        return self._request("POST", f"/message/sendMedia/{instance_name}",
+                             body=partial(self.media.body, media, fields))
+    
     def check_number(self, instance_name: str, phone: str) -> dict:
         """Verifica se um número tem WhatsApp"""
         data = {
@@ -173,21 +346,39 @@ class EvolutionAPI:
             return result[0].get("exists", False)
         return False
     
+    def check_numbers(self, instance_name: str, phones: list[str]) -> dict:
+        """Verifica vários números de uma vez (uma única requisição)"""
+        data = {
+            "numbers": [self._format_phone(phone) for phone in phones]
+        }
+        return self._request("POST", f"/chat/whatsappNumbers/{instance_name}", data)
+    
+    @staticmethod
+    def _parse_numbers_result(result) -> Optional[dict[str, bool]]:
+        """Converte a resposta de /chat/whatsappNumbers em {numero: existe}"""
+        if not isinstance(result, list):
+            return None
+        return {
+            item.get("number", ""): bool(item.get("exists", False))
+            for item in result
+            if isinstance(item, dict)
+        }
+    
+    def whatsapp_numbers(self, instance_name: str, phones: list[str]) -> Optional[dict[str, bool]]:
+        """
+        Verifica vários números e retorna {numero_formatado: tem_whatsapp}
+        
+        Returns:
+            Dicionário por número formatado, ou None se a API retornou erro
+        """
+        return self._parse_numbers_result(self.check_numbers(instance_name, phones))
+    
     # ==================== Utilitários ====================
     
     @staticmethod
     def _format_phone(phone: str) -> str:
-        """Formata o telefone para o padrão da API (somente números)"""
-        # Remove tudo que não é número
-        numbers = ''.join(filter(str.isdigit, phone))
-        
-        # Se não tem código do país (começa com 0 ou tem menos de 12 dígitos), adiciona 55 (Brasil)
-        if numbers.startswith('0'):
-            numbers = numbers[1:]
-        if len(numbers) <= 11:
-            numbers = f"55{numbers}"
-        
-        return numbers
+        """Formata o telefone para o padrão da API (somente números, com código do país)"""
+        return phone_key(phone)
     
     def wait_for_connection(self, instance_name: str, timeout: int = 120) -> bool:
         """
@@ -200,14 +391,126 @@ class EvolutionAPI:
         Returns:
             True se conectou, False se timeout
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        deadline = time.time() + timeout
+        if self.is_connected(instance_name):
+            return True
+        if self.events_url:
+            # Requisições que só voltam com o evento connection.update (ou em
+            # EVENTS_WAIT_SLICE segundos); a API é consultada depois de cada uma
+            while time.time() < deadline:
+                wait = min(EVENTS_WAIT_SLICE, deadline - time.time())
+                if wait_for_state(self.events_url, instance_name, "open", wait) is None:
+                    break
+                if self.is_connected(instance_name):
+                    return True
+        # Receptor fora do ar: volta a consultar a API
+        while time.time() < deadline:
+            time.sleep(min(2, max(0.0, deadline - time.time())))
             if self.is_connected(instance_name):
                 return True
-            time.sleep(2)
         return False
 
 
+class AsyncEvolutionAPI(EvolutionAPI):
+    """
+    Versão asyncio do cliente, com os mesmos métodos (use com await).
+    
+    As requisições rodam num pool de threads sobre a mesma sessão keep-alive,
+    permitindo centenas de chamadas simultâneas sem dependências extras.
+    Os métodos que apenas montam o payload (send_text, send_presence,
+    check_number, get_connection_state...) são herdados e devolvem a
+    corrotina de _request.
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:8080", api_key: str = "whatsapp_sender_secret_key_2024",
+                 max_in_flight: int = 200, timeout: float = 30, policies: Optional[dict] = None,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                 events_url: Optional[str] = DEFAULT_EVENTS_URL):
+        """
+        Args:
+            base_url: URL da Evolution API
+            api_key: Chave de autenticação
+            max_in_flight: Máximo de requisições simultâneas (threads e conexões do pool)
+            timeout: Timeout padrão (segundos) dos endpoints sem política própria
+            policies: {prefixo do endpoint: RetryPolicy} (padrão: DEFAULT_POLICIES)
+            breaker_threshold: Falhas transitórias seguidas que abrem o circuito da instância
+            breaker_reset: Segundos até testar de novo uma instância com circuito aberto
+            events_url: Receptor de webhooks para esperar conexões sem polling (None = só polling)
+        """
+        super().__init__(base_url, api_key, pool_size=max_in_flight, timeout=timeout, policies=policies,
+                         breaker_threshold=breaker_threshold, breaker_reset=breaker_reset, events_url=events_url)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="evolution")
+    
+    async def _request(self, method: str, endpoint: str, json_data: dict = None,
+                       body: Optional[Callable[[], object]] = None) -> dict:
+        """Faz uma requisição para a API sem bloquear o event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(EvolutionAPI._request, self, method, endpoint, json_data, body)
+        )
+    
+    async def is_connected(self, instance_name: str) -> bool:
+        """Verifica se a instância está conectada"""
+        state = await self.get_connection_state(instance_name)
+        return state.get("instance", {}).get("state") == "open"
+    
+    async def send_text_with_typing(self, instance_name: str, phone: str, message: str, typing_delay: float = 3.0) -> dict:
+        """Envia mensagem de texto com indicador de 'digitando...' antes"""
+        await self.send_presence(instance_name, phone, "composing", typing_delay)
+        await asyncio.sleep(typing_delay)
+        return await self.send_text(instance_name, phone, message)
+    
+    async def send_media_file(self, instance_name: str, phone: str, file_path: str, caption: str = "",
+                              media_type: Optional[str] = None) -> dict:
+        """Envia um arquivo local como mídia (leitura, hash e base64 fora do event loop)"""
+        loop = asyncio.get_running_loop()
+        media = await loop.run_in_executor(self._executor, self.media.get, file_path)
+        return await self._send_encoded(instance_name, phone, media, caption, media_type)
+    
+    async def has_whatsapp(self, instance_name: str, phone: str) -> bool:
+        """Verifica se um número tem WhatsApp (retorna bool)"""
+        result = await self.check_number(instance_name, phone)
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get("exists", False)
+        return False
+    
+    async def whatsapp_numbers(self, instance_name: str, phones: list[str]) -> Optional[dict[str, bool]]:
+        """Verifica vários números e retorna {numero_formatado: tem_whatsapp}"""
+        return self._parse_numbers_result(await self.check_numbers(instance_name, phones))
+    
+    async def wait_for_connection(self, instance_name: str, timeout: int = 120) -> bool:
+        """Aguarda a conexão do WhatsApp (após escanear QR Code)"""
+        deadline = time.time() + timeout
+        if await self.is_connected(instance_name):
+            return True
+        if self.events_url:
+            loop = asyncio.get_running_loop()
+            while time.time() < deadline:
+                wait = min(EVENTS_WAIT_SLICE, deadline - time.time())
+                state = await loop.run_in_executor(
+                    self._executor, partial(wait_for_state, self.events_url, instance_name, "open", wait))
+                if state is None:
+                    break
+                if await self.is_connected(instance_name):
+                    return True
+        while time.time() < deadline:
+            await asyncio.sleep(min(2, max(0.0, deadline - time.time())))
+            if await self.is_connected(instance_name):
+                return True
+        return False
+    
+    def close(self):
+        """Fecha as conexões do pool e encerra as threads"""
+        self._executor.shutdown(wait=False)
+        super().close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        self.close()
+
+
 def main():
     """Exemplo de uso"""
     api = EvolutionAPI()
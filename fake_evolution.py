@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Fake Evolution
+Servidor local que imita os endpoints da Evolution API usados pelo
+evolution_client, com latência, erros e 429 configuráveis (benchmarks e
+ensaios sem celular pareado)
+"""
+
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+@dataclass
+class FakeConfig:
+    """Comportamento do servidor falso"""
+    latency: float = 0.0           # atraso base de cada resposta (segundos)
+    latency_jitter: float = 0.0    # atraso extra aleatório (0 a N segundos)
+    error_rate: float = 0.0        # fração de respostas 500
+    throttle_rate: float = 0.0     # fração de respostas 429
+    retry_after: float = 0.0       # Retry-After enviado com os 429
+    exists_rate: float = 1.0       # fração dos números que "têm WhatsApp"
+    seed: Optional[int] = None
+
+
+class FakeEvolutionServer:
+    """
+    Evolution API em memória, numa thread (ThreadingHTTPServer).
+
+    Endpoints: /message/sendText, /message/sendMedia, /chat/sendPresence, /chat/whatsappNumbers,
+    /instance/connectionState, /instance/fetchInstances e /instance/create.
+    Todas as instâncias aparecem conectadas. Uso:
+
+        with FakeEvolutionServer(FakeConfig(latency=0.01)) as fake:
+            api = EvolutionAPI(fake.url)
+    """
+
+    def __init__(self, config: Optional[FakeConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            config: Latência e taxas de erro (padrão: resposta imediata, sem erros)
+            host: Interface local
+            port: Porta (0 = escolhe uma livre)
+        """
+        self.config = config or FakeConfig()
+        self.requests = Counter()   # (rota, status) -> quantidade
+        self.sent: list[tuple] = []  # (instância, número, texto)
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 256
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeEvolutionServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-evolution", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, route: str, status: Optional[int] = None) -> int:
+        """Requisições recebidas numa rota (ex: '/message/sendText')"""
+        with self._lock:
+            return sum(n for (r, s), n in self.requests.items()
+                       if r == route and (status is None or s == status))
+
+    # ==================== Respostas ====================
+
+    def _fault(self) -> Optional[int]:
+        """Sorteia um erro injetado (429 ou 500), ou None"""
+        config = self.config
+        if not config.error_rate and not config.throttle_rate:
+            return None
+        with self._lock:
+            draw = self._rng.random()
+        if draw < config.throttle_rate:
+            return 429
+        if draw < config.throttle_rate + config.error_rate:
+            return 500
+        return None
+
+    def _exists(self, numero: str) -> bool:
+        if self.config.exists_rate >= 1:
+            return True
+        # Determinístico por número: o mesmo número sempre dá o mesmo resultado
+        return (zlib.crc32(numero.encode()) % 1000) / 1000 < self.config.exists_rate
+
+    def _route(self, method: str, path: str, body: dict) -> tuple[int, object]:
+        parts = path.split('?', 1)[0].strip('/').split('/')
+        route = '/' + '/'.join(parts[:2])
+        instance = parts[2] if len(parts) > 2 else None
+
+        if route == "/message/sendText" and method == "POST":
+            with self._lock:
+                self.sent.append((instance, body.get("number"), body.get("text")))
+                message_id = len(self.sent)
+            return 201, {"key": {"remoteJid": f"{body.get('number')}@s.whatsapp.net", "fromMe": True,
+                                 "id": f"FAKE{message_id:012d}"}, "status": "PENDING"}
+        if route == "/message/sendMedia" and method == "POST":
+            with self._lock:
+                self.sent.append((instance, body.get("number"), body.get("caption")))
+                message_id = len(self.sent)
+            return 201, {"key": {"remoteJid": f"{body.get('number')}@s.whatsapp.net", "fromMe": True,
+                                 "id": f"FAKE{message_id:012d}"}, "status": "PENDING",
+                         "mediaSize": len(body.get("media") or "")}
+        if route == "/chat/sendPresence" and method == "POST":
+            return 201, {}
+        if route == "/chat/whatsappNumbers" and method == "POST":
+            return 200, [{"number": numero, "exists": self._exists(numero),
+                          "jid": f"{numero}@s.whatsapp.net"} for numero in body.get("numbers", [])]
+        if route == "/instance/connectionState" and method == "GET":
+            return 200, {"instance": {"instanceName": instance, "state": "open"}}
+        if route == "/instance/fetchInstances" and method == "GET":
+            return 200, [{"name": "business_sender", "connectionStatus": "open"}]
+        if route == "/instance/create" and method == "POST":
+            return 201, {"instance": {"instanceName": body.get("instanceName"), "status": "created"}}
+        return 404, {"message": f"Cannot {method} {path}"}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, como a Evolution real
+            disable_nagle_algorithm = True  # cabeçalho e corpo saem em writes separados
+
+            def _serve(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length)) if length else {}
+                except ValueError:
+                    body = {}
+
+                config = server.config
+                delay = config.latency
+                if config.latency_jitter:
+                    with server._lock:
+                        delay += server._rng.uniform(0, config.latency_jitter)
+                if delay > 0:
+                    time.sleep(delay)
+
+                headers = {}
+                fault = server._fault()
+                if fault == 429:
+                    status, payload = 429, {"message": "Too Many Requests"}
+                    headers["Retry-After"] = f"{config.retry_after:g}"
+                elif fault == 500:
+                    status, payload = 500, {"message": "Internal Server Error"}
+                else:
+                    status, payload = server._route(method, self.path, body)
+
+                route = '/' + '/'.join(self.path.split('?', 1)[0].strip('/').split('/')[:2])
+                with server._lock:
+                    server.requests[(route, status)] += 1
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_DELETE(self):
+                self._serve("DELETE")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python3 fake_evolution.py [porta] [latência] [taxa_erro] [taxa_429]
+    args = sys.argv[1:] + [None] * 4
+    config = FakeConfig(latency=float(args[1] or 0), error_rate=float(args[2] or 0),
+                        throttle_rate=float(args[3] or 0))
+    fake = FakeEvolutionServer(config, port=int(args[0] or 8080)).start()
+    print(f"🧪 Evolution API falsa em {fake.url} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Instance Pool
+Distribui os envios entre várias instâncias (números) da Evolution API
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
+
+from evolution_client import EvolutionAPI
+from phone_numbers import phone_key
+
+
+DEFAULT_ASSIGNMENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "campanhas", "instancias.log")
+# Envios por número (instância) por dia, quando WHATSAPP_QUOTA não diz outra coisa
+DEFAULT_DAILY_QUOTA = 40
+
+
+def instances_from_env(default: str = "business_sender") -> list[str]:
+    """Lê as instâncias de WHATSAPP_INSTANCES (separadas por vírgula)"""
+    value = os.environ.get("WHATSAPP_INSTANCES", default)
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def quotas_from_env(instance_names: list[str], default: int = DEFAULT_DAILY_QUOTA) -> dict[str, int]:
+    """
+    Cota diária de cada instância em WHATSAPP_QUOTA: "40" vale para todas,
+    "inst1:40,inst2:20" define por instância (as não listadas ficam com o padrão;
+    "30,inst1:40" muda o padrão das demais)
+
+    Raises:
+        ValueError: WHATSAPP_QUOTA mal formada
+    """
+    explicit = {}
+    for item in os.environ.get("WHATSAPP_QUOTA", "").split(","):
+        name, _, amount = item.strip().rpartition(":")
+        if not amount:
+            continue
+        try:
+            value = int(amount)
+        except ValueError:
+            raise ValueError(f"WHATSAPP_QUOTA inválida: {item.strip()!r} (use 40 ou inst1:40,inst2:20)")
+        if name:
+            explicit[name.strip()] = value
+        else:
+            default = value
+    # O valor sem nome só vale para quem não tem inst:N, em qualquer ordem
+    return {name: explicit.get(name, default) for name in instance_names} | explicit
+
+
+class InstancePool:
+    """
+    Conjunto de instâncias conectadas, cada uma com sua cota de envios.
+
+    - Saúde: o estado de conexão de cada instância fica em cache e é
+      atualizado por sondagens periódicas (em segundo plano, se iniciadas)
+    - Distribuição: contatos novos vão para a instância saudável com
+      menos envios; quem já recebeu mensagem continua na mesma instância
+      (follow-up sai do mesmo número)
+    - Vínculos contato -> instância ficam em campanhas/instancias.log
+      (numero|instancia|timestamp)
+    """
+
+    def __init__(self, api: EvolutionAPI, instance_names: list[str], quota: Union[int, dict[str, int]] = 20,
+                 probe_interval: float = 30.0, assignments_path: str = DEFAULT_ASSIGNMENTS_PATH,
+                 used: Optional[dict[str, int]] = None):
+        """
+        Args:
+            api: Cliente da Evolution API
+            instance_names: Nomes das instâncias do pool
+            quota: Máximo de envios por instância (o mesmo para todas, ou
+                   {instancia: cota}; instância fora do dicionário não envia)
+            probe_interval: Validade (segundos) do estado de conexão em cache
+            assignments_path: Arquivo com os vínculos contato -> instância
+            used: Envios que já contam na cota (ex: os de hoje, para uma cota diária)
+        """
+        self.api = api
+        self.instance_names = list(instance_names)
+        if isinstance(quota, dict):
+            self.quota = {name: quota.get(name, 0) for name in self.instance_names}
+        else:
+            self.quota = {name: quota for name in self.instance_names}
+        self.probe_interval = probe_interval
+        self.assignments_path = assignments_path
+
+        self.used = {name: (used or {}).get(name, 0) for name in self.instance_names}
+        self.assignments: dict[str, str] = {}
+        self._health: dict[str, tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load_assignments()
+
+    @staticmethod
+    def normalize(phone: str) -> str:
+        return phone_key(phone)
+
+    def _load_assignments(self):
+        if not self.assignments_path:
+            return
+        try:
+            with open(self.assignments_path, 'r') as f:
+                for line in f:
+                    parts = line.strip().split('|')
+                    if len(parts) >= 2:
+                        self.assignments[parts[0]] = parts[1]
+        except FileNotFoundError:
+            pass
+
+    # ==================== Saúde ====================
+
+    def refresh(self):
+        """Sonda todas as instâncias em paralelo e atualiza o cache"""
+        if not self.instance_names:
+            return
+        with ThreadPoolExecutor(max_workers=len(self.instance_names)) as executor:
+            states = dict(zip(self.instance_names, executor.map(self.api.is_connected, self.instance_names)))
+        checked_at = time.monotonic()
+        with self._lock:
+            for name, connected in states.items():
+                self._health[name] = (connected, checked_at)
+
+    def is_healthy(self, name: str) -> bool:
+        """Estado de conexão em cache (sonda de novo se estiver vencido)"""
+        if self.api.circuit_open(name):
+            return False  # falhando seguidamente: nem sonda até o circuito reabrir
+        entry = self._health.get(name)
+        if entry is None or time.monotonic() - entry[1] > self.probe_interval:
+            connected = self.api.is_connected(name)
+            with self._lock:
+                self._health[name] = (connected, time.monotonic())
+            return connected
+        return entry[0]
+
+    def mark_unhealthy(self, name: str):
+        """Força nova sondagem da instância na próxima consulta"""
+        with self._lock:
+            self._health.pop(name, None)
+
+    def healthy_instances(self) -> list[str]:
+        return [name for name in self.instance_names if self.is_healthy(name)]
+
+    def start_probing(self):
+        """Inicia as sondagens periódicas em segundo plano"""
+        if self._thread:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                self.refresh()
+                self._stop.wait(self.probe_interval)
+
+        self.refresh()
+        self._thread = threading.Thread(target=loop, name="instance-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ==================== Distribuição ====================
+
+    def has_capacity(self, name: str) -> bool:
+        return self.used.get(name, 0) < self.quota.get(name, 0)
+
+    def exhausted(self) -> bool:
+        """True se nenhuma instância tem cota restante"""
+        return not any(self.has_capacity(name) for name in self.instance_names)
+
+    def assign(self, phone: str) -> Optional[str]:
+        """
+        Escolhe a instância que vai enviar para o contato e reserva a cota.
+
+        Returns:
+            Nome da instância, ou None se o contato deve ficar para depois
+            (instância vinculada fora do ar ou sem cota)
+        """
+        numero = self.normalize(phone)
+        sticky = self.assignments.get(numero)
+        if sticky in self.quota:
+            candidates = [sticky]
+        else:
+            candidates = sorted(self.instance_names, key=lambda name: self.used[name])
+
+        for name in candidates:
+            if self.has_capacity(name) and self.is_healthy(name):
+                with self._lock:
+                    self.used[name] += 1
+                return name
+        return None
+
+    def release(self, name: str):
+        """Devolve a cota reservada de um envio que não aconteceu"""
+        with self._lock:
+            self.used[name] = max(0, self.used[name] - 1)
+
+    def record_send(self, name: str, phone: str):
+        """Vincula o contato à instância que enviou"""
+        numero = self.normalize(phone)
+        with self._lock:
+            if self.assignments.get(numero) == name:
+                return
+            self.assignments[numero] = name
+            if self.assignments_path:
+                os.makedirs(os.path.dirname(self.assignments_path) or '.', exist_ok=True)
+                with open(self.assignments_path, 'a') as f:
+                    f.write(f"{numero}|{name}|{time.strftime('%Y-%m-%dT%H:%M:%S')}\n")
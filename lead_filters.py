@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Lead Filters
+Filtros de contatos (telefone válido, blocklist, já enviados, site
+próprio, avaliação) combinados num pipeline que roda por colunas, em
+blocos, igual no menu interativo e no cron
+"""
+
+import os
+from dataclasses import dataclass
+from itertools import islice
+from typing import Container, Iterable, Iterator, Optional, Sequence
+
+from phone_numbers import normalize_many
+
+
+# Plataformas genéricas (quem só tem isso "não tem site profissional próprio").
+# Domínios casam pelo sufixo do host (m.facebook.com), entradas com caminho
+# pelo host + início do caminho, e nomes sem ponto por qualquer parte do host.
+GENERIC_PLATFORMS = (
+    # Redes sociais
+    'instagram.com', 'facebook.com', 'fb.com', 'fb.me',
+    'twitter.com', 'x.com', 'linkedin.com', 'tiktok.com',
+    'youtube.com', 'youtu.be', 'pinterest.com',
+    # Plataformas de sites gratuitos/genéricos
+    'wix.com', 'wixsite.com', 'weebly.com', 'squarespace.com',
+    'wordpress.com', 'blogspot.com', 'blogger.com',
+    'sites.google.com', 'google.com/maps', 'g.page',
+    'carrd.co', 'linktree', 'linktr.ee', 'bio.link',
+    # Marketplaces e diretórios
+    'ifood.com', 'rappi.com', 'uber.com', 'ubereats.com',
+    'mercadolivre.com', 'olx.com', 'enjoei.com',
+    'getninjas.com', 'habitissimo.com',
+    # Outros genéricos
+    'whatsapp.com', 'wa.me', 'bit.ly', 'goo.gl',
+    'page.link', 't.me', 'telegram.me',
+)
+
+# Segundos níveis de domínios de país (olx.com.br, google.com.br/maps): o
+# host casa com a plataforma pelo nome registrado, ignorando o país
+CC_SECOND_LEVELS = frozenset(('com', 'net', 'org', 'co', 'edu', 'gov', 'blog'))
+
+# Valores de website que significam "sem site"
+_EMPTY = {None, '', 'N/A', 'n/a', '-'}
+
+# Contatos avaliados por vez
+DEFAULT_CHUNK = 512
+
+
+def hostname(url) -> tuple[str, str]:
+    """
+    Host (minúsculo, sem www., porta ou usuário) e caminho de uma URL.
+
+    Returns:
+        (host, caminho); ('', '') se não houver URL
+    """
+    text = str(url or '').strip().lower()
+    if not text or text in _EMPTY:
+        return '', ''
+    scheme = text.find('://')
+    if scheme != -1:
+        text = text[scheme + 3:]
+    cut = len(text)
+    for separator in '/?#':
+        position = text.find(separator)
+        if position != -1 and position < cut:
+            cut = position
+    host, path = text[:cut], text[cut:]
+    host = host.rpartition('@')[2].partition(':')[0].rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    return host, path
+
+
+class PlatformIndex:
+    """
+    Índice das plataformas genéricas por sufixo de host.
+
+    Uma URL é analisada uma vez e cada sufixo do host (a.b.com, b.com,
+    com) vira uma consulta num set, em vez de procurar cada plataforma
+    como substring (que também casava 'x.com' dentro de 'fox.com').
+    Hosts e plataformas com domínio de país (.com.br, .net.br...) perdem
+    o país antes da consulta: olx.com.br casa com olx.com e vice-versa.
+    """
+
+    def __init__(self, platforms: Iterable[str] = GENERIC_PLATFORMS):
+        self.domains: set[str] = set()
+        self.paths: dict[str, list[str]] = {}
+        self.labels: set[str] = set()
+        self._memo: dict = {}
+        for platform in platforms:
+            self.add(platform)
+
+    def add(self, platform: str):
+        platform = platform.strip().lower()
+        if not platform:
+            return
+        host, _, path = platform.partition('/')
+        host = '.'.join(self._labels(host))
+        if path:
+            self.paths.setdefault(host, []).append('/' + path)
+        elif '.' in host:
+            self.domains.add(host)
+        else:
+            self.labels.add(host)
+        self._memo.clear()
+
+    @staticmethod
+    def _labels(host: str) -> list[str]:
+        """Partes do host, sem o país de um domínio como .com.br"""
+        labels = host.split('.')
+        if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in CC_SECOND_LEVELS:
+            del labels[-1]
+        return labels
+
+    def _lookup(self, url) -> bool:
+        host, path = hostname(url)
+        if not host:
+            return False
+        labels = self._labels(host)
+        for i in range(len(labels)):
+            suffix = '.'.join(labels[i:])
+            if suffix in self.domains:
+                return True
+            prefixes = self.paths.get(suffix)
+            if prefixes and any(path.startswith(prefix) for prefix in prefixes):
+                return True
+        return bool(self.labels) and any(label in self.labels for label in labels)
+
+    def match(self, url) -> bool:
+        """A URL é de uma plataforma genérica?"""
+        memo = self._memo
+        if url not in memo:
+            if len(memo) > 100_000:
+                memo.clear()
+            memo[url] = self._lookup(url)
+        return memo[url]
+
+    def needs_site(self, websites: Sequence) -> list[bool]:
+        """Coluna de websites -> precisa de site profissional (vazio ou plataforma genérica)"""
+        match = self.match
+        return [website in _EMPTY or not str(website).strip() or match(website) for website in websites]
+
+
+PLATFORM_INDEX = PlatformIndex()
+
+
+def needs_professional_site(website) -> bool:
+    """
+    Retorna True se o negócio PRECISA de um site profissional.
+    - Sem website = True
+    - Website genérico (Instagram, Wix, etc) = True
+    - Website próprio com domínio = False
+    """
+    return PLATFORM_INDEX.needs_site((website,))[0]
+
+
+def _rating(value) -> Optional[float]:
+    try:
+        return float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class FilterConfig:
+    """Filtros de uma campanha (arquivo filtros.txt na pasta da campanha)"""
+    site: str = "todos"                 # todos | sem_site | com_site
+    min_rating: Optional[float] = None  # avaliação mínima (sem avaliação não passa)
+    platforms: tuple = ()               # plataformas genéricas extras
+
+
+def load_config(campaign_dir: Optional[str]) -> FilterConfig:
+    """
+    Lê filtros.txt (chave = valor, # comenta):
+
+        site = sem_site
+        avaliacao_min = 4.0
+        plataformas = meusite.com.br, outra.com
+
+    Returns:
+        FilterConfig (padrão: sem filtros além de telefone, blocklist e enviados)
+    """
+    if not campaign_dir:
+        return FilterConfig()
+    values = {}
+    try:
+        with open(os.path.join(campaign_dir, "filtros.txt"), 'r') as f:
+            for line in f:
+                key, sep, value = line.split('#', 1)[0].partition('=')
+                if sep:
+                    values[key.strip().lower()] = value.strip()
+    except FileNotFoundError:
+        return FilterConfig()
+
+    site = values.get("site", "todos").lower()
+    if site not in ("todos", "sem_site", "com_site"):
+        print(f"⚠️  filtros.txt: site='{site}' desconhecido (use todos, sem_site ou com_site)")
+        site = "todos"
+    return FilterConfig(
+        site=site,
+        min_rating=_rating(values["avaliacao_min"]) if values.get("avaliacao_min") else None,
+        platforms=tuple(p.strip() for p in values.get("plataformas", "").split(',') if p.strip()),
+    )
+
+
+class LeadPipeline:
+    """
+    Filtros combinados, avaliados por colunas sobre blocos de contatos.
+
+    Cada bloco vira colunas (nome, telefone, avaliação, website); os
+    telefones são normalizados de uma vez, os sites classificados pelo
+    PlatformIndex (com memória por URL) e todos os predicados ativos se
+    combinam numa única passada. Predicados desligados não custam nada.
+    Linhas no formato da planilha: (nome, telefone, endereco, avaliacao,
+    website, ...).
+    """
+
+    def __init__(self, config: Optional[FilterConfig] = None, blocked: Optional[Container[str]] = None,
+                 sent: Optional[set] = None, index: Optional[PlatformIndex] = None,
+                 chunk_size: int = DEFAULT_CHUNK):
+        """
+        Args:
+            config: Filtros da campanha (site, avaliação mínima, plataformas extras)
+            blocked: Chaves de telefone (phone_key) na blocklist (set ou SuppressionIndex)
+            sent: Chaves de telefone já contatadas
+            index: Índice de plataformas (padrão: GENERIC_PLATFORMS + as da campanha)
+            chunk_size: Contatos avaliados por bloco
+        """
+        self.config = config or FilterConfig()
+        self.blocked = blocked or set()
+        self.sent = sent or set()
+        if index is None:
+            index = PLATFORM_INDEX
+            if self.config.platforms:
+                index = PlatformIndex(GENERIC_PLATFORMS + self.config.platforms)
+        self.index = index
+        self.chunk_size = max(1, chunk_size)
+
+    def mask(self, rows: Sequence[tuple], keys: Optional[Sequence[str]] = None) -> list[bool]:
+        """
+        Quais linhas passam em todos os filtros.
+
+        Args:
+            rows: Bloco de linhas
+            keys: Chaves de telefone já calculadas (senão, normaliza a coluna)
+        """
+        names = [row[0] if row else None for row in rows]
+        phones = [row[1] if len(row) > 1 else None for row in rows]
+        keep = [bool(name) and bool(phone) and str(phone) != 'N/A' for name, phone in zip(names, phones)]
+
+        blocked, sent = self.blocked, self.sent
+        if blocked or sent:
+            if keys is None:
+                keys = normalize_many(phones, keys=True)
+            keep = [ok and key not in sent and key not in blocked for ok, key in zip(keep, keys)]
+
+        site = self.config.site
+        if site != "todos":
+            needs = self.index.needs_site([row[4] if len(row) > 4 else None for row in rows])
+            wanted = site == "sem_site"
+            keep = [ok and need == wanted for ok, need in zip(keep, needs)]
+
+        if self.config.min_rating is not None:
+            minimum = self.config.min_rating
+            ratings = [_rating(row[3]) if len(row) > 3 else None for row in rows]
+            keep = [ok and rating is not None and rating >= minimum for ok, rating in zip(keep, ratings)]
+        return keep
+
+    def filter(self, rows: Iterable[tuple], key_column: Optional[int] = None) -> Iterator[tuple]:
+        """
+        Linhas que passam, lidas em blocos sob demanda (16, 32... até chunk_size).
+
+        Args:
+            rows: Qualquer iterável de linhas (planilha, cursor do CampaignStore...)
+            key_column: Coluna que já traz a chave do telefone (ex: -1 nas linhas do CampaignStore)
+        """
+        iterator = iter(rows)
+        size = min(16, self.chunk_size)  # começa pequeno: take() de poucos não lê a campanha inteira
+        while True:
+            chunk = list(islice(iterator, size))
+            if not chunk:
+                return
+            size = min(size * 2, self.chunk_size)
+            keys = [row[key_column] for row in chunk] if key_column is not None else None
+            yield from (row for row, ok in zip(chunk, self.mask(chunk, keys)) if ok)
+
+    def take(self, rows: Iterable[tuple], limit: int, key_column: Optional[int] = None) -> list[tuple]:
+        """Primeiras `limit` linhas que passam (para de ler ao completar)"""
+        return list(islice(self.filter(rows, key_column), limit))
+
+
+def campaign_pipeline(campaign_dir: Optional[str] = None, blocked: Optional[Container[str]] = None,
+                      sent: Optional[set] = None) -> LeadPipeline:
+    """Pipeline com os filtros da campanha (filtros.txt)"""
+    return LeadPipeline(load_config(campaign_dir), blocked=blocked, sent=sent)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from contact_snapshot import iter_rows
+    from suppression_index import SuppressionIndex
+
+    # Uso: python3 lead_filters.py <planilha.xlsx> [pasta_campanha]
+    if len(sys.argv) < 2:
+        print("Uso: python3 lead_filters.py <planilha.xlsx> [pasta_campanha]")
+        sys.exit(1)
+    campaign_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    campanhas_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "campanhas")
+    pipeline = campaign_pipeline(campaign_dir, blocked=SuppressionIndex(campanhas_dir))
+    rows = list(iter_rows(sys.argv[1]))
+    start = time.perf_counter()
+    kept = sum(1 for _ in pipeline.filter(rows))
+    elapsed = time.perf_counter() - start
+    per_row = elapsed / len(rows) * 1e6 if rows else 0
+    print(f"🔎 {kept} de {len(rows)} contatos passam nos filtros ({pipeline.config}) "
+          f"em {elapsed * 1000:.1f} ms ({per_row:.2f} µs/linha)")
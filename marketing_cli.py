@@ -0,0 +1,962 @@
+#!/usr/bin/env python3
+"""
+Marketing CLI
+Comandos das campanhas (envio, cron, follow-up, estatísticas, mescla e
+blocklist) num só ponto de entrada; os scripts shell são menus sobre ele.
+Cada comando importa só os módulos que usa: o módulo em si carrega apenas
+a biblioteca padrão, e nenhum comando puxa requests ou openpyxl antes da
+hora em que precisa deles.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CAMPANHAS_DIR = os.path.join(BASE_DIR, "campanhas")
+LOG_DIR = os.path.join(BASE_DIR, "logs")
+BLOCKLIST_PATH = os.path.join(CAMPANHAS_DIR, "blocklist.log")
+
+DEFAULT_LIMIT = 20
+DEFAULT_MESSAGE = "01_apresentacao.txt"
+FOLLOWUP_MESSAGE = "followup_48h.txt"
+
+# Follow-up usado quando a campanha não tem mensagens/followup_48h.txt
+DEFAULT_FOLLOWUP_TEXT = """Olá! 👋
+
+Entrei em contato há alguns dias sobre desenvolvimento de *sites profissionais* para a *{nome}*.
+
+Sei que você deve estar ocupado(a), mas queria saber se teve a chance de pensar sobre isso?
+
+🎁 *Oferta especial*: Se fechar até o fim da semana, ganhe:
+✅ Hospedagem grátis por 1 ano
+✅ Domínio .com.br incluso
+✅ Suporte prioritário
+
+Posso esclarecer alguma dúvida? 😊"""
+
+# Módulos que não podem ser carregados só para abrir um comando
+HEAVY_MODULES = ("requests", "openpyxl")
+
+
+class UsageError(ValueError):
+    """Argumentos inválidos para o comando"""
+
+
+def log(mensagem: str = ""):
+    """Linha com data e hora (saída do cron, acrescentada ao logs/auto_<dia>.log)"""
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {mensagem}", flush=True)
+
+
+def parse_args(args: list[str], flags: tuple = (), options: tuple = ()) -> tuple[list[str], dict]:
+    """
+    Separa posicionais, flags e opções (--opcao valor ou --opcao=valor).
+
+    --profile é flag ou opção (--profile=trace.json).
+
+    Raises:
+        UsageError: Opção desconhecida ou sem valor
+    """
+    positional, parsed = [], {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        name, sep, value = arg.partition('=')
+        if arg in flags:
+            parsed[arg.lstrip('-')] = True
+        elif name in options and sep:
+            parsed[name.lstrip('-')] = value
+        elif arg in options:
+            if i + 1 >= len(args):
+                raise UsageError(f"{arg} precisa de um valor")
+            i += 1
+            parsed[arg.lstrip('-')] = args[i]
+        elif arg.startswith('-') and arg != '-':
+            raise UsageError(f"Opção desconhecida: {arg}")
+        else:
+            positional.append(arg)
+        i += 1
+    return positional, parsed
+
+
+def _int_option(options: dict, name: str, default: int) -> int:
+    try:
+        return int(options.get(name, default))
+    except ValueError:
+        raise UsageError(f"--{name} precisa ser um número")
+
+
+def _profile_path(options: dict) -> Optional[str]:
+    """--profile (logs/profile_<data>.json) ou --profile=arquivo"""
+    value = options.get("profile")
+    if not value:
+        return None
+    return os.path.abspath(value) if isinstance(value, str) else os.path.join(
+        LOG_DIR, f"profile_{datetime.now():%Y-%m-%d_%H%M%S}.json")
+
+
+def campaign_path(name: str) -> str:
+    """Pasta da campanha: caminho existente ou tipo/cidade dentro de campanhas/"""
+    if os.path.isdir(name):
+        return os.path.abspath(name)
+    return os.path.join(CAMPANHAS_DIR, name)
+
+
+def message_path(campaign_dir: str, name: str) -> str:
+    """Arquivo de mensagem: caminho existente ou nome dentro de <campanha>/mensagens/"""
+    if os.path.isfile(name):
+        return os.path.abspath(name)
+    return os.path.join(campaign_dir, "mensagens", name)
+
+
+def _followup_msg_num(row: tuple) -> int:
+    """Número da mensagem de um lote de remarketing (coluna Msg_Anterior + 1)"""
+    return int(row[5]) + 1 if len(row) > 5 and row[5] else 2
+
+
+def open_store(campanhas_dir: Optional[str] = None):
+    """CampaignStore das campanhas (estado.db dentro da pasta campanhas/)"""
+    from campaign_store import CampaignStore
+
+    campanhas_dir = campanhas_dir or CAMPANHAS_DIR
+    return CampaignStore(db_path=os.path.join(campanhas_dir, "estado.db"), campanhas_dir=campanhas_dir)
+
+
+# ==================== Lotes e envio ====================
+
+def pending_batch(campaign_dir: str, limit: int, store=None) -> list[tuple]:
+    """
+    Primeiros `limit` contatos nunca enviados e fora da blocklist, com os
+    filtros da campanha (filtros.txt), no formato de batch_file.HEADERS.
+    """
+    from lead_filters import campaign_pipeline
+
+    own = store is None
+    store = store or open_store()
+    try:
+        # Estado indexado (importa só o que mudou em enviados.log, blocklist.log e contatos.xlsx)
+        store.sync(campaign_dir)
+        pipeline = campaign_pipeline(campaign_dir)
+        return [row[:5] for row in pipeline.take(store.iter_pending(campaign_dir), limit, key_column=-1)]
+    finally:
+        if own:
+            store.close()
+
+
+def followup_batch(campaign_dir: str, limit: int) -> list[tuple]:
+    """Follow-ups vencidos pela cadência da campanha, no formato de batch_file.REMARKETING_HEADERS"""
+    with open_store() as store:
+        store.sync(campaign_dir)
+        return [tuple(row[:5]) + (row[6],) for row in store.followup_due([campaign_dir], limit=limit)]
+
+
+def send_batch(batch_path: str, message: str, resume: bool = False, profile: Optional[str] = None,
+               daemon=None) -> Optional[dict]:
+    """
+    Envia um lote (journal ao lado dele): no daemon, se estiver rodando,
+    senão neste processo.
+
+    Args:
+        batch_path: Lote .jsonl ou planilha
+        message: Template da mensagem
+        resume: Continua o journal do lote (sem reenviar)
+        profile: Trace do --profile (opcional)
+        daemon: SenderDaemon quando o comando já roda dentro dele
+
+    Returns:
+        Resumo do envio, ou None se não foi possível configurar
+    """
+    args = {"xlsx": os.path.abspath(batch_path), "message": message, "resume": resume, "profile": profile}
+    if daemon is not None:
+        return daemon.job_send(args)
+
+    from sender_daemon import submit
+    reply = submit("send", args)
+    if reply is not None:
+        if reply.get("error"):
+            print(f"❌ {reply['error']}")
+        return reply.get("result")
+
+    # Sem daemon: cliente da API, verificador e instâncias só agora
+    import metrics
+    import profiler
+    from instance_pool import instances_from_env
+    from send_journal import SendJournal, journal_path
+    from suppression_index import SuppressionIndex
+    from whatsapp_sender import WhatsAppSender
+
+    if profile:
+        profiler.enable(profile)
+    sender = blocklist = None
+    try:
+        instances = instances_from_env()
+        blocklist = SuppressionIndex(CAMPANHAS_DIR)
+        sender = WhatsAppSender(instance_name=instances[0], instances=instances, blocklist=blocklist)
+        with profiler.span("setup"):
+            ready = sender.setup()
+        if not ready:
+            print("\n❌ Falha ao configurar. Verifique se o Docker está rodando.")
+            return None
+        metrics.start_from_env()
+        print(f"\n📂 Lendo contatos de: {batch_path}")
+        try:
+            journal = SendJournal(journal_path(batch_path), resume=resume)
+        except FileExistsError as e:
+            print(f"\n❌ {e}")
+            return None
+        with journal:
+            return sender.send_messages(sender.iter_contacts_from_xlsx(batch_path), message,
+                                        delay_seconds=60.0, verify_whatsapp=True, journal=journal)
+    finally:
+        # As threads de envio são encerradas por send_messages
+        if sender is not None:
+            sender.close()
+        if blocklist is not None:
+            blocklist.close()
+        profiler.finish()
+
+
+def register_journal(batch_path: str, sent_log: str,
+                     msg_num: Callable[[tuple], int] = lambda row: 1) -> int:
+    """
+    Registra no enviados.log o que o journal do lote confirma (0 se não
+    houver journal), e no descartados.log ao lado os contatos sem WhatsApp
+    ou com falha definitiva
+    """
+    from send_journal import apply_journal, journal_path
+
+    if not os.path.exists(journal_path(batch_path)):
+        return 0
+    return apply_journal(batch_path, sent_log, msg_num=msg_num,
+                         discard_log=os.path.join(os.path.dirname(sent_log), "descartados.log"))
+
+
+def _confirm(question: str) -> bool:
+    try:
+        return input(question).strip().lower() == 's'
+    except EOFError:
+        return False
+
+
+def _interactive_send(batch_path: str, sent_log: str, build: Callable[[], list], headers: tuple,
+                      message: str, msg_num: Callable[[tuple], int], options: dict, labels: dict,
+                      daemon=None) -> int:
+    """
+    Fluxo do menu: registra o lote anterior interrompido, gera o lote,
+    mostra a mensagem, confirma, envia e registra o que o journal confirma.
+    """
+    from batch_file import write_batch
+
+    recovered = register_journal(batch_path, sent_log, msg_num)
+    if recovered:
+        print(f"♻️  Lote anterior interrompido: {recovered} envio(s) registrados")
+
+    print(f"\n📋 {labels['building']}")
+    batch = build()
+    if not batch:
+        print(f"⚠️  {labels['empty']}")
+        return 0
+    write_batch(batch_path, batch, headers)
+    print(f"✅ {labels['built'].format(count=len(batch))}")
+
+    print("\n" + "=" * 50)
+    print(f"📝 {labels['preview']}")
+    print("=" * 50)
+    print(message)
+    print("=" * 50)
+
+    if not options.get("y") and not _confirm(f"\n⚠️  {labels['confirm'].format(count=len(batch))} (s/N): "):
+        print("Operação cancelada")
+        os.remove(batch_path)
+        return 0
+
+    print(f"\n📤 {labels['sending']}")
+    try:
+        send_batch(batch_path, message, profile=_profile_path(options), daemon=daemon)
+    except KeyboardInterrupt:
+        print("\n⚠️  Envio interrompido; registrando só o que foi enviado")
+
+    # Só o que o journal confirma vai para o enviados.log (com timestamp, para o remarketing)
+    registered = register_journal(batch_path, sent_log, msg_num)
+    print(f"\n✅ {labels['done'].format(count=registered)}")
+    os.remove(batch_path)
+    return 0
+
+
+def cmd_send(args: list[str], daemon=None) -> int:
+    positional, options = parse_args(args, flags=("-y", "--profile"), options=("--mensagem", "--limite", "--profile"))
+    if len(positional) != 1:
+        raise UsageError("Informe a campanha")
+    campaign_dir = campaign_path(positional[0])
+    message_file = message_path(campaign_dir, options.get("mensagem", DEFAULT_MESSAGE))
+    if not os.path.isfile(message_file):
+        print(f"❌ Arquivo de mensagem não encontrado: {message_file}")
+        return 1
+    limit = _int_option(options, "limite", DEFAULT_LIMIT)
+    from batch_file import HEADERS
+    from message_templates import load_template
+
+    message = load_template(message_file).text
+    return _interactive_send(
+        os.path.join(campaign_dir, "batch_atual.jsonl"), os.path.join(campaign_dir, "enviados.log"),
+        lambda: pending_batch(campaign_dir, limit), HEADERS, message, lambda row: 1, options,
+        {"building": f"Gerando lote de {limit} contatos...",
+         "empty": "Todos os contatos desta campanha já foram enviados!",
+         "built": "Batch criado com {count} contatos",
+         "preview": "Mensagem que será enviada:",
+         "confirm": "Deseja enviar para {count} contatos?",
+         "sending": "Iniciando envio...",
+         "done": "Envio concluído! {count} envio(s) registrados no log."},
+        daemon,
+    )
+
+
+def cmd_followup(args: list[str], daemon=None) -> int:
+    positional, options = parse_args(args, flags=("-y", "--profile"), options=("--limite", "--profile"))
+    if len(positional) != 1:
+        raise UsageError("Informe a campanha")
+    campaign_dir = campaign_path(positional[0])
+    limit = _int_option(options, "limite", DEFAULT_LIMIT)
+    message = DEFAULT_FOLLOWUP_TEXT
+    custom = os.path.join(campaign_dir, "mensagens", FOLLOWUP_MESSAGE)
+    if os.path.isfile(custom):
+        from message_templates import load_template
+        message = load_template(custom).text
+
+    from batch_file import REMARKETING_HEADERS
+    return _interactive_send(
+        os.path.join(campaign_dir, "batch_remarketing.jsonl"), os.path.join(campaign_dir, "enviados.log"),
+        lambda: followup_batch(campaign_dir, limit), REMARKETING_HEADERS, message, _followup_msg_num, options,
+        {"building": "Gerando lote de remarketing...",
+         "empty": "Nenhum contato elegível para remarketing",
+         "built": "{count} contatos elegíveis para follow-up",
+         "preview": "Mensagem de Follow-up:",
+         "confirm": "Deseja enviar follow-up para {count} contatos?",
+         "sending": "Enviando follow-up...",
+         "done": "Follow-up enviado! {count} envio(s) registrados no log."},
+        daemon,
+    )
+
+
+# ==================== Cron ====================
+
+def auto_campaign(campaign_dir: str, message_file: str, limit: int, options: dict, daemon=None) -> int:
+    """Envio automático de uma campanha: lote de até `limit` contatos pendentes"""
+    from batch_file import count_batch, export_xlsx, write_batch
+
+    batch_path = os.path.join(campaign_dir, "batch_auto.jsonl")
+    sent_log = os.path.join(campaign_dir, "enviados.log")
+    if not os.path.isfile(os.path.join(campaign_dir, "contatos.xlsx")):
+        log(f"❌ Campanha não encontrada: {campaign_dir}")
+        return 1
+    if not os.path.isfile(message_file):
+        log(f"❌ Arquivo de mensagem não encontrado: {message_file}")
+        return 1
+    from message_templates import load_template
+    message = load_template(message_file).text
+
+    log(f"📂 Campanha: {campaign_dir}")
+    log(f"📝 Mensagem: {message_file}")
+
+    resume = bool(options.get("resume")) and os.path.exists(batch_path)
+    if resume:
+        # Continua o lote interrompido: quem já está no journal não é refeito
+        log(f"🔁 Retomando lote interrompido: {batch_path}")
+        count = count_batch(batch_path)
+    else:
+        # Lote anterior interrompido (sem --resume): registra o que já foi enviado
+        recovered = register_journal(batch_path, sent_log)
+        if recovered:
+            log(f"♻️  Lote anterior interrompido: {recovered} envio(s) registrados")
+        log(f"📋 Gerando batch de até {limit} contatos...")
+        batch = pending_batch(campaign_dir, limit)
+        count = len(batch)
+        if batch:
+            write_batch(batch_path, batch)
+            if options.get("auditoria"):
+                export_xlsx(os.path.join(options["auditoria"], f"batch_auto_{datetime.now():%Y-%m-%d_%H%M%S}.xlsx"),
+                            batch)
+
+    if not count:
+        log("⚠️ Nenhum contato pendente para enviar")
+        if os.path.exists(batch_path):
+            os.remove(batch_path)
+        return 0
+
+    log(f"✅ Batch criado com {count} contatos")
+    log("📤 Iniciando envio...")
+    try:
+        send_batch(batch_path, message, resume=resume, profile=_profile_path(options), daemon=daemon)
+    except Exception as e:
+        log(f"⚠️ Envio interrompido ({e}); registrando só o que foi enviado")
+
+    # Atualiza log de enviados só com o que o journal confirma
+    log(f"✅ Envio concluído! {register_journal(batch_path, sent_log)} mensagens enviadas")
+    os.remove(batch_path)
+    return 0
+
+
+def select_daily_batch(store, limit_followup: int, limit_new: int, priority: Optional[str] = None) -> list[tuple]:
+    """
+    Lote diário de todas as campanhas: follow-ups vencidos e contatos nunca
+    enviados, em rodízio entre campanhas (peso.txt), com os filtros de cada
+    uma. A parte que faltar de um lado é completada pelo outro.
+
+    Returns:
+        Linhas (Nome, Telefone, Endereço, Avaliação, Website, Campanha,
+        Mensagem, Tipo, MsgAnterior)
+
+    Raises:
+        ValueError: Regras de --prioridade inválidas
+    """
+    from batch_selector import BatchSelector, Source, campaign_weight, daily_offset, priority_from_spec
+    from lead_filters import campaign_pipeline
+
+    limit_total = limit_followup + limit_new
+    priority = priority_from_spec(priority)
+    store.sync()
+
+    def intro_message(campaign_dir):
+        return os.path.join(campaign_dir, "mensagens", DEFAULT_MESSAGE)
+
+    def followup_message(campaign_dir):
+        # Usa mensagem de follow-up se existir
+        followup = os.path.join(campaign_dir, "mensagens", FOLLOWUP_MESSAGE)
+        return followup if os.path.exists(followup) else intro_message(campaign_dir)
+
+    # Filtros por campanha (filtros.txt); sem o arquivo, envia para todos
+    def candidates(campaign_dir, rows):
+        return campaign_pipeline(campaign_dir).filter(rows, key_column=-1)
+
+    # Rodízio entre campanhas (a primeira muda a cada dia); cada campanha é
+    # lida sob demanda, só até o lote encher
+    campaigns = store.campaign_dirs()
+    start = daily_offset(len(campaigns))
+    chosen = set()
+    followups = BatchSelector(
+        [Source(d, lambda d=d: candidates(d, store.iter_followup_due(d)), campaign_weight(d)) for d in campaigns],
+        priority=priority, start=start, seen=chosen,
+    )
+    # Nunca enviados, só em campanhas com mensagem de apresentação
+    new = BatchSelector(
+        [Source(d, lambda d=d: candidates(d, store.iter_pending(d)), campaign_weight(d))
+         for d in campaigns if os.path.exists(intro_message(d))],
+        priority=priority, start=start, seen=chosen,
+    )
+
+    def followup_item(row):
+        return tuple(row[:5]) + (row[5], followup_message(row[5]), 'followup', row[6])
+
+    def new_item(row):
+        return tuple(row[:5]) + (row[5], intro_message(row[5]), 'novo', 0)
+
+    batch_followup = [followup_item(row) for _, row in followups.take(limit_followup)]
+    batch_new = [new_item(row) for _, row in new.take(limit_total - len(batch_followup))]
+    if len(batch_followup) + len(batch_new) < limit_total:
+        batch_followup += [followup_item(row) for _, row in
+                           followups.take(limit_total - len(batch_followup) - len(batch_new))]
+    return batch_followup + batch_new
+
+
+def send_daily_batch(batch_path: str, batch: list[tuple], resume: bool = False) -> bool:
+    """
+    Envia o lote diário neste processo, distribuído entre as instâncias,
+    com a mensagem de cada linha (coluna Mensagem) e o journal do lote.
+
+    Returns:
+        False se o lote nem começou (ex: WHATSAPP_QUOTA inválida)
+    """
+    import metrics
+    import profiler
+    from evolution_client import EvolutionAPI
+    from instance_pool import InstancePool, instances_from_env, quotas_from_env
+    from message_templates import load_template
+    from number_verifier import NumberVerifier
+    from send_journal import IN_DOUBT, SendJournal, discard_line, journal_path, journal_status
+    from send_scheduler import SendScheduler
+
+    rows = [row for row in batch if len(row) > 6 and row[1] and row[6]]
+
+    # Journal do lote: intenção gravada antes de cada envio, resultado logo depois.
+    # Na retomada, quem já foi resolvido sai da fila sem verificar nem esperar de novo.
+    journal = SendJournal(journal_path(batch_path), resume=resume)
+    in_doubt = set(journal.in_doubt())
+    for row in rows:
+        if journal.key(row[1]) in in_doubt:
+            # Caiu durante o envio: conta como enviado para não mandar duas vezes
+            msg_num = int(row[8]) + 1 if len(row) > 8 and row[8] else 1
+            with open(os.path.join(row[5], "enviados.log"), 'a') as f:
+                f.write(f"{str(row[1]).strip()}|{datetime.now().isoformat()}|{msg_num}|"
+                        f"{journal.state[journal.key(row[1])][1]}\n")
+            journal.outcome(row[1], 'sent', detail='em dúvida (retomada)')
+    resumed = sum(1 for row in rows if journal.is_done(row[1]))
+    rows = [row for row in rows if not journal.is_done(row[1])]
+    if resumed:
+        print(f"  🔁 Retomada: {resumed} contato(s) já resolvidos no journal")
+
+    # Instâncias (números) que enviam: WHATSAPP_INSTANCES=inst1,inst2 (padrão: business_sender)
+    instances = instances_from_env()
+    # Cota diária por número (WHATSAPP_QUOTA=40 ou inst1:40,inst2:20), descontando os envios de hoje
+    try:
+        quotas = quotas_from_env(instances)
+    except ValueError as e:
+        print(f"  ❌ {e}")
+        journal.close()
+        return False
+
+    api = EvolutionAPI()
+    with open_store() as store:
+        store.sync()
+        used_today = store.sends_by_instance(datetime.now().date().isoformat())
+    pool = InstancePool(api, instances, quota=quotas, used=used_today)
+    pool.start_probing()
+    print("  📊 Cota do dia: " + ", ".join(f"{name} {used_today.get(name, 0)}/{quotas[name]}" for name in instances))
+    verifier = NumberVerifier(api, instances[0])
+    results = None
+    try:
+        print(f"  📡 Instâncias conectadas: {', '.join(pool.healthy_instances()) or 'nenhuma'}")
+
+        # Verifica todos os números do batch em bloco (usa cache de verificações recentes)
+        with profiler.span("verify_prefetch", contacts=len(rows)):
+            verifier.prefetch(str(row[1]) for row in rows)
+
+        # Ritmo anti-bloqueio: ~1 mensagem por minuto por instância, com "digitando..." dentro do intervalo
+        scheduler = SendScheduler(api, interval_seconds=60, typing_delay=5.0)
+
+        # Cada arquivo de mensagem é compilado uma vez (e recompilado só se mudar)
+        def render(row):
+            return load_template(row[6]).render_row(row, defaults={'nome': 'empresa'})
+
+        sent = failed = no_whatsapp = deferred = 0
+        results = scheduler.run_pool(
+            pool, rows, phone=lambda row: str(row[1]), render=render, verify=verifier.has_whatsapp,
+            before_send=lambda row, instance: journal.intent(row[1], instance))
+        for row, instance, status, result in results:
+            phone = row[1]
+            campaign_dir = row[5] if len(row) > 5 else None
+            kind = row[7] if len(row) > 7 else 'novo'
+            previous = row[8] if len(row) > 8 else 0
+            emoji = "🔄" if kind == 'followup' else "🆕"
+            formatted = api._format_phone(str(phone))
+
+            # Resultado no journal antes de qualquer outro registro
+            detail = str(result.get('message', '')) if status in ('failed', 'deferred') and result else ''
+            with profiler.span("journal", "io", contact=str(phone)):
+                journal.outcome(phone, journal_status(status, result), instance, detail)
+            metrics.MESSAGES.inc(instance=instance or '', status=status)
+            in_doubt = journal_status(status, result) == IN_DOUBT
+            if in_doubt:
+                status = 'sent'  # a mensagem pode ter saído: conta como enviada para não mandar duas vezes
+
+            if status == 'deferred':
+                reason = str(result.get('message', ''))[:50] if result else 'instância indisponível'
+                print(f"  ⏸️  Adiado ({reason}): {phone} ({formatted})")
+                deferred += 1
+            elif status in ('skipped', 'failed'):
+                if status == 'skipped':
+                    print(f"  ⚠️  Sem WhatsApp: {phone} ({formatted})")
+                    no_whatsapp += 1
+                else:
+                    print(f"  {emoji} [{instance}] {phone} ({formatted})")
+                    print(f"     ❌ Erro: {result}")
+                    failed += 1
+                # Resultado definitivo: o contato não volta aos lotes dos próximos dias
+                with open(os.path.join(campaign_dir, "descartados.log"), 'a') as f:
+                    f.write(discard_line(phone, status, instance))
+            else:
+                print(f"  {emoji} [{instance}] {phone} ({formatted})")
+                print("     ⚠️  Sem confirmação (conta como enviado)" if in_doubt else "     ✓ Enviado!")
+                sent += 1
+                # Atualiza log da campanha (telefone|timestamp|msg_num|instancia)
+                msg_num = int(previous) + 1 if previous else 1
+                with open(os.path.join(campaign_dir, "enviados.log"), 'a') as f:
+                    f.write(f"{str(phone).strip()}|{datetime.now().isoformat()}|{msg_num}|{instance}\n")
+    finally:
+        if results is not None:
+            results.close()  # encerra as threads de envio se o laço parou no meio
+        pool.stop()
+        verifier.close()
+        journal.close()
+        api.close()
+    print(f"\n✅ Enviados: {sent} | ❌ Falhas: {failed} | ⚠️ Sem WhatsApp: {no_whatsapp} | ⏸️ Adiados: {deferred}")
+    return True
+
+
+def auto_global(limit_total: int, options: dict) -> int:
+    """
+    Envio diário de todas as campanhas: metade follow-up, metade novos,
+    selecionados e enviados no mesmo processo. O lote é gravado (JSON
+    Lines) antes do primeiro envio, para o journal e uma eventual retomada.
+    """
+    import profiler
+    from batch_file import GLOBAL_HEADERS, export_xlsx, read_batch, write_batch
+    from send_journal import IN_DOUBT, apply_journal, journal_path
+
+    limit_followup = limit_total // 2
+    limit_new = limit_total - limit_followup
+    batch_path = os.path.join(BASE_DIR, "batch_diario.jsonl")
+
+    log("==========================================")
+    log("🚀 Iniciando envio automático diário")
+    log(f"   Total: {limit_total} mensagens")
+    log(f"   → Follow-up (48h): até {limit_followup}")
+    log(f"   → Apresentação: até {limit_new}")
+    log("==========================================")
+
+    resume = bool(options.get("resume")) and os.path.exists(batch_path)
+    if resume:
+        # Continua o lote do dia interrompido: quem já está no journal não é refeito
+        log(f"🔁 Retomando lote interrompido: {batch_path}")
+    elif os.path.exists(journal_path(batch_path)):
+        # Lote anterior interrompido (sem --resume): os envios confirmados já estão
+        # nos enviados.log; registra também os que ficaram em dúvida
+        recovered = apply_journal(
+            batch_path,
+            log_path=lambda row: os.path.join(row[5], 'enviados.log'),
+            msg_num=lambda row: int(row[8]) + 1 if len(row) > 8 and row[8] else 1,
+            statuses=(IN_DOUBT,),
+        )
+        log(f"♻️  Lote anterior interrompido: {recovered} envio(s) em dúvida registrados")
+
+    profile = _profile_path(options)
+    if profile:
+        profiler.enable(profile)
+    try:
+        if resume:
+            with profiler.span("read_batch", "io"):
+                batch = read_batch(batch_path)
+        else:
+            with profiler.span("select_batch"), open_store() as store:
+                try:
+                    batch = select_daily_batch(store, limit_followup, limit_new, options.get("prioridade"))
+                except ValueError as e:
+                    log(f"❌ {e}")
+                    return 1
+            if not batch:
+                log("⚠️ Nenhum contato pendente para enviar")
+                return 0
+            # Gravado antes do primeiro envio: o journal e o --resume dependem dele
+            with profiler.span("write_batch", "io", contacts=len(batch)):
+                write_batch(batch_path, batch, GLOBAL_HEADERS)
+            if options.get("auditoria"):
+                with profiler.span("export_xlsx", "io"):
+                    export_xlsx(os.path.join(options["auditoria"], f"batch_diario_{datetime.now():%Y-%m-%d_%H%M%S}.xlsx"),
+                                batch, GLOBAL_HEADERS, color="27AE60")
+
+        followup_count = sum(1 for row in batch if row[7] == 'followup')
+        log()
+        log("📊 Batch diário:")
+        log(f"   🔄 Follow-up: {followup_count}")
+        log(f"   🆕 Novos contatos: {len(batch) - followup_count}")
+        log(f"   📱 Total: {len(batch)}")
+        log()
+        log("📤 Iniciando envio...")
+        if not send_daily_batch(batch_path, batch, resume):
+            # Lote e journal ficam para a retomada (--resume) depois de corrigir
+            log(f"❌ Envio diário não concluído; lote mantido em {batch_path}")
+            return 1
+    finally:
+        profiler.finish()
+
+    log()
+    log("==========================================")
+    log("✅ Envio diário concluído!")
+    log("==========================================")
+    for path in (batch_path, journal_path(batch_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    return 0
+
+
+def cmd_auto(args: list[str], daemon=None) -> int:
+    positional, options = parse_args(
+        args, flags=("--todas", "--resume", "--auditoria", "--profile"),
+        options=("--campanha", "--mensagem", "--limite", "--limite-global", "--prioridade", "--profile"),
+    )
+    if positional:
+        raise UsageError(f"Argumento inesperado: {positional[0]}")
+    limit = _int_option(options, "limite", DEFAULT_LIMIT)
+    limit_global = _int_option(options, "limite-global", 0)
+    message = options.get("mensagem", DEFAULT_MESSAGE)
+    if options.get("auditoria"):
+        # Cópia XLSX de cada lote
+        options["auditoria"] = os.path.join(LOG_DIR, "lotes")
+        os.makedirs(options["auditoria"], exist_ok=True)
+
+    if options.get("todas"):
+        if limit_global > 0:
+            # Limite global: N mensagens no total entre todas as campanhas
+            return auto_global(limit_global, options)
+        # Limite por campanha: N mensagens em cada campanha que tenha a mensagem
+        with open_store() as store:
+            campaigns = store.campaign_dirs()
+        code = 0
+        for campaign_dir in campaigns:
+            message_file = message_path(campaign_dir, message)
+            if os.path.isfile(message_file):
+                code = auto_campaign(campaign_dir, message_file, limit, options, daemon) or code
+        return code
+    if options.get("campanha"):
+        campaign_dir = campaign_path(options["campanha"])
+        return auto_campaign(campaign_dir, message_path(campaign_dir, message), limit, options, daemon)
+    raise UsageError("Especifique --campanha ou --todas")
+
+
+# ==================== Consultas e manutenção ====================
+
+def cmd_stats(args: list[str], daemon=None) -> int:
+    from sender_daemon import print_stats, submit
+
+    positional, options = parse_args(args, flags=("--raw",))
+    campanhas_dir = os.path.abspath(positional[0]) if positional else CAMPANHAS_DIR
+    job_args = {"campanhas_dir": campanhas_dir}
+    if daemon is not None:
+        rows = daemon.job_stats(job_args)
+    else:
+        reply = submit("stats", job_args)
+        if reply is not None:
+            rows = reply.get("result") or []
+        else:
+            with open_store(campanhas_dir) as store:
+                store.sync()
+                rows = [list(row) for row in store.stats()]
+    print_stats(rows, campanhas_dir, options.get("raw"))
+    return 0
+
+
+def cmd_merge(args: list[str], daemon=None) -> int:
+    positional, _ = parse_args(args)
+    if len(positional) != 2:
+        raise UsageError("Informe a campanha e a planilha nova")
+    campaign_dir = campaign_path(positional[0])
+    if not os.path.isfile(positional[1]):
+        print(f"❌ Planilha não encontrada: {positional[1]}")
+        return 1
+    with open_store() as store:
+        added, local, elsewhere = store.merge_contacts(campaign_dir, os.path.abspath(positional[1]))
+    print(f"   🆕 {added} novos, 🔁 {local} já na campanha, 🌐 {elsewhere} já em outras campanhas")
+    return 0
+
+
+def _read_blocklist(path: str) -> list[list[str]]:
+    try:
+        with open(path, 'r') as f:
+            return [line.rstrip('\n').split('|') for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def cmd_blocklist(args: list[str], daemon=None) -> int:
+    """
+    Blocklist global (telefone|motivo|timestamp), comparada pela chave
+    canônica do telefone: "(61) 99999-0000" e "5561999990000" são o mesmo número.
+    Consultas e alterações passam pelo índice compilado (SuppressionIndex).
+    """
+    positional, _ = parse_args(args)
+    action = positional[0] if positional else "list"
+
+    if action == "list" and len(positional) <= 1:
+        entries = _read_blocklist(BLOCKLIST_PATH)
+        if not entries:
+            print("Blocklist vazia")
+            return 0
+        print(f"{'TELEFONE':<18} {'MOTIVO':<30} {'DATA':<12}")
+        print("-" * 59)
+        for entry in entries:
+            reason = entry[1] if len(entry) > 1 else ''
+            day = entry[2].split('T', 1)[0] if len(entry) > 2 else ''
+            print(f"{entry[0]:<18} {reason[:28]:<30} {day:<12}")
+        print(f"\nTotal: {len(entries)} bloqueados")
+        return 0
+
+    if action not in ("add", "remove", "check") or len(positional) < 2:
+        raise UsageError(f"Ação inválida: {' '.join(positional)}")
+    from phone_numbers import phone_key
+    from suppression_index import SuppressionIndex
+
+    phone = positional[1]
+    if not phone_key(phone):
+        print(f"❌ Telefone inválido: {phone}")
+        return 1
+    blocklist = SuppressionIndex(CAMPANHAS_DIR)
+
+    if action == "check":
+        blocked = blocklist.is_blocked(phone)
+        print("bloqueado" if blocked else "livre")
+        return 0 if blocked else 1
+    if action == "add":
+        if not blocklist.add(phone, ' '.join(positional[2:]) or "pediu para não receber"):
+            print("⚠️  Este número já está na blocklist")
+            return 0
+        print(f"✅ Número adicionado à blocklist: {phone_key(phone)}")
+        return 0
+
+    # remove
+    if not blocklist.remove(phone):
+        print("⚠️  Número não encontrado na blocklist")
+        return 1
+    print("✅ Número removido da blocklist")
+    return 0
+
+
+# ==================== Comandos ====================
+
+class Command(NamedTuple):
+    run: Callable[[list[str], object], int]
+    usage: str
+    probe: tuple       # argumentos de uma execução sem nada a fazer (campanha vazia), medida na partida
+    budget_ms: float   # tempo de partida além do interpretador vazio
+
+
+# Campanha vazia usada nas execuções de medição (só com a mensagem padrão)
+PROBE_CAMPAIGN = "medicao/partida"
+
+COMMANDS: dict[str, Command] = {
+    "send": Command(cmd_send, "send <campanha> [--mensagem=arquivo] [--limite=20] [-y] [--profile[=trace.json]]",
+                    ("send", PROBE_CAMPAIGN, "-y"), 200),
+    "auto": Command(cmd_auto, "auto (--campanha tipo/cidade | --todas) [--limite N] [--limite-global N] "
+                              "[--mensagem arquivo] [--resume] [--prioridade regras] [--auditoria] [--profile]",
+                    ("auto", "--todas", "--limite-global", "10"), 200),
+    "followup": Command(cmd_followup, "followup <campanha> [--limite=20] [-y] [--profile[=trace.json]]",
+                        ("followup", PROBE_CAMPAIGN, "-y"), 200),
+    "stats": Command(cmd_stats, "stats [--raw] [campanhas_dir]", ("stats",), 150),
+    "merge": Command(cmd_merge, "merge <campanha> <planilha.xlsx>", ("merge", PROBE_CAMPAIGN, "ausente.xlsx"), 100),
+    "blocklist": Command(cmd_blocklist, "blocklist [list | add <telefone> [motivo] | remove <telefone> | "
+                                        "check <telefone>]", ("blocklist", "check", "61999990000"), 100),
+}
+
+
+def _probe_tree(directory: str):
+    """Cópia dos módulos do projeto com campanhas/ vazia (a medição não toca no estado real)"""
+    import glob
+    import shutil
+
+    for path in glob.glob(os.path.join(BASE_DIR, "*.py")):
+        shutil.copy2(path, directory)
+    messages = os.path.join(directory, "campanhas", PROBE_CAMPAIGN, "mensagens")
+    os.makedirs(messages)
+    with open(os.path.join(messages, DEFAULT_MESSAGE), 'w', encoding='utf-8') as f:
+        f.write("Olá {nome}!")
+
+
+def _heavy_imports(importtime: str) -> list[str]:
+    """Módulos pesados na saída de -X importtime ("import time: self | cumulativo | módulo")"""
+    found = set()
+    for line in importtime.splitlines():
+        name = line.rsplit('|', 1)[-1].strip().split('.', 1)[0]
+        if line.startswith("import time:") and name in HEAVY_MODULES:
+            found.add(name)
+    return sorted(found)
+
+
+def _launch_ms(args: list[str], runs: int, cwd: str, env: dict) -> tuple[float, list[str], str]:
+    """
+    Melhor tempo (ms) de um interpretador novo (-X importtime) rodando
+    `args`, os módulos pesados que ele importou e o erro, se saiu com traceback
+    """
+    best, heavy, error = float("inf"), [], ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True,
+                                cwd=cwd, env=env, stdin=subprocess.DEVNULL)
+        best = min(best, (time.perf_counter() - start) * 1000)
+        heavy = _heavy_imports(result.stderr)
+        if "Traceback" in result.stderr:
+            error = result.stderr.strip().splitlines()[-1]
+    return best, heavy, error
+
+
+def check_startup(runs: int = 5) -> list[dict]:
+    """
+    Mede cada comando de verdade (marketing_cli.py <comando> ...) num
+    interpretador novo, numa cópia do projeto com campanhas/ vazia,
+    descontado o interpretador vazio, e confere o orçamento e se algum
+    módulo pesado foi importado pelo caminho.
+
+    Returns:
+        [{"command", "ms", "budget_ms", "heavy", "error", "ok"}, ...]
+    """
+    import tempfile
+
+    env = {name: value for name, value in os.environ.items()
+           if name not in ("SENDER_SOCKET", "METRICS_PORT", "METRICS_JSONL")}
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        _probe_tree(directory)
+        base, _, _ = _launch_ms(["-c", "pass"], runs, directory, env)
+        for name, command in COMMANDS.items():
+            # A primeira execução compila os .pyc da cópia: fica fora da medição
+            _launch_ms(["marketing_cli.py", *command.probe], 1, directory, env)
+            ms, heavy, error = _launch_ms(["marketing_cli.py", *command.probe], runs, directory, env)
+            extra = max(0.0, ms - base)
+            results.append({"command": name, "ms": round(extra, 1), "budget_ms": command.budget_ms,
+                            "heavy": ",".join(heavy), "error": error,
+                            "ok": extra <= command.budget_ms and not heavy and not error})
+    return results
+
+
+def cmd_startup(args: list[str], daemon=None) -> int:
+    _, options = parse_args(args, options=("--vezes",))
+    results = check_startup(_int_option(options, "vezes", 5))
+    print(f"{'COMANDO':<12} {'PARTIDA(ms)':>12} {'ORÇAMENTO(ms)':>14}  PESADOS")
+    print("-" * 52)
+    for entry in results:
+        marker = "✓" if entry["ok"] else "❌"
+        print(f"{entry['command']:<12} {entry['ms']:>12.1f} {entry['budget_ms']:>14.0f}  "
+              f"{entry['heavy'] or '-'} {marker}")
+        if entry["error"]:
+            print(f"   ❌ {entry['error']}")
+    failures = [entry["command"] for entry in results if not entry["ok"]]
+    if failures:
+        print(f"\n❌ Fora do orçamento de partida: {', '.join(failures)}")
+        return 1
+    print("\n✓ Todos os comandos dentro do orçamento")
+    return 0
+
+
+def usage() -> str:
+    lines = ["Uso: python3 marketing_cli.py <comando> [opções]", ""]
+    lines += [f"  {command.usage}" for command in COMMANDS.values()]
+    lines += ["  startup [--vezes=5]         Confere o orçamento de partida de cada comando", "",
+              "Campanha: tipo/cidade (dentro de campanhas/) ou o caminho da pasta."]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None, daemon=None) -> int:
+    """
+    Args:
+        argv: Comando e opções (padrão: sys.argv[1:])
+        daemon: SenderDaemon quando o comando roda dentro dele (job 'cli')
+
+    Returns:
+        Código de saída
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0 if argv else 1
+    name, args = argv[0], argv[1:]
+    if name == "startup":
+        return cmd_startup(args)
+    command = COMMANDS.get(name)
+    if command is None:
+        print(f"❌ Comando desconhecido: {name}\n")
+        print(usage())
+        return 1
+    if "--help" in args:
+        print(f"Uso: python3 marketing_cli.py {command.usage}")
+        return 0
+
+    try:
+        return command.run(args, daemon)
+    except UsageError as e:
+        print(f"❌ {e}\nUso: python3 marketing_cli.py {command.usage}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
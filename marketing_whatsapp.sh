@@ -40,27 +40,24 @@ format_folder_name() {
     tr '[:upper:]' '[:lower:]' | tr ' ' '_' | tr -cd '[:alnum:]_'
 }
 
+# Comandos das campanhas (marketing_cli.py): send, followup, stats, merge, blocklist...
+# O envio em si vai para o daemon residente (sender_daemon.py start), se estiver no ar
+cli() {
+    python3 "$SCRIPT_DIR/marketing_cli.py" "$@"
+}
+
 # Conta linhas válidas no XLSX (aproximado via strings)
 count_contacts_xlsx() {
     local xlsx_file="$1"
-    # Conta linhas do xlsx usando python
-    python3 -c "
-from openpyxl import load_workbook
-wb = load_workbook('$xlsx_file')
-ws = wb.active
-count = sum(1 for row in ws.iter_rows(min_row=2, values_only=True) if row[0] and row[1] and str(row[1]) != 'N/A')
-print(count)
-" 2>/dev/null || echo "0"
+    # Daemon (contagem em cache) ou leitura em streaming local
+    python3 "$SCRIPT_DIR/sender_daemon.py" count "$xlsx_file" 2>/dev/null || echo "0"
 }
 
-# Conta enviados no log
-count_sent() {
-    local log_file="$1"
-    if [[ -f "$log_file" ]]; then
-        wc -l < "$log_file" | tr -d ' '
-    else
-        echo "0"
-    fi
+# Agregados de todas as campanhas, uma linha por campanha:
+# caminho|linhas|válidos|enviados|pendentes|followup|bloqueados|responderam
+# (uma única consulta, em cache no estado.db; daemon ou processo local)
+campaign_stats() {
+    python3 "$SCRIPT_DIR/sender_daemon.py" stats --raw "$CAMPANHAS_DIR" 2>/dev/null
 }
 
 # =============================================================================
@@ -131,14 +128,20 @@ nova_pesquisa() {
     
     python3 google_scraper.py "$termo_busca" 60
     
-    # Move o arquivo gerado
+    # Planilha gerada pelo scraper
     local xlsx_generated=$(ls -t *_resultados.xlsx 2>/dev/null | head -1)
     
     if [[ -n "$xlsx_generated" ]]; then
         
+        # Mescla pelo índice global: só entram números que nenhuma campanha tem
+        # (vale também para campanha nova: o mesmo negócio pode estar em outro tipo/cidade)
+        if [[ "$is_new_campaign" == "false" ]]; then
+            echo -e "${CYAN}🔄 Mesclando com contatos existentes...${NC}"
+        fi
+        cli merge "$campanha_dir" "$SCRAPER_DIR/$xlsx_generated"
+        rm -f "$xlsx_generated"
+        
         if [[ "$is_new_campaign" == "true" ]]; then
-            # Campanha nova: apenas move o arquivo
-            mv "$xlsx_generated" "$campanha_dir/contatos.xlsx"
             touch "$campanha_dir/enviados.log"
             
             # Cria mensagens de exemplo
@@ -148,85 +151,6 @@ nova_pesquisa() {
             else
                 criar_mensagens_exemplo "$campanha_dir/mensagens"
             fi
-        else
-            # Campanha existente: merge e remove duplicatas
-            echo -e "${CYAN}🔄 Mesclando com contatos existentes...${NC}"
-            
-            python3 << EOF
-from openpyxl import load_workbook, Workbook
-from openpyxl.styles import Font, PatternFill
-
-# Carrega contatos existentes
-wb_existing = load_workbook('$existing_xlsx')
-ws_existing = wb_existing.active
-
-# Coleta telefones existentes para evitar duplicatas
-existing_phones = set()
-existing_rows = []
-for row in ws_existing.iter_rows(min_row=2, values_only=True):
-    telefone = row[1] if len(row) > 1 else None
-    if telefone and str(telefone) != 'N/A':
-        existing_phones.add(str(telefone).strip())
-        existing_rows.append(row)
-
-# Carrega novos contatos
-wb_new = load_workbook('$xlsx_generated')
-ws_new = wb_new.active
-
-# Filtra apenas contatos novos (não duplicados)
-new_contacts = []
-for row in ws_new.iter_rows(min_row=2, values_only=True):
-    telefone = row[1] if len(row) > 1 else None
-    if telefone and str(telefone) != 'N/A':
-        telefone_str = str(telefone).strip()
-        if telefone_str not in existing_phones:
-            new_contacts.append(row)
-            existing_phones.add(telefone_str)
-
-# Cria novo arquivo mesclado
-wb_merged = Workbook()
-ws_merged = wb_merged.active
-ws_merged.title = "Resultados"
-
-# Cabeçalhos
-headers = ["Nome", "Telefone", "Endereço", "Avaliação", "Website"]
-header_font = Font(bold=True, color="FFFFFF")
-header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-
-for col, header in enumerate(headers, 1):
-    cell = ws_merged.cell(row=1, column=col, value=header)
-    cell.font = header_font
-    cell.fill = header_fill
-
-# Adiciona contatos existentes
-row_idx = 2
-for row_data in existing_rows:
-    for col_idx, value in enumerate(row_data[:5], 1):
-        ws_merged.cell(row=row_idx, column=col_idx, value=value)
-    row_idx += 1
-
-# Adiciona novos contatos
-for row_data in new_contacts:
-    for col_idx, value in enumerate(row_data[:5], 1):
-        ws_merged.cell(row=row_idx, column=col_idx, value=value)
-    row_idx += 1
-
-# Ajusta larguras
-ws_merged.column_dimensions['A'].width = 40
-ws_merged.column_dimensions['B'].width = 18
-ws_merged.column_dimensions['C'].width = 50
-ws_merged.column_dimensions['D'].width = 10
-ws_merged.column_dimensions['E'].width = 35
-
-wb_merged.save('$campanha_dir/contatos.xlsx')
-
-print(f"MERGED:{len(new_contacts)}")
-EOF
-            
-            # Remove arquivo temporário
-            rm -f "$xlsx_generated"
-            
-            local merge_result=$(python3 -c "print('OK')" 2>/dev/null)
         fi
         
         local total=$(count_contacts_xlsx "$campanha_dir/contatos.xlsx")
@@ -238,7 +162,7 @@ EOF
         echo -e "   📊 Total de contatos: $total"
         
         if [[ "$is_new_campaign" == "false" ]]; then
-            echo -e "   🆕 Novos contatos adicionados (duplicatas removidas)"
+            echo -e "   🆕 Novos contatos adicionados (duplicatas de todas as campanhas removidas)"
         else
             echo -e "   📝 Mensagens de exemplo criadas"
         fi
@@ -274,27 +198,18 @@ enviar_mensagens() {
     local i=1
     local campanhas=()
     
-    # Itera sobre estrutura tipo/cidade
-    for tipo_dir in "$CAMPANHAS_DIR"/*/; do
-        if [[ -d "$tipo_dir" ]]; then
-            local tipo_name=$(basename "$tipo_dir")
-            
-            for cidade_dir in "$tipo_dir"/*/; do
-                if [[ -d "$cidade_dir" ]] && [[ -f "$cidade_dir/contatos.xlsx" ]]; then
-                    local cidade_name=$(basename "$cidade_dir")
-                    local total=$(count_contacts_xlsx "$cidade_dir/contatos.xlsx")
-                    local sent=$(count_sent "$cidade_dir/enviados.log")
-                    local pending=$((total - sent))
-                    
-                    echo -e "  ${GREEN}$i)${NC} ${PURPLE}$tipo_name${NC}/${CYAN}$cidade_name${NC}"
-                    echo -e "     📊 Total: $total | ✅ Enviados: $sent | ⏳ Pendentes: $pending"
-                    
-                    campanhas+=("$cidade_dir")
-                    ((i++))
-                fi
-            done
-        fi
-    done
+    # Estrutura tipo/cidade (agregados de todas as campanhas de uma vez)
+    while IFS='|' read -r cidade_dir linhas total sent pending followup bloqueados responderam; do
+        [[ -f "$cidade_dir/contatos.xlsx" ]] || continue
+        local tipo_name=$(basename "$(dirname "$cidade_dir")")
+        local cidade_name=$(basename "$cidade_dir")
+        
+        echo -e "  ${GREEN}$i)${NC} ${PURPLE}$tipo_name${NC}/${CYAN}$cidade_name${NC}"
+        echo -e "     📊 Total: $total | ✅ Enviados: $sent | ⏳ Pendentes: $pending"
+        
+        campanhas+=("$cidade_dir")
+        ((i++))
+    done < <(campaign_stats)
     
     if [[ ${#campanhas[@]} -eq 0 ]]; then
         echo -e "${RED}❌ Nenhuma campanha encontrada${NC}"
@@ -373,218 +288,10 @@ selecionar_e_enviar() {
     fi
     
     local mensagem_selecionada="${mensagens[$msg_idx]}"
-    local mensagem_conteudo=$(cat "$mensagem_selecionada")
-    
-    # Gera batch de 20 contatos
-    gerar_e_enviar_batch "$campanha_dir" "$mensagem_conteudo"
-}
-
-gerar_e_enviar_batch() {
-    local campanha_dir="$1"
-    local mensagem="$2"
-    local contatos_xlsx="$campanha_dir/contatos.xlsx"
-    local enviados_log="$campanha_dir/enviados.log"
-    local batch_xlsx="$campanha_dir/batch_atual.xlsx"
     
+    # Gera o lote de 20 contatos, mostra a mensagem, confirma e envia
     echo ""
-    echo -e "${CYAN}📋 Gerando lote de 20 contatos...${NC}"
-    
-    # Gera batch usando Python
-    python3 << EOF
-from openpyxl import load_workbook, Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-import re
-
-# Carrega contatos
-wb = load_workbook('$contatos_xlsx')
-ws = wb.active
-
-# Carrega enviados (suporta formato antigo e novo)
-enviados = set()
-try:
-    with open('$enviados_log', 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                # Novo formato: telefone|timestamp|msg_num
-                # Antigo formato: apenas telefone
-                telefone = line.split('|')[0]
-                enviados.add(telefone)
-except FileNotFoundError:
-    pass
-
-# Carrega blocklist global (NUNCA envia para esses números)
-blocklist = set()
-try:
-    with open('$CAMPANHAS_DIR/blocklist.log', 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                telefone = line.split('|')[0]
-                blocklist.add(telefone)
-except FileNotFoundError:
-    pass
-
-# Plataformas genéricas (não tem site profissional próprio)
-GENERIC_PLATFORMS = [
-    # Redes sociais
-    'instagram.com', 'facebook.com', 'fb.com', 'fb.me',
-    'twitter.com', 'x.com', 'linkedin.com', 'tiktok.com',
-    'youtube.com', 'youtu.be', 'pinterest.com',
-    # Plataformas de sites gratuitos/genéricos
-    'wix.com', 'wixsite.com', 'weebly.com', 'squarespace.com',
-    'wordpress.com', 'blogspot.com', 'blogger.com',
-    'sites.google.com', 'google.com/maps', 'g.page',
-    'carrd.co', 'linktree', 'linktr.ee', 'bio.link',
-    # Marketplaces e diretórios
-    'ifood.com', 'rappi.com', 'uber.com', 'ubereas.com',
-    'mercadolivre.com', 'olx.com', 'enjoei.com',
-    'getninjas.com', 'habitissimo.com',
-    # Outros genéricos
-    'whatsapp.com', 'wa.me', 'bit.ly', 'goo.gl',
-    'page.link', 't.me', 'telegram.me',
-]
-
-def needs_professional_site(website):
-    """
-    Retorna True se o negócio PRECISA de um site profissional.
-    - Sem website = True
-    - Website genérico (Instagram, Wix, etc) = True
-    - Website próprio com domínio = False
-    """
-    if not website or website == 'N/A' or website.strip() == '':
-        return True
-    
-    website_lower = website.lower().strip()
-    
-    # Verifica se é uma plataforma genérica
-    for platform in GENERIC_PLATFORMS:
-        if platform in website_lower:
-            return True
-    
-    return False
-
-# Filtra contatos não enviados E que precisam de site profissional
-pendentes = []
-for row in ws.iter_rows(min_row=2, values_only=True):
-    nome = row[0] if len(row) > 0 else None
-    telefone = row[1] if len(row) > 1 else None
-    website = row[4] if len(row) > 4 else None
-    
-    if nome and telefone and str(telefone) != 'N/A':
-        telefone_str = str(telefone).strip()
-        # Checa: não enviado + não bloqueado + precisa de site
-        # REMOVIDO: Filtro de website profissional - envia para todos
-        if telefone_str not in enviados and telefone_str not in blocklist:
-            pendentes.append(row)
-
-# Pega os primeiros 20
-batch = pendentes[:20]
-
-if not batch:
-    print("EMPTY")
-    exit(0)
-
-# Cria novo XLSX com o batch
-wb_batch = Workbook()
-ws_batch = wb_batch.active
-ws_batch.title = "Batch"
-
-# Cabeçalhos
-headers = ["Nome", "Telefone", "Endereço", "Avaliação", "Website"]
-header_font = Font(bold=True, color="FFFFFF")
-header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-
-for col, header in enumerate(headers, 1):
-    cell = ws_batch.cell(row=1, column=col, value=header)
-    cell.font = header_font
-    cell.fill = header_fill
-
-# Dados
-for row_idx, row_data in enumerate(batch, 2):
-    for col_idx, value in enumerate(row_data[:5], 1):
-        ws_batch.cell(row=row_idx, column=col_idx, value=value)
-
-# Ajusta larguras
-ws_batch.column_dimensions['A'].width = 40
-ws_batch.column_dimensions['B'].width = 18
-ws_batch.column_dimensions['C'].width = 50
-ws_batch.column_dimensions['D'].width = 10
-ws_batch.column_dimensions['E'].width = 35
-
-wb_batch.save('$batch_xlsx')
-print(f"OK:{len(batch)}")
-EOF
-    
-    local result=$(python3 -c "
-from openpyxl import load_workbook
-try:
-    wb = load_workbook('$batch_xlsx')
-    ws = wb.active
-    count = sum(1 for row in ws.iter_rows(min_row=2, values_only=True) if row[0])
-    print(f'OK:{count}')
-except:
-    print('EMPTY')
-" 2>/dev/null)
-    
-    if [[ "$result" == "EMPTY" ]] || [[ -z "$result" ]]; then
-        echo -e "${YELLOW}⚠️  Todos os contatos desta campanha já foram enviados!${NC}"
-        return 0
-    fi
-    
-    local batch_count=$(echo "$result" | cut -d: -f2)
-    
-    echo -e "${GREEN}✅ Batch criado com $batch_count contatos${NC}"
-    
-    # Mostra preview da mensagem
-    echo ""
-    print_separator
-    echo -e "${YELLOW}📝 Mensagem que será enviada:${NC}"
-    print_separator
-    echo "$mensagem"
-    print_separator
-    echo ""
-    
-    read -rp "⚠️  Deseja enviar para $batch_count contatos? (s/N): " confirma
-    
-    if [[ "$confirma" != "s" ]] && [[ "$confirma" != "S" ]]; then
-        echo -e "${YELLOW}Operação cancelada${NC}"
-        rm -f "$batch_xlsx"
-        return 0
-    fi
-    
-    # Executa o whatsapp_sender
-    echo ""
-    echo -e "${CYAN}📤 Iniciando envio...${NC}"
-    
-    cd "$SCRIPT_DIR"
-    python3 whatsapp_sender.py "$batch_xlsx" "$mensagem"
-    
-    # Atualiza log de enviados COM TIMESTAMP (para remarketing)
-    python3 << EOF
-from openpyxl import load_workbook
-from datetime import datetime
-
-wb = load_workbook('$batch_xlsx')
-ws = wb.active
-
-timestamp = datetime.now().isoformat()
-
-with open('$enviados_log', 'a') as f:
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        telefone = row[1] if len(row) > 1 else None
-        if telefone and str(telefone) != 'N/A':
-            # Formato: telefone|timestamp|mensagem_numero
-            f.write(f"{str(telefone).strip()}|{timestamp}|1\n")
-
-print("Log atualizado")
-EOF
-    
-    echo ""
-    echo -e "${GREEN}✅ Envio concluído! Log de enviados atualizado.${NC}"
-    
-    # Remove batch temporário
-    rm -f "$batch_xlsx"
+    cli send "$campanha_dir" --mensagem="$mensagem_selecionada" --limite=20 || true
 }
 
 # =============================================================================
@@ -602,26 +309,8 @@ ver_estatisticas() {
     fi
     
     echo ""
-    printf "%-35s %10s %10s %10s\n" "TIPO/CIDADE" "TOTAL" "ENVIADOS" "PENDENTES"
-    echo "-------------------------------------------------------------------"
-    
-    # Itera sobre estrutura tipo/cidade
-    for tipo_dir in "$CAMPANHAS_DIR"/*/; do
-        if [[ -d "$tipo_dir" ]]; then
-            local tipo_name=$(basename "$tipo_dir")
-            
-            for cidade_dir in "$tipo_dir"/*/; do
-                if [[ -d "$cidade_dir" ]] && [[ -f "$cidade_dir/contatos.xlsx" ]]; then
-                    local cidade_name=$(basename "$cidade_dir")
-                    local total=$(count_contacts_xlsx "$cidade_dir/contatos.xlsx")
-                    local sent=$(count_sent "$cidade_dir/enviados.log")
-                    local pending=$((total - sent))
-                    
-                    printf "%-35s %10s %10s %10s\n" "$tipo_name/$cidade_name" "$total" "$sent" "$pending"
-                fi
-            done
-        fi
-    done
+    # Todas as campanhas numa única consulta (agregados em cache no estado.db)
+    python3 "$SCRIPT_DIR/sender_daemon.py" stats "$CAMPANHAS_DIR"
     
     echo ""
 }
@@ -792,49 +481,18 @@ remarketing_followup() {
     local i=1
     local campanhas=()
     
-    for tipo_dir in "$CAMPANHAS_DIR"/*/; do
-        if [[ -d "$tipo_dir" ]]; then
-            local tipo_name=$(basename "$tipo_dir")
-            
-            for cidade_dir in "$tipo_dir"/*/; do
-                if [[ -d "$cidade_dir" ]] && [[ -f "$cidade_dir/contatos.xlsx" ]]; then
-                    local cidade_name=$(basename "$cidade_dir")
-                    
-                    # Conta elegíveis para remarketing
-                    local remarketing_count=$(python3 << EOF
-from datetime import datetime, timedelta
-
-eligible = 0
-try:
-    with open('${cidade_dir}enviados.log', 'r') as f:
-        for line in f:
-            parts = line.strip().split('|')
-            if len(parts) >= 3:
-                timestamp_str = parts[1]
-                msg_num = int(parts[2])
-                try:
-                    sent_time = datetime.fromisoformat(timestamp_str)
-                    hours_ago = (datetime.now() - sent_time).total_seconds() / 3600
-                    # Elegível: 48h+ desde último envio E menos de 3 mensagens enviadas
-                    if hours_ago >= 48 and msg_num < 3:
-                        eligible += 1
-                except:
-                    pass
-except:
-    pass
-print(eligible)
-EOF
-)
-                    
-                    echo -e "  ${GREEN}$i)${NC} ${PURPLE}$tipo_name${NC}/${CYAN}$cidade_name${NC}"
-                    echo -e "     🔄 Elegíveis para remarketing: $remarketing_count"
-                    
-                    campanhas+=("$cidade_dir")
-                    ((i++))
-                fi
-            done
-        fi
-    done
+    # Elegível: follow-up vencido pela cadência (cadencia.txt; padrão 48h, 48h) e sem resposta
+    while IFS='|' read -r cidade_dir linhas total sent pending remarketing_count bloqueados responderam; do
+        [[ -f "$cidade_dir/contatos.xlsx" ]] || continue
+        local tipo_name=$(basename "$(dirname "$cidade_dir")")
+        local cidade_name=$(basename "$cidade_dir")
+        
+        echo -e "  ${GREEN}$i)${NC} ${PURPLE}$tipo_name${NC}/${CYAN}$cidade_name${NC}"
+        echo -e "     🔄 Elegíveis para remarketing: $remarketing_count"
+        
+        campanhas+=("$cidade_dir")
+        ((i++))
+    done < <(campaign_stats)
     
     if [[ ${#campanhas[@]} -eq 0 ]]; then
         echo -e "${RED}❌ Nenhuma campanha encontrada${NC}"
@@ -859,211 +517,9 @@ EOF
     
     local campanha_selecionada="${campanhas[$idx]}"
     
-    # Gera batch de remarketing
-    gerar_batch_remarketing "$campanha_selecionada"
-}
-
-gerar_batch_remarketing() {
-    local campanha_dir="$1"
-    local contatos_xlsx="$campanha_dir/contatos.xlsx"
-    local enviados_log="$campanha_dir/enviados.log"
-    local batch_xlsx="$campanha_dir/batch_remarketing.xlsx"
-    local mensagens_dir="$campanha_dir/mensagens"
-    
-    echo ""
-    echo -e "${CYAN}📋 Gerando lote de remarketing (48h+)...${NC}"
-    
-    # Gera batch de remarketing usando Python
-    python3 << EOF
-from openpyxl import load_workbook, Workbook
-from openpyxl.styles import Font, PatternFill
-from datetime import datetime, timedelta
-
-# Carrega contatos
-wb = load_workbook('$contatos_xlsx')
-ws = wb.active
-
-# Carrega log de enviados e identifica elegíveis para remarketing
-remarketing_eligible = {}  # telefone -> (timestamp, msg_num)
-try:
-    with open('$enviados_log', 'r') as f:
-        for line in f:
-            parts = line.strip().split('|')
-            if len(parts) >= 3:
-                telefone = parts[0]
-                timestamp_str = parts[1]
-                msg_num = int(parts[2])
-                try:
-                    sent_time = datetime.fromisoformat(timestamp_str)
-                    hours_ago = (datetime.now() - sent_time).total_seconds() / 3600
-                    
-                    # Elegível: 48h+ desde último envio E menos de 3 mensagens
-                    if hours_ago >= 48 and msg_num < 3:
-                        # Guarda o mais recente para cada telefone
-                        if telefone not in remarketing_eligible or sent_time > remarketing_eligible[telefone][0]:
-                            remarketing_eligible[telefone] = (sent_time, msg_num)
-                except:
-                    pass
-            elif len(parts) == 1:
-                # Formato antigo (só telefone) - assume 48h+
-                telefone = parts[0]
-                remarketing_eligible[telefone] = (datetime.now() - timedelta(hours=48), 1)
-except:
-    pass
-
-# Busca dados dos contatos elegíveis
-batch = []
-for row in ws.iter_rows(min_row=2, values_only=True):
-    telefone = row[1] if len(row) > 1 else None
-    if telefone and str(telefone) != 'N/A':
-        telefone_str = str(telefone).strip()
-        if telefone_str in remarketing_eligible:
-            batch.append((row, remarketing_eligible[telefone_str][1]))
-
-# Limita a 20
-batch = batch[:20]
-
-if not batch:
-    print("EMPTY")
-    exit(0)
-
-# Cria XLSX com batch de remarketing
-wb_batch = Workbook()
-ws_batch = wb_batch.active
-ws_batch.title = "Remarketing"
-
-headers = ["Nome", "Telefone", "Endereço", "Avaliação", "Website", "Msg_Anterior"]
-header_font = Font(bold=True, color="FFFFFF")
-header_fill = PatternFill(start_color="E67E22", end_color="E67E22", fill_type="solid")
-
-for col, header in enumerate(headers, 1):
-    cell = ws_batch.cell(row=1, column=col, value=header)
-    cell.font = header_font
-    cell.fill = header_fill
-
-for row_idx, (row_data, msg_num) in enumerate(batch, 2):
-    for col_idx, value in enumerate(row_data[:5], 1):
-        ws_batch.cell(row=row_idx, column=col_idx, value=value)
-    ws_batch.cell(row=row_idx, column=6, value=msg_num)
-
-ws_batch.column_dimensions['A'].width = 40
-ws_batch.column_dimensions['B'].width = 18
-ws_batch.column_dimensions['C'].width = 50
-
-wb_batch.save('$batch_xlsx')
-print(f"OK:{len(batch)}")
-EOF
-    
-    local result=$(python3 -c "
-from openpyxl import load_workbook
-try:
-    wb = load_workbook('$batch_xlsx')
-    ws = wb.active
-    count = sum(1 for row in ws.iter_rows(min_row=2, values_only=True) if row[0])
-    print(f'OK:{count}')
-except:
-    print('EMPTY')
-" 2>/dev/null)
-    
-    if [[ "$result" == "EMPTY" ]] || [[ -z "$result" ]]; then
-        echo -e "${YELLOW}⚠️  Nenhum contato elegível para remarketing (48h+)${NC}"
-        return 0
-    fi
-    
-    local batch_count=$(echo "$result" | cut -d: -f2)
-    
-    echo -e "${GREEN}✅ $batch_count contatos elegíveis para follow-up${NC}"
-    
-    # Mensagem de follow-up padrão
-    local mensagem_followup="Olá! 👋
-
-Entrei em contato há alguns dias sobre desenvolvimento de *sites profissionais* para a *{nome}*.
-
-Sei que você deve estar ocupado(a), mas queria saber se teve a chance de pensar sobre isso?
-
-🎁 *Oferta especial*: Se fechar até o fim da semana, ganhe:
-✅ Hospedagem grátis por 1 ano
-✅ Domínio .com.br incluso
-✅ Suporte prioritário
-
-Posso esclarecer alguma dúvida? 😊"
-    
-    # Verifica se existe mensagem de follow-up personalizada
-    if [[ -f "$mensagens_dir/followup_48h.txt" ]]; then
-        mensagem_followup=$(cat "$mensagens_dir/followup_48h.txt")
-    fi
-    
-    echo ""
-    print_separator
-    echo -e "${YELLOW}📝 Mensagem de Follow-up:${NC}"
-    print_separator
-    echo "$mensagem_followup"
-    print_separator
-    echo ""
-    
-    read -rp "⚠️  Deseja enviar follow-up para $batch_count contatos? (s/N): " confirma
-    
-    if [[ "$confirma" != "s" ]] && [[ "$confirma" != "S" ]]; then
-        echo -e "${YELLOW}Operação cancelada${NC}"
-        rm -f "$batch_xlsx"
-        return 0
-    fi
-    
-    # Envia mensagens
+    # Lote de remarketing (mensagens/followup_48h.txt ou a padrão), confirma e envia
     echo ""
-    echo -e "${CYAN}📤 Enviando follow-up...${NC}"
-    
-    cd "$SCRIPT_DIR"
-    python3 whatsapp_sender.py "$batch_xlsx" "$mensagem_followup"
-    
-    # Atualiza log incrementando o número da mensagem
-    python3 << EOF
-from openpyxl import load_workbook
-from datetime import datetime
-
-wb = load_workbook('$batch_xlsx')
-ws = wb.active
-
-timestamp = datetime.now().isoformat()
-
-# Lê log atual
-log_entries = {}
-try:
-    with open('$enviados_log', 'r') as f:
-        for line in f:
-            parts = line.strip().split('|')
-            if len(parts) >= 3:
-                telefone = parts[0]
-                log_entries[telefone] = parts
-except:
-    pass
-
-# Atualiza com novo envio
-with open('$enviados_log', 'w') as f:
-    updated_phones = set()
-    
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        telefone = row[1] if len(row) > 1 else None
-        msg_anterior = row[5] if len(row) > 5 else 1
-        
-        if telefone and str(telefone) != 'N/A':
-            telefone_str = str(telefone).strip()
-            new_msg_num = int(msg_anterior) + 1 if msg_anterior else 2
-            f.write(f"{telefone_str}|{timestamp}|{new_msg_num}\n")
-            updated_phones.add(telefone_str)
-    
-    # Mantém os outros registros que não foram atualizados
-    for telefone, parts in log_entries.items():
-        if telefone not in updated_phones:
-            f.write('|'.join(parts) + '\n')
-
-print("Log atualizado")
-EOF
-    
-    echo ""
-    echo -e "${GREEN}✅ Follow-up enviado com sucesso!${NC}"
-    
-    rm -f "$batch_xlsx"
+    cli followup "$campanha_selecionada" --limite=20 || true
 }
 
 # =============================================================================
@@ -1071,7 +527,6 @@ EOF
 # =============================================================================
 
 LEADS_FILE="$CAMPANHAS_DIR/leads.log"
-BLOCKLIST_FILE="$CAMPANHAS_DIR/blocklist.log"
 
 gerenciar_contatos() {
     while true; do
@@ -1181,29 +636,13 @@ adicionar_blocklist() {
         return
     fi
     
-    # Formata número
-    local numero=$(echo "$telefone" | tr -cd '0-9')
-    
     echo -e "${CYAN}   Motivo (opcional):${NC}"
     read -r motivo
     
-    local timestamp=$(date -Iseconds)
-    
-    # Adiciona ao arquivo de blocklist
-    touch "$BLOCKLIST_FILE"
-    
-    # Verifica se já existe
-    if grep -q "^${numero}|" "$BLOCKLIST_FILE" 2>/dev/null; then
-        echo -e "${YELLOW}⚠️  Este número já está na blocklist${NC}"
-        return
-    fi
-    
-    echo "${numero}|${motivo:-pediu para não receber}|${timestamp}" >> "$BLOCKLIST_FILE"
-    
+    # Compara pelo número normalizado: (61) 99999-0000 e 5561999990000 são o mesmo
     echo ""
-    echo -e "${GREEN}✅ Número adicionado à blocklist!${NC}"
-    echo -e "   📞 Telefone: $numero"
-    echo -e "   🚫 Este número não receberá mais mensagens"
+    cli blocklist add "$telefone" "$motivo" && \
+        echo -e "   🚫 Este número não receberá mais mensagens"
 }
 
 ver_leads() {
@@ -1234,24 +673,8 @@ ver_blocklist() {
     echo ""
     echo -e "${CYAN}🚫 Blocklist (Não Enviar)${NC}"
     print_separator
-    
-    if [[ ! -f "$BLOCKLIST_FILE" ]] || [[ ! -s "$BLOCKLIST_FILE" ]]; then
-        echo -e "${YELLOW}Blocklist vazia${NC}"
-        return
-    fi
-    
-    echo ""
-    printf "%-18s %-30s %-12s\n" "TELEFONE" "MOTIVO" "DATA"
-    echo "-----------------------------------------------------------"
-    
-    while IFS='|' read -r telefone motivo timestamp; do
-        local data=$(echo "$timestamp" | cut -d'T' -f1)
-        printf "%-18s %-30s %-12s\n" "$telefone" "${motivo:0:28}" "$data"
-    done < "$BLOCKLIST_FILE"
-    
     echo ""
-    local total=$(wc -l < "$BLOCKLIST_FILE")
-    echo -e "${RED}Total: $total bloqueados${NC}"
+    cli blocklist list
 }
 
 remover_blocklist() {
@@ -1265,20 +688,7 @@ remover_blocklist() {
         return
     fi
     
-    local numero=$(echo "$telefone" | tr -cd '0-9')
-    
-    if [[ ! -f "$BLOCKLIST_FILE" ]]; then
-        echo -e "${YELLOW}Blocklist vazia${NC}"
-        return
-    fi
-    
-    if grep -q "^${numero}|" "$BLOCKLIST_FILE"; then
-        grep -v "^${numero}|" "$BLOCKLIST_FILE" > "$BLOCKLIST_FILE.tmp"
-        mv "$BLOCKLIST_FILE.tmp" "$BLOCKLIST_FILE"
-        echo -e "${GREEN}✅ Número removido da blocklist${NC}"
-    else
-        echo -e "${YELLOW}⚠️  Número não encontrado na blocklist${NC}"
-    fi
+    cli blocklist remove "$telefone" || true
 }
 
 # =============================================================================
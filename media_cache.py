@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Media Cache
+Arquivos locais (imagens, PDFs, vídeos) codificados em base64 uma única
+vez e guardados pelo hash do conteúdo, para enviar a mesma mídia a todos
+os contatos sem reprocessá-la
+"""
+
+import base64
+import hashlib
+import io
+import json
+import mimetypes
+import mmap
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, "campanhas", ".media")
+
+# Múltiplo de 3: os pedaços em base64 se concatenam sem padding no meio
+CHUNK_SIZE = 3 * 256 * 1024
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    """Mídia já codificada no cache"""
+    sha256: str
+    cache_path: str     # <sha256>.b64 (texto base64, sem quebras de linha)
+    size: int           # bytes do arquivo original
+    mimetype: str
+    file_name: str
+    media_type: str     # image, video, audio ou document
+
+
+def media_type_of(mimetype: str) -> str:
+    """Tipo de mídia da Evolution API para um mimetype"""
+    kind = mimetype.split('/', 1)[0]
+    return kind if kind in ("image", "video", "audio") else "document"
+
+
+class MediaBody(io.RawIOBase):
+    """
+    Corpo JSON de um envio de mídia lido em pedaços: prefixo (número,
+    legenda...), o base64 direto do mmap do cache e o fechamento. Nada é
+    copiado para montar a requisição; o requests envia com Content-Length.
+    """
+
+    def __init__(self, parts: tuple):
+        self._parts = parts
+        self._size = sum(len(part) for part in parts)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return self._size
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, min(self._size, base + offset))
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        target = memoryview(buffer).cast('B')
+        written = 0
+        start = 0
+        for part in self._parts:
+            end = start + len(part)
+            if self._pos < end and written < len(target):
+                offset = self._pos - start
+                count = min(end - self._pos, len(target) - written)
+                target[written:written + count] = part[offset:offset + count]
+                written += count
+                self._pos += count
+            start = end
+        return written
+
+
+class MediaCache:
+    """
+    Cache de mídia por conteúdo (campanhas/.media/<sha256>.b64).
+
+    Cada arquivo é lido uma vez, em pedaços, calculando o hash e o base64
+    no mesmo passo. O resultado fica mapeado em memória (mmap) e é
+    compartilhado por todos os envios e instâncias do processo; outros
+    processos leem o mesmo arquivo pelo cache de páginas do sistema.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._files: dict[tuple, MediaFile] = {}
+        self._maps: dict[str, mmap.mmap] = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> MediaFile:
+        """
+        Mídia codificada de um arquivo local (codifica na primeira vez, ou
+        quando o arquivo muda de tamanho/data).
+
+        Raises:
+            FileNotFoundError: se o arquivo não existir
+        """
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            media = self._files.get(key)
+            if media is None:
+                media = self._files[key] = self._encode(path, st.st_size)
+            return media
+
+    def _encode(self, path: str, size: int) -> MediaFile:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    dst.write(base64.b64encode(chunk))
+            cache_path = os.path.join(self.cache_dir, f"{digest.hexdigest()}.b64")
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return MediaFile(digest.hexdigest(), cache_path, size, mimetype,
+                         os.path.basename(path), media_type_of(mimetype))
+
+    def _map(self, media: MediaFile):
+        with self._lock:
+            mapped = self._maps.get(media.sha256)
+            if mapped is None:
+                with open(media.cache_path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        return b""  # arquivo vazio (mmap não aceita tamanho 0)
+                    mapped = self._maps[media.sha256] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return mapped
+
+    def body(self, media: MediaFile, fields: dict) -> MediaBody:
+        """
+        Corpo JSON {**fields, "media": "<base64>"} para um envio.
+
+        Args:
+            media: Mídia do cache
+            fields: Demais campos do payload (número, legenda, tipo...)
+        """
+        head = json.dumps(fields, ensure_ascii=False).encode()
+        head = head[:-1] + (b', "media": "' if fields else b'"media": "')
+        return MediaBody((head, memoryview(self._map(media)), b'"}'))
+
+    def close(self):
+        with self._lock:
+            for mapped in self._maps.values():
+                try:
+                    mapped.close()
+                except BufferError:
+                    pass  # ainda referenciado por um corpo em uso; fecha com o coletor
+            self._maps.clear()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Uso: python3 media_cache.py <arquivo> [...]
+    if len(sys.argv) < 2:
+        print("Uso: python3 media_cache.py <arquivo> [...]")
+        sys.exit(1)
+    cache = MediaCache()
+    for file_path in sys.argv[1:]:
+        start = time.perf_counter()
+        media = cache.get(file_path)
+        print(f"📎 {media.file_name}: {media.media_type} ({media.mimetype}, {media.size / 1024:.0f} KB) "
+              f"em {time.perf_counter() - start:.2f}s -> {media.sha256[:12]}")
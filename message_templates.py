@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Message Templates
+Templates de mensagem pré-compilados ({nome}, {endereco}...), com cache por arquivo
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Mapping, Optional
+
+
+# Variável -> coluna da planilha (mesma ordem do Google Scraper / batches)
+FIELDS = {
+    "nome": 0,
+    "telefone": 1,
+    "endereco": 2,
+    "avaliacao": 3,
+    "website": 4,
+}
+
+_PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+_cache: dict[str, tuple[tuple, "MessageTemplate"]] = {}
+_cache_lock = threading.Lock()
+
+
+class TemplateError(ValueError):
+    """Template com variáveis que não existem na planilha"""
+
+
+class MessageTemplate:
+    """
+    Template já separado em trechos fixos e variáveis.
+
+    A análise é feita uma vez; cada renderização só preenche as variáveis
+    e junta os trechos com um único join. Chaves entre chaves que não são
+    variáveis conhecidas ficam no texto como estão (e são listadas em
+    `unknown`).
+    """
+
+    def __init__(self, text: str, strict: bool = False):
+        """
+        Args:
+            text: Texto da mensagem
+            strict: Lança TemplateError se houver variáveis desconhecidas
+        """
+        self.text = text
+        self.unknown: list[str] = []
+        self._parts: list[str] = []
+        self._slots: list[tuple[int, str, int]] = []  # (posição, variável, coluna)
+
+        last = 0
+        for match in _PLACEHOLDER.finditer(text):
+            name = match.group(1)
+            if name not in FIELDS:
+                if name not in self.unknown:
+                    self.unknown.append(name)
+                continue
+            self._parts.append(text[last:match.start()])
+            self._slots.append((len(self._parts), name, FIELDS[name]))
+            self._parts.append("")
+            last = match.end()
+        self._parts.append(text[last:])
+
+        if strict and self.unknown:
+            raise TemplateError(f"Variáveis desconhecidas: {', '.join('{' + name + '}' for name in self.unknown)}")
+
+    @property
+    def variables(self) -> list[str]:
+        """Variáveis usadas, na ordem em que aparecem"""
+        return list(dict.fromkeys(name for _, name, _ in self._slots))
+
+    def render(self, values: Mapping, defaults: Optional[Mapping] = None) -> str:
+        """
+        Preenche o template a partir de um dicionário.
+
+        Args:
+            values: {variável: valor}
+            defaults: Valores usados quando a variável está vazia
+        """
+        parts = self._parts[:]
+        for pos, name, _ in self._slots:
+            value = values.get(name)
+            if value is None or value == "":
+                value = defaults.get(name, "") if defaults else ""
+            parts[pos] = str(value)
+        return ''.join(parts)
+
+    def render_row(self, row: tuple, defaults: Optional[Mapping] = None) -> str:
+        """Preenche o template com as colunas de uma linha da planilha"""
+        parts = self._parts[:]
+        size = len(row)
+        for pos, name, column in self._slots:
+            value = row[column] if column < size else None
+            if value is None or value == "":
+                value = defaults.get(name, "") if defaults else ""
+            parts[pos] = str(value)
+        return ''.join(parts)
+
+    def render_contact(self, contact, defaults: Optional[Mapping] = None) -> str:
+        """Preenche o template com os atributos de um Contact"""
+        parts = self._parts[:]
+        for pos, name, _ in self._slots:
+            value = getattr(contact, name, None)
+            if value is None or value == "":
+                value = defaults.get(name, "") if defaults else ""
+            parts[pos] = str(value)
+        return ''.join(parts)
+
+
+def register_field(name: str, column: int):
+    """
+    Registra uma variável extra lida de uma coluna da planilha.
+
+    Ex: register_field("categoria", 5) permite usar {categoria}.
+    Os templates já compilados são descartados.
+    """
+    FIELDS[name] = column
+    clear_cache()
+
+
+def register_columns(header: tuple):
+    """
+    Registra como variáveis as colunas de um cabeçalho de planilha.
+
+    Ex: a coluna "Categoria" vira {categoria} e "Horário" vira {horario}.
+    Variáveis já registradas mantêm a coluna atual.
+    """
+    for column, title in enumerate(header):
+        if not title:
+            continue
+        name = unicodedata.normalize('NFKD', str(title)).encode('ascii', 'ignore').decode()
+        name = re.sub(r'\W+', '_', name.strip().lower()).strip('_')
+        if name and name not in FIELDS:
+            FIELDS[name] = column
+    clear_cache()
+
+
+def compile_template(text: str) -> MessageTemplate:
+    """Compila um template de texto (cache em memória pelo próprio texto)"""
+    return _compile_cached(text)
+
+
+@lru_cache(maxsize=128)
+def _compile_cached(text: str) -> MessageTemplate:
+    return MessageTemplate(text)
+
+
+def load_template(path: str) -> MessageTemplate:
+    """
+    Compila o template de um arquivo .txt, com cache por caminho.
+
+    O arquivo só é relido quando muda a data de modificação ou o tamanho.
+    Espaços e quebras de linha nas pontas do arquivo não fazem parte da mensagem.
+    """
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    entry = _cache.get(path)
+    if entry and entry[0] == key:
+        return entry[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        template = MessageTemplate(f.read().strip())
+    with _cache_lock:
+        _cache[path] = (key, template)
+    return template
+
+
+def clear_cache():
+    """Descarta todos os templates compilados"""
+    with _cache_lock:
+        _cache.clear()
+    _compile_cached.cache_clear()
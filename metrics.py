@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Metrics
+Métricas de execução (latência da API, vazão de envio, filas, cache de
+verificação), expostas no formato texto do Prometheus e gravadas em JSONL
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+# Limites (segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labels)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {value:g}"]
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            items = list(self._values.items())
+        return [dict(zip(self.labelnames, key), value=self._snapshot_value(value)) for key, value in items]
+
+    def _snapshot_value(self, value):
+        return value
+
+
+class Counter(_Metric):
+    """Contador que só cresce"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Valor instantâneo (ex: tamanho de fila)"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Distribuição de valores em faixas cumulativas (le), com soma e contagem"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            labels = _labels(self.labelnames, key, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:g}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def _snapshot_value(self, value):
+        counts, total, count = value
+        return {"count": count, "sum": round(total, 6), "buckets": dict(zip(
+            [f'{bound:g}' for bound in self.buckets] + ['+Inf'], counts))}
+
+
+class Registry:
+    """Conjunto de métricas do processo"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, labels: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def add_collector(self, collect):
+        """Função chamada antes de cada leitura (render/snapshot) para atualizar gauges"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def _collect(self):
+        with self._lock:
+            collectors = list(self._collectors)
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"⚠️  Métricas: coletor falhou: {e}")
+
+    def render(self) -> str:
+        """Todas as métricas no formato texto do Prometheus"""
+        self._collect()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> dict:
+        """Todas as métricas como dicionário (para o JSONL)"""
+        self._collect()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+REGISTRY = Registry()
+
+# ==================== Métricas do envio ====================
+
+API_LATENCY = REGISTRY.histogram(
+    "evolution_request_seconds", "Latência das chamadas à Evolution API", ("endpoint", "instance"))
+API_REQUESTS = REGISTRY.counter(
+    "evolution_requests_total", "Chamadas à Evolution API por resultado", ("endpoint", "instance", "status"))
+MESSAGES = REGISTRY.counter(
+    "sender_messages_total", "Contatos processados por resultado", ("instance", "status"))
+VERIFIER_LOOKUPS = REGISTRY.counter(
+    "verifier_lookups_total", "Números resolvidos pelo cache (hit) ou pela API (miss)", ("result",))
+SLEEP_SECONDS = REGISTRY.counter(
+    "scheduler_sleep_seconds_total", "Tempo esperando o ritmo de envio", ("instance",))
+BUSY_SECONDS = REGISTRY.counter(
+    "scheduler_busy_seconds_total", "Tempo em chamadas de presença e envio", ("instance",))
+PREPARE_WAIT_SECONDS = REGISTRY.counter(
+    "scheduler_prepare_wait_seconds_total", "Tempo esperando verificação/renderização do próximo contato",
+    ("instance",))
+QUEUE_DEPTH = REGISTRY.gauge(
+    "scheduler_queue_depth", "Contatos aguardando envio", ("instance", "queue"))
+SEND_INTERVAL = REGISTRY.gauge(
+    "scheduler_interval_seconds", "Intervalo atual entre envios (após o ajuste AIMD)", ("instance",))
+CAMPAIGN_CONTACTS = REGISTRY.gauge(
+    "campaign_contacts", "Contatos por campanha e situação (rows, valid, sent, pending, followup...)",
+    ("campaign", "status"))
+
+
+# ==================== Exposição ====================
+
+_server: Optional[ThreadingHTTPServer] = None
+_writer: Optional["JsonlWriter"] = None
+_start_lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Sobe o endpoint /metrics numa thread em segundo plano"""
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class JsonlWriter:
+    """
+    Grava periodicamente um snapshot das métricas como uma linha JSON
+    ({"ts": ..., "metrics": {...}}), e uma última ao encerrar.
+    """
+
+    def __init__(self, path: str, interval: float = 30.0, registry: Registry = REGISTRY):
+        """
+        Args:
+            path: Arquivo .jsonl (acrescenta ao final)
+            interval: Segundos entre dois snapshots
+            registry: Métricas gravadas
+        """
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._thread = threading.Thread(target=self._loop, name="metrics-jsonl", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        line = json.dumps({"ts": round(time.time(), 3), "metrics": self.registry.snapshot()},
+                          ensure_ascii=False)
+        with open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+    def close(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self.flush()
+
+
+def start_from_env():
+    """
+    Liga a exposição configurada no ambiente (uma vez por processo):
+
+    - METRICS_PORT: porta local do endpoint /metrics (Prometheus)
+    - METRICS_JSONL: arquivo onde gravar snapshots em JSONL
+    - METRICS_INTERVAL: segundos entre snapshots (padrão 30)
+    """
+    global _server, _writer
+    with _start_lock:
+        port = os.environ.get("METRICS_PORT")
+        if port and _server is None:
+            try:
+                _server = serve(int(port), os.environ.get("METRICS_HOST", "127.0.0.1"))
+                print(f"📈 Métricas em http://{_server.server_address[0]}:{_server.server_address[1]}/metrics")
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Métricas: não foi possível abrir a porta {port}: {e}")
+        path = os.environ.get("METRICS_JSONL")
+        if path and _writer is None:
+            _writer = JsonlWriter(path, float(os.environ.get("METRICS_INTERVAL", 30)))
+            atexit.register(_writer.close)
+
+
+if __name__ == "__main__":
+    print(REGISTRY.render(), end='')
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Number Verifier
+Verificação em lote de números no WhatsApp com cache persistente em disco
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+import metrics
+import profiler
+from evolution_client import EvolutionAPI
+from phone_numbers import phone_key
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "campanhas", "verificados.log")
+# O log é reescrito só com as verificações válidas quando tem mais que o dobro
+# de linhas (e pelo menos este tanto)
+COMPACT_MIN_LINES = 10_000
+
+
+class NumberVerifier:
+    """
+    Verifica se números têm WhatsApp em blocos, com cache em disco.
+
+    O cache é um log no mesmo formato dos outros arquivos da campanha
+    (numero|existe|timestamp), com uma linha por verificação; a última
+    linha de cada número vale. Entradas mais antigas que o TTL são
+    ignoradas e verificadas de novo; ao carregar, as vencidas ficam de fora
+    da memória e o log é compactado quando acumula linhas repetidas.
+    """
+
+    def __init__(self, api: EvolutionAPI, instance_name: str = "business_sender",
+                 cache_path: str = DEFAULT_CACHE_PATH, ttl_hours: float = 24 * 30,
+                 chunk_size: int = 50):
+        """
+        Args:
+            api: Cliente da Evolution API
+            instance_name: Instância usada nas verificações
+            cache_path: Arquivo do cache (None desativa a persistência)
+            ttl_hours: Validade de cada verificação (horas)
+            chunk_size: Quantidade de números por requisição
+        """
+        self.api = api
+        self.instance_name = instance_name
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_hours * 3600
+        self.chunk_size = chunk_size
+
+        self._cache: dict[str, tuple[bool, float]] = {}
+        self._pending: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="verifier")
+        self._load_cache()
+
+    @staticmethod
+    def normalize(phone: str) -> str:
+        """Chave do cache: o número no formato enviado para a API"""
+        return phone_key(phone)
+
+    def _load_cache(self):
+        """Carrega do disco as verificações ainda válidas"""
+        if not self.cache_path:
+            return
+        lines = 0
+        try:
+            with open(self.cache_path, 'r') as f:
+                for line in f:
+                    lines += 1
+                    parts = line.strip().split('|')
+                    if len(parts) >= 3:
+                        try:
+                            self._cache[parts[0]] = (parts[1] == '1', float(parts[2]))
+                        except ValueError:
+                            pass
+        except FileNotFoundError:
+            return
+        expired_before = time.time() - self.ttl_seconds
+        self._cache = {numero: entry for numero, entry in self._cache.items() if entry[1] >= expired_before}
+        if lines >= COMPACT_MIN_LINES and lines > 2 * len(self._cache):
+            self._compact()
+
+    def _compact(self):
+        """
+        Reescreve o log só com a última verificação válida de cada número
+        (uma linha que outro processo acrescente no meio disso se perde, e
+        o número é verificado de novo: é só cache)
+        """
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w') as f:
+                f.writelines(f"{numero}|{1 if existe else 0}|{checked_at:.0f}\n"
+                             for numero, (existe, checked_at) in self._cache.items())
+            os.replace(tmp_path, self.cache_path)
+
+    def _save(self, results: dict[str, bool], checked_at: float):
+        """Acrescenta resultados ao cache em disco"""
+        if not self.cache_path or not results:
+            return
+        lines = ''.join(f"{numero}|{1 if existe else 0}|{checked_at:.0f}\n" for numero, existe in results.items())
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        with self._lock:
+            with open(self.cache_path, 'a') as f:
+                f.write(lines)
+
+    def cached(self, phone: str) -> Optional[bool]:
+        """Resultado em cache ainda válido, ou None"""
+        entry = self._cache.get(self.normalize(phone))
+        if entry and time.time() - entry[1] < self.ttl_seconds:
+            return entry[0]
+        return None
+
+    def _verify_chunk(self, numbers: list[str]) -> dict[str, bool]:
+        """
+        Verifica um bloco de números já normalizados (uma requisição).
+
+        Returns:
+            {numero: existe}, vazio se a API falhou
+        """
+        with profiler.span("verify_chunk", instance=self.instance_name, numbers=len(numbers)):
+            results = self.api.whatsapp_numbers(self.instance_name, numbers)
+        if results is None:
+            # Erro na API: não guarda nada, tenta de novo numa próxima vez
+            for numero in numbers:
+                self._pending.pop(numero, None)
+            return {}
+
+        # Números que a API não devolveu são considerados sem WhatsApp
+        resolved = {numero: results.get(numero, False) for numero in numbers}
+        checked_at = time.time()
+        with self._lock:
+            for numero, existe in resolved.items():
+                self._cache[numero] = (existe, checked_at)
+        for numero in numbers:
+            self._pending.pop(numero, None)
+        self._save(resolved, checked_at)
+        return resolved
+
+    def _misses(self, phones) -> list[str]:
+        """Números normalizados sem cache válido nem verificação em andamento"""
+        misses = []
+        seen = set()
+        for phone in phones:
+            numero = self.normalize(phone)
+            if numero in seen or numero in self._pending:
+                continue
+            seen.add(numero)
+            if self.cached(numero) is not None:
+                metrics.VERIFIER_LOOKUPS.inc(result="hit")
+                continue
+            misses.append(numero)
+        metrics.VERIFIER_LOOKUPS.inc(len(misses), result="miss")
+        return misses
+
+    def prefetch(self, phones):
+        """Agenda em segundo plano a verificação dos números ainda sem cache"""
+        misses = self._misses(phones)
+        for i in range(0, len(misses), self.chunk_size):
+            chunk = misses[i:i + self.chunk_size]
+            future = self._executor.submit(self._verify_chunk, chunk)
+            for numero in chunk:
+                self._pending[numero] = future
+
+    def prefetch_iter(self, items: Iterable, phone: Callable = str) -> Iterator:
+        """
+        Repassa os itens de um gerador, agendando a verificação em blocos
+        à frente do consumo (lê no máximo `chunk_size` itens adiantados).
+        """
+        ready = []
+        buffer = []
+        for item in items:
+            buffer.append(item)
+            if len(buffer) >= self.chunk_size:
+                # Agenda o bloco seguinte antes de liberar o atual
+                self.prefetch(phone(i) for i in buffer)
+                yield from ready
+                ready, buffer = buffer, []
+        self.prefetch(phone(i) for i in buffer)
+        yield from ready
+        yield from buffer
+
+    def verify(self, phones) -> dict[str, Optional[bool]]:
+        """
+        Verifica vários números (cache + requisições em bloco) e retorna
+        {numero: existe}, com None nos que a API não conseguiu verificar
+        """
+        phones = list(phones)
+        self.prefetch(phones)
+        return {self.normalize(phone): self.has_whatsapp(phone) for phone in phones}
+
+    def has_whatsapp(self, phone: str) -> Optional[bool]:
+        """
+        Verifica um número, aproveitando cache e verificações antecipadas.
+
+        Returns:
+            True/False, ou None se a API falhou (erro passageiro: não é
+            o mesmo que "sem WhatsApp" e não vai para o cache)
+        """
+        numero = self.normalize(phone)
+        result = self.cached(numero)
+        if result is not None:
+            return result
+
+        future = self._pending.pop(numero, None)
+        if future:
+            return future.result().get(numero)
+
+        # O bloco pode ter terminado entre as duas consultas acima
+        result = self.cached(numero)
+        if result is not None:
+            return result
+        metrics.VERIFIER_LOOKUPS.inc(result="miss")
+        return self._verify_chunk([numero]).get(numero)
+
+    def close(self):
+        """Encerra as threads de verificação"""
+        self._executor.shutdown(wait=True)
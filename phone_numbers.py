@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Phone Numbers
+Normalização única dos telefones para o formato canônico do WhatsApp
+(somente dígitos, com código do país: 5511999999999)
+"""
+
+from functools import lru_cache
+from typing import Iterable, Optional
+
+
+# Código do país -> (mín, máx) de dígitos do número completo, com o código.
+# Os códigos E.164 não são prefixo uns dos outros, então basta testar os
+# prefixos de 1, 2 e 3 dígitos: no máximo um deles está na tabela.
+COUNTRY_CODES = {
+    '1': (11, 11),     # EUA/Canadá
+    '7': (11, 11),     # Rússia/Cazaquistão
+    '27': (11, 11),    # África do Sul
+    '31': (11, 11),    # Holanda
+    '32': (10, 11),    # Bélgica
+    '33': (11, 11),    # França
+    '34': (11, 11),    # Espanha
+    '39': (11, 13),    # Itália
+    '41': (11, 11),    # Suíça
+    '44': (12, 12),    # UK
+    '49': (11, 14),    # Alemanha
+    '51': (10, 11),    # Peru
+    '52': (12, 13),    # México
+    '54': (12, 13),    # Argentina
+    '55': (12, 13),    # Brasil (55 + DDD + 8 ou 9 dígitos)
+    '56': (11, 11),    # Chile
+    '57': (12, 12),    # Colômbia
+    '58': (12, 12),    # Venezuela
+    '61': (11, 11),    # Austrália
+    '81': (11, 12),    # Japão
+    '86': (13, 13),    # China
+    '91': (12, 12),    # Índia
+    '351': (12, 12),   # Portugal
+    '353': (11, 12),   # Irlanda
+    '591': (11, 11),   # Bolívia
+    '595': (12, 12),   # Paraguai
+    '598': (11, 11),   # Uruguai
+    '971': (12, 12),   # Emirados
+}
+
+BRAZIL_CODE = '55'
+MAX_DIGITS = 15  # Limite do E.164
+# Todos os bytes que não são dígitos ASCII: bytes.translate remove tudo de
+# uma vez, bem mais rápido que re.sub (caracteres não ASCII viram bytes >= 128)
+_NON_DIGIT_BYTES = bytes(c for c in range(256) if not 48 <= c <= 57)
+
+
+def only_digits(phone: str) -> str:
+    """Remove tudo que não for dígito"""
+    return phone.encode('utf-8', 'ignore').translate(None, _NON_DIGIT_BYTES).decode('ascii')
+
+
+def country_code(digits: str) -> Optional[str]:
+    """Código do país no início dos dígitos (None se não estiver na tabela)"""
+    for size in (1, 2, 3):
+        code = digits[:size]
+        if code in COUNTRY_CODES:
+            return code
+    return None
+
+
+def _is_brazilian_local(digits: str) -> bool:
+    """
+    DDD + número, sem código do país (10 ou 11 dígitos).
+
+    DDDs não terminam em 0, e todo celular de 11 dígitos tem o 9 na
+    frente; assim '11 90001-0000' é São Paulo, e não um número dos EUA.
+    """
+    if len(digits) == 10:
+        return digits[0] != '0' and digits[1] != '0'
+    if len(digits) == 11:
+        return digits[0] != '0' and digits[1] != '0' and digits[2] == '9'
+    return False
+
+
+def _fits_country(digits: str) -> bool:
+    """Número com código do país e tamanho compatível"""
+    if not 8 <= len(digits) <= MAX_DIGITS:
+        return False
+    code = country_code(digits)
+    if code is None:
+        # Código fora da tabela: aceita qualquer tamanho válido no E.164
+        return len(digits) >= 12
+    low, high = COUNTRY_CODES[code]
+    return low <= len(digits) <= high
+
+
+def _normalize(phone: str) -> Optional[str]:
+    """Regras de normalização (sem cache); veja normalize_phone()"""
+    phone = phone.strip()
+    digits = only_digits(phone)
+    if len(digits) < 8:
+        return None
+
+    # '+55...' ou '0055...': o código do país vem explícito
+    if phone.startswith('+') or digits.startswith('00'):
+        digits = digits.lstrip('0')
+        return digits if _fits_country(digits) else None
+
+    # Prefixo de operadora/tronco nacional (011 99999-9999)
+    if digits.startswith('0'):
+        digits = digits[1:]
+
+    if _is_brazilian_local(digits):
+        return BRAZIL_CODE + digits
+    if len(digits) >= 11 and _fits_country(digits):
+        return digits
+    return None
+
+
+@lru_cache(maxsize=65536)
+def normalize_phone(phone: str) -> Optional[str]:
+    """
+    Normaliza um telefone para o formato canônico do WhatsApp.
+
+    Suporta:
+    - Brasil: +55, 55, 0 + DDD ou formato local (11 999999999)
+    - Outros países com o código incluso (+1, +351, +44...)
+
+    Args:
+        phone: Telefone em qualquer formatação
+
+    Returns:
+        Telefone canônico (ex: "5511999999999") ou None se inválido
+    """
+    return _normalize(phone)
+
+
+def phone_key(phone) -> str:
+    """
+    Chave do telefone para a API, caches e índices (nunca None).
+
+    Números que não passam na normalização ficam só com os dígitos,
+    para que cheguem à API do jeito que foram digitados.
+    """
+    phone = str(phone)
+    return normalize_phone(phone) or only_digits(phone)
+
+
+def normalize_many(phones: Iterable, keys: bool = False) -> list[Optional[str]]:
+    """
+    Normaliza uma coluna inteira de telefones de uma vez.
+
+    Não passa pelo LRU do caminho unitário (uma coluna grande só o
+    esvaziaria): cada valor distinto da coluna é normalizado uma vez
+    e o resultado é espalhado de volta para as linhas.
+
+    Args:
+        phones: Telefones (strings, números ou None)
+        keys: Devolve chaves como phone_key() em vez de None nos inválidos
+
+    Returns:
+        Lista na mesma ordem, com None nos inválidos
+    """
+    phones = phones if isinstance(phones, list) else list(phones)
+    normalize = _normalize
+    table = {}
+    for phone in dict.fromkeys(phones):
+        text = phone if phone.__class__ is str else str(phone or '')
+        result = normalize(text)
+        table[phone] = only_digits(text) if result is None and keys else result
+    return list(map(table.__getitem__, phones))
+
+
+def _benchmark(total: int):
+    """Normaliza `total` números sintéticos nos dois caminhos e mostra a vazão"""
+    import random
+    import time
+
+    formats = [
+        lambda d: f"({d[:2]}) 9{d[2:6]}-{d[6:10]}",
+        lambda d: f"+55 {d[:2]} 9{d[2:6]}-{d[6:10]}",
+        lambda d: f"55{d[:2]}9{d[2:10]}",
+        lambda d: f"0{d[:2]} 9{d[2:6]} {d[6:10]}",
+        lambda d: f"+1 {d[:3]}-{d[3:6]}-{d[6:10]}".replace('+1 0', '+1 2'),
+        lambda d: f"+351 9{d[:8]}",
+    ]
+    rng = random.Random(42)
+    # Como nas planilhas reais, o mesmo número aparece em várias linhas/campanhas
+    distinct = [formats[i % len(formats)](f"{rng.randrange(11, 10 ** 10):010d}".replace('0', '1', 2))
+                for i in range(max(1, total // 3))]
+    phones = [rng.choice(distinct) for _ in range(total)]
+
+    normalize_phone.cache_clear()
+    start = time.perf_counter()
+    batch = normalize_many(phones)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [normalize_phone(phone) for phone in phones]
+    single_time = time.perf_counter() - start
+
+    assert batch == single, "caminhos em lote e unitário divergiram"
+    invalid = sum(1 for result in batch if result is None)
+    print(f"📞 {total:,} números, {len(distinct):,} distintos ({invalid:,} inválidos)")
+    print(f"  ⚡ Lote:     {batch_time:.2f}s ({total / batch_time:,.0f} números/s)")
+    print(f"  🔁 Unitário: {single_time:.2f}s ({total / single_time:,.0f} números/s)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python3 phone_numbers.py bench [quantidade]
+    #      python3 phone_numbers.py <telefone> [telefone...]
+    if len(sys.argv) >= 2 and sys.argv[1] == "bench":
+        _benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+    elif len(sys.argv) >= 2:
+        for arg in sys.argv[1:]:
+            print(f"{arg} -> {normalize_phone(arg)}")
+    else:
+        print("Uso: python3 phone_numbers.py bench [quantidade] | <telefone>...")
+        sys.exit(1)
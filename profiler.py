@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Profiler
+Perfil de uma execução (opcional, --profile): spans hierárquicos por etapa
+e por chamada à API, gravados como trace do Chrome/Perfetto
+(chrome://tracing, https://ui.perfetto.dev) e resumidos numa tabela
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+
+# Categorias de espera deliberada (ritmo anti-bloqueio e backoff dos retries):
+# ficam fora do tempo "trabalhando" do resumo
+SLEEP_CATEGORIES = ("sleep", "backoff")
+
+# Eventos guardados no trace (os agregados do resumo continuam depois disso)
+MAX_EVENTS = 500_000
+
+
+class _NullSpan:
+    """Span de quando o profiler está desligado: não mede nada"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def tag(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "cat", "args", "started", "children")
+
+    def __init__(self, profiler: "Profiler", name: str, cat: str, args: dict):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.started = 0
+        self.children = 0
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ended = time.perf_counter_ns()
+        stack = self.profiler._stack()
+        stack.pop()
+        duration = ended - self.started
+        if stack:
+            stack[-1].children += duration
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.profiler._record(self, duration, duration - self.children)
+        return False
+
+    def tag(self, **args):
+        """Acrescenta tags ao span (ex: status da resposta)"""
+        self.args.update(args)
+
+
+class Profiler:
+    """
+    Coleta os spans de uma execução.
+
+    Cada thread tem sua pilha de spans: o tempo de um span descontado
+    o dos filhos é o seu tempo próprio, o que separa, por exemplo, a
+    leitura da planilha da normalização dos telefones feita dentro dela.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Arquivo do trace (JSON do Chrome/Perfetto)
+        """
+        self.path = path
+        self.started = time.perf_counter_ns()
+        self.started_at = time.time()
+        self.events: list[dict] = []
+        self.dropped = 0
+        # nome -> [categoria, chamadas, total_ns, próprio_ns, máximo_ns]
+        self.totals: dict[str, list] = {}
+        self.threads: dict[int, str] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span: _Span, duration: int, own: int):
+        thread = threading.current_thread()
+        with self._lock:
+            self.threads.setdefault(thread.ident, thread.name)
+            total = self.totals.get(span.name)
+            if total is None:
+                total = self.totals[span.name] = [span.cat, 0, 0, 0, 0]
+            total[1] += 1
+            total[2] += duration
+            total[3] += own
+            if duration > total[4]:
+                total[4] = duration
+            if len(self.events) >= MAX_EVENTS:
+                self.dropped += 1
+                return
+            event = {"name": span.name, "cat": span.cat, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                     "ts": (span.started - self.started) / 1000, "dur": duration / 1000}
+            if span.args:
+                event["args"] = span.args
+            self.events.append(event)
+
+    def span(self, name: str, cat: str = "stage", **args) -> _Span:
+        return _Span(self, name, cat, args)
+
+    def write(self) -> str:
+        """Grava o trace; retorna o caminho"""
+        pid = os.getpid()
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                     "args": {"name": f"whatsapp_sender {datetime.fromtimestamp(self.started_at):%Y-%m-%d %H:%M:%S}"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                     for tid, name in self.threads.items()]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"},
+                      f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)
+        return self.path
+
+    def summary(self, limit: int = 25) -> str:
+        """
+        Tabela por span (chamadas, total, próprio, médio, máximo), do maior
+        tempo próprio para o menor, e o tempo de parede dividido entre
+        espera deliberada (ritmo, backoff) e o resto.
+        """
+        wall = (time.perf_counter_ns() - self.started) / 1e9
+        rows = sorted(self.totals.items(), key=lambda item: item[1][3], reverse=True)
+        lines = [f"{'ETAPA':<34} {'CAT':<8} {'CHAMADAS':>8} {'TOTAL(s)':>9} {'PRÓPRIO(s)':>10} "
+                 f"{'MÉDIO(ms)':>10} {'MÁX(ms)':>9}",
+                 "-" * 94]
+        for name, (cat, count, total, own, peak) in rows[:limit]:
+            lines.append(f"{name[:34]:<34} {cat[:8]:<8} {count:>8} {total / 1e9:>9.3f} {own / 1e9:>10.3f} "
+                         f"{total / count / 1e6:>10.2f} {peak / 1e6:>9.2f}")
+        if len(rows) > limit:
+            lines.append(f"... mais {len(rows) - limit} etapa(s) no trace")
+
+        sleeping = sum(own for cat, _, _, own, _ in self.totals.values() if cat in SLEEP_CATEGORIES)
+        working = sum(own for cat, _, _, own, _ in self.totals.values() if cat not in SLEEP_CATEGORIES)
+        lines.append("-" * 94)
+        lines.append(f"⏱️  Parede: {wall:.2f}s | 💤 Espera deliberada: {sleeping / 1e9:.2f}s | "
+                     f"⚙️  Trabalho medido: {working / 1e9:.2f}s (somado entre threads)")
+        if self.dropped:
+            lines.append(f"⚠️  {self.dropped} span(s) fora do trace (limite de {MAX_EVENTS}); o resumo inclui todos")
+        return "\n".join(lines)
+
+
+PROFILER: Optional[Profiler] = None
+
+
+def enabled() -> bool:
+    return PROFILER is not None
+
+
+def enable(path: Optional[str] = None) -> Profiler:
+    """Liga o profiler desta execução (path padrão: logs/profile_<data>.json)"""
+    global PROFILER
+    PROFILER = Profiler(path or default_path())
+    return PROFILER
+
+
+def span(name: str, cat: str = "stage", **args):
+    """
+    Mede um trecho (with profiler.span("etapa", contato=...) as s: ...).
+    Desligado, devolve um span vazio compartilhado.
+    """
+    profiler = PROFILER
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name, cat, **args)
+
+
+def traced(iterable: Iterable, name: str, cat: str = "io") -> Iterable:
+    """
+    Mede cada item puxado de um gerador (ex: linhas lidas da planilha).
+    Desligado, devolve o próprio iterável.
+    """
+    if PROFILER is None:
+        return iterable
+    return _traced(iter(iterable), name, cat)
+
+
+def _traced(iterator: Iterator, name: str, cat: str) -> Iterator:
+    while True:
+        with span(name, cat):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def wrap(func: Callable, name: str, cat: str = "stage") -> Callable:
+    """Mede cada chamada de uma função. Desligado, devolve a própria função."""
+    if PROFILER is None:
+        return func
+
+    def wrapper(*args, **kwargs):
+        with span(name, cat):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def finish() -> Optional[str]:
+    """Grava o trace, imprime o resumo e desliga o profiler; retorna o caminho do trace"""
+    global PROFILER
+    profiler = PROFILER
+    if profiler is None:
+        return None
+    PROFILER = None
+    path = profiler.write()
+    print("\n" + "=" * 50)
+    print("🔬 PERFIL DA EXECUÇÃO")
+    print("=" * 50)
+    print(profiler.summary())
+    print(f"📄 Trace: {path} (abra em https://ui.perfetto.dev ou chrome://tracing)")
+    return path
+
+
+def default_path() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "logs", f"profile_{datetime.now():%Y-%m-%d_%H%M%S}.json")
+
+
+def path_from_argv(argv: list[str]) -> Optional[str]:
+    """--profile (caminho padrão) ou --profile=arquivo.json; None sem a opção"""
+    for arg in argv:
+        if arg == "--profile":
+            return default_path()
+        if arg.startswith("--profile="):
+            return arg.split('=', 1)[1] or default_path()
+    return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python3 profiler.py <trace.json>  (resumo de um trace já gravado)
+    if len(sys.argv) != 2:
+        print("Uso: python3 profiler.py <trace.json>")
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        trace = json.load(f)
+    profiler = Profiler(sys.argv[1])
+    events = [event for event in trace.get("traceEvents", []) if event.get("ph") == "X"]
+    # Tempo próprio: desconta os filhos diretos de cada span na mesma thread
+    children: dict[int, float] = {}
+    by_thread: dict = {}
+    for event in sorted(events, key=lambda e: (e["tid"], e["ts"], -e["dur"])):
+        stack = by_thread.setdefault(event["tid"], [])
+        while stack and stack[-1]["ts"] + stack[-1]["dur"] <= event["ts"]:
+            stack.pop()
+        if stack:
+            children[id(stack[-1])] = children.get(id(stack[-1]), 0) + event["dur"]
+        stack.append(event)
+    for event in events:
+        total = profiler.totals.setdefault(event["name"], [event.get("cat", ""), 0, 0, 0, 0])
+        duration = int(event["dur"] * 1000)
+        total[1] += 1
+        total[2] += duration
+        total[3] += duration - int(children.get(id(event), 0) * 1000)
+        total[4] = max(total[4], duration)
+    end = max((event["ts"] + event["dur"] for event in events), default=0)
+    profiler.started = time.perf_counter_ns() - int(end * 1000)
+    print(profiler.summary())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Resilience
+Políticas de retry por endpoint, backoff com jitter, circuit breaker por
+instância e ajuste adaptativo (AIMD) do ritmo de envio
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+
+# Status que indicam sobrecarga ou indisponibilidade passageira
+TRANSIENT_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Como tratar falhas de um endpoint"""
+    max_attempts: int = 3
+    timeout: Optional[float] = None        # None = timeout padrão do cliente
+    base_delay: float = 0.5                # primeiro backoff (segundos)
+    max_delay: float = 8.0                 # teto do backoff e do Retry-After
+    retry_statuses: tuple = TRANSIENT_STATUSES
+    # Repetir após timeout de leitura? Só é seguro se a chamada for
+    # idempotente: um envio que estourou o timeout pode ter saído.
+    idempotent: Optional[bool] = None      # None = GET/DELETE são idempotentes
+
+    def is_idempotent(self, method: str) -> bool:
+        if self.idempotent is None:
+            return method in ("GET", "DELETE")
+        return self.idempotent
+
+
+# Políticas por prefixo de endpoint (o mais longo que casar vale)
+DEFAULT_POLICIES = {
+    # Envio: só repete quando o servidor certamente não processou
+    # (429/503 ou conexão recusada); nunca após timeout de leitura
+    "/message/": RetryPolicy(max_attempts=3, timeout=30, retry_statuses=(429, 503), idempotent=False),
+    "/chat/whatsappNumbers/": RetryPolicy(max_attempts=4, timeout=20, idempotent=True),
+    # Presença é cosmética: uma tentativa curta
+    "/chat/sendPresence/": RetryPolicy(max_attempts=1, timeout=10, idempotent=True),
+    "/instance/connectionState/": RetryPolicy(max_attempts=2, timeout=10, idempotent=True),
+}
+DEFAULT_POLICY = RetryPolicy()
+
+# Endpoints cujo último trecho do caminho é o nome da instância
+INSTANCE_ROUTES = ("/message/", "/chat/", "/instance/connectionState/", "/instance/connect/",
+                   "/instance/restart/", "/instance/logout/")
+
+
+def resolve_policy(policies: dict, endpoint: str) -> RetryPolicy:
+    """Política do endpoint (prefixo mais longo), ou a padrão"""
+    best = None
+    for prefix in policies:
+        if endpoint.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return policies[best] if best is not None else DEFAULT_POLICY
+
+
+def instance_of(endpoint: str) -> Optional[str]:
+    """Instância a que o endpoint se refere (chave do circuit breaker)"""
+    path = endpoint.split('?', 1)[0]
+    if path.startswith(INSTANCE_ROUTES):
+        return path.rsplit('/', 1)[-1] or None
+    return None
+
+
+def never_sent(exc: Exception) -> bool:
+    """A requisição falhou antes de chegar ao servidor (conexão recusada ou não aberta)?"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError) and exc.args:
+        return isinstance(getattr(exc.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def backoff_delay(attempt: int, policy: RetryPolicy, retry_after: Optional[float] = None) -> float:
+    """
+    Espera antes da próxima tentativa.
+
+    Exponencial com jitter completo (0 a base * 2^tentativa), limitado a
+    max_delay; um Retry-After do servidor tem precedência.
+    """
+    if retry_after is not None:
+        return min(max(0.0, retry_after), policy.max_delay)
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de uma instância.
+
+    Depois de `failure_threshold` falhas transitórias seguidas o circuito
+    abre e as chamadas falham na hora, sem rede. Passado `reset_timeout`,
+    uma única chamada de teste é liberada (meio-aberto) e as demais
+    continuam recusadas até ela terminar: se der certo o circuito fecha, se
+    falhar abre de novo. Um teste sem resultado depois de `reset_timeout`
+    (a chamada se perdeu) libera o próximo.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_at = 0.0  # início da chamada de teste (meio-aberto)
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """A chamada pode ir para a rede?"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = self.clock()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            elif now - self.probe_at < self.reset_timeout:
+                return False  # já há uma chamada de teste em andamento
+            self.probe_at = now
+            return True
+
+    def is_open(self) -> bool:
+        """Recusando chamadas (aberto, ou meio-aberto com o teste em andamento)?"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return self.clock() - self.opened_at < self.reset_timeout
+            if self.state == self.HALF_OPEN:
+                return self.clock() - self.probe_at < self.reset_timeout
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class AIMDRate:
+    """
+    Ajuste do intervalo entre envios de uma instância (AIMD).
+
+    Cada envio bem-sucedido aumenta a taxa em um passo fixo (aditivo) até
+    voltar à taxa configurada, que nunca é ultrapassada (limite
+    anti-bloqueio). Erros transitórios e 429 cortam a taxa pela metade
+    (multiplicativo); latência alta corta um pouco. Assim o ritmo cai
+    sozinho quando o container sofre e se recupera quando ele volta.
+    """
+
+    def __init__(self, base_interval: float, max_factor: float = 8.0, increase: float = 0.1,
+                 decrease: float = 0.5, slow_latency: float = 5.0):
+        """
+        Args:
+            base_interval: Intervalo configurado (o mais rápido permitido)
+            max_factor: Quanto o intervalo pode crescer (8 = até 8x mais lento)
+            increase: Passo aditivo, em fração da taxa base
+            decrease: Fator multiplicativo aplicado à taxa em caso de erro
+            slow_latency: Latência (s) a partir da qual o envio conta como lento
+        """
+        self.base_interval = base_interval
+        self.max_factor = max_factor
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.factor = 1.0  # taxa atual / taxa base (1 = ritmo configurado)
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        return self.base_interval / self.factor
+
+    def record(self, ok: bool, latency: float = 0.0, transient: bool = True) -> float:
+        """
+        Registra o resultado de um envio e devolve o novo intervalo.
+
+        Args:
+            ok: O envio deu certo
+            latency: Duração da chamada (segundos)
+            transient: O erro indica sobrecarga (falhas permanentes, como
+                       número inválido, não mexem na taxa)
+        """
+        with self._lock:
+            if not ok:
+                if transient:
+                    self.factor = max(1.0 / self.max_factor, self.factor * self.decrease)
+            elif latency > self.slow_latency:
+                self.factor = max(1.0 / self.max_factor, self.factor * (1 - (1 - self.decrease) / 2))
+            else:
+                self.factor = min(1.0, self.factor + self.increase)
+            return self.interval
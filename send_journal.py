@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Send Journal
+Journal de envios (write-ahead): registra a intenção antes de cada envio e o
+resultado logo depois, para retomar um lote interrompido sem reenviar
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional, Union
+
+from phone_numbers import phone_key
+
+
+INTENT = "intent"
+IN_DOUBT = "in_doubt"
+# Resultados que encerram o contato no lote (não são refeitos ao retomar)
+OUTCOMES = ("sent", "failed", "skipped")
+# Resultados definitivos que vão para o descartados.log (o contato não volta aos lotes)
+DISCARDS = ("failed", "skipped")
+
+
+def journal_path(batch_path: str) -> str:
+    """Journal que acompanha um lote (batch_atual.jsonl.journal)"""
+    return f"{batch_path}.journal"
+
+
+def read_journal(path: str, with_time: bool = False) -> dict[str, tuple]:
+    """
+    Último estado de cada número no journal.
+
+    Números com intenção registrada mas sem resultado saem como 'in_doubt':
+    o processo caiu durante o envio e a mensagem pode ter saído.
+
+    Args:
+        path: Arquivo do journal
+        with_time: Inclui o horário (epoch) do último evento de cada número
+
+    Returns:
+        {numero: (status, instancia)} ou {numero: (status, instancia, epoch)}
+    """
+    state: dict[str, tuple] = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # linha incompleta (queda no meio da escrita)
+                parts = line.rstrip('\n').split('|')
+                if len(parts) < 3:
+                    continue
+                event, numero = parts[1], parts[2]
+                instance = parts[3] if len(parts) > 3 else ''
+                status = IN_DOUBT if event == INTENT else event
+                if with_time:
+                    try:
+                        state[numero] = (status, instance, float(parts[0]))
+                    except ValueError:
+                        state[numero] = (status, instance, time.time())
+                else:
+                    state[numero] = (status, instance)
+    except FileNotFoundError:
+        pass
+    return state
+
+
+def journal_status(status: str, result: Optional[dict] = None) -> str:
+    """
+    Estado gravado no journal para um resultado do envio: a falha em dúvida
+    (a chamada caiu depois de chegar ao servidor) fica como 'in_doubt' e é
+    registrada como enviada, nunca como descartada.
+    """
+    if status == "failed" and result and result.get("in_doubt"):
+        return IN_DOUBT
+    return status
+
+
+def discard_line(telefone, status: str, instance: Optional[str] = None,
+                 timestamp: Optional[str] = None) -> str:
+    """Linha do descartados.log (telefone|timestamp|status|instancia)"""
+    return f"{str(telefone).strip()}|{timestamp or datetime.now().isoformat()}|{status}|{instance or ''}\n"
+
+
+def apply_journal(batch_path: str, log_path: Union[str, Callable[[tuple], str]],
+                  msg_num: Callable[[tuple], int] = lambda row: 1,
+                  statuses: tuple = ("sent", IN_DOUBT),
+                  discard_log: Union[None, str, Callable[[tuple], str]] = None) -> int:
+    """
+    Registra no enviados.log as linhas do lote que o journal confirma e
+    apaga o journal (o lote fica consolidado).
+
+    Envios em dúvida entram como enviados: é melhor perder um contato do
+    que mandar a mesma mensagem duas vezes. Com `discard_log`, os contatos
+    sem WhatsApp ou com falha definitiva vão para o descartados.log, para
+    não voltarem ao lote do dia seguinte.
+
+    Args:
+        batch_path: Lote (.jsonl ou planilha)
+        log_path: enviados.log, ou função linha -> enviados.log da campanha
+        msg_num: Função linha -> número da mensagem enviada
+        statuses: Estados do journal que vão para o log
+        discard_log: descartados.log, ou função linha -> descartados.log da campanha
+
+    Returns:
+        Quantidade de linhas registradas no enviados.log
+    """
+    from batch_file import iter_batch_rows
+
+    path = journal_path(batch_path)
+    state = read_journal(path, with_time=True)
+    written = 0
+    if state and os.path.exists(batch_path):
+        lines: dict[str, list[str]] = {}
+        for row in iter_batch_rows(batch_path):
+            telefone = row[1] if len(row) > 1 else None
+            if not telefone or str(telefone) == 'N/A':
+                continue
+            entry = state.get(phone_key(telefone))
+            if entry is None:
+                continue
+            timestamp = datetime.fromtimestamp(entry[2]).isoformat()
+            if entry[0] in DISCARDS and discard_log is not None:
+                target = discard_log(row) if callable(discard_log) else discard_log
+                lines.setdefault(target, []).append(discard_line(telefone, entry[0], entry[1], timestamp))
+                continue
+            if entry[0] not in statuses:
+                continue
+            target = log_path(row) if callable(log_path) else log_path
+            lines.setdefault(target, []).append(f"{str(telefone).strip()}|{timestamp}|{msg_num(row)}|{entry[1]}\n")
+            written += 1
+        for target, entries in lines.items():
+            with open(target, 'a') as f:
+                f.writelines(entries)
+    if os.path.exists(path):
+        os.remove(path)
+    return written
+
+
+def _drop_torn_tail(path: str):
+    """
+    Corta a linha incompleta do fim do journal (queda no meio da escrita):
+    sem isso a próxima linha gravada seria colada nela e se perderia.
+    """
+    try:
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # Volta até a última quebra de linha (o trecho cortado é curto)
+            end = size
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                chunk = f.read(end - start)
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    return
+                end = start
+            f.truncate(0)
+    except FileNotFoundError:
+        pass
+
+
+class SendJournal:
+    """
+    Journal append-only de um lote (timestamp|evento|numero|instancia|detalhe).
+
+    A intenção é gravada antes de chamar a API e o resultado logo depois.
+    O fsync é agrupado: cada intenção força um fsync que também leva os
+    resultados anteriores para o disco (no ritmo de envio, um fsync por
+    mensagem); `fsync_every` aumenta o intervalo entre eles.
+    """
+
+    def __init__(self, path: str, resume: bool = False, fsync_every: int = 1):
+        """
+        Args:
+            path: Arquivo do journal
+            resume: Continua o journal existente (senão começa um novo)
+            fsync_every: Intenções entre dois fsync
+
+        Raises:
+            FileExistsError: Sem `resume`, se já existe o journal de um lote
+                             interrompido (registre-o com apply_journal antes)
+        """
+        if not resume and os.path.exists(path) and os.path.getsize(path) > 0:
+            raise FileExistsError(f"Journal de um lote interrompido: {path} "
+                                  "(use --resume ou registre o lote anterior antes)")
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.state = read_journal(path) if resume else {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if resume:
+            _drop_torn_tail(path)
+        self._file = open(path, 'a' if resume else 'w')
+
+    @staticmethod
+    def key(phone) -> str:
+        return phone_key(phone)
+
+    def is_done(self, phone) -> bool:
+        """Contato já resolvido num lote anterior (inclui envios em dúvida)"""
+        entry = self.state.get(self.key(phone))
+        return entry is not None and (entry[0] in OUTCOMES or entry[0] == IN_DOUBT)
+
+    def in_doubt(self) -> list[str]:
+        """Números cujo envio foi iniciado e não teve resultado registrado"""
+        return [numero for numero, (status, _) in self.state.items() if status == IN_DOUBT]
+
+    def _write(self, event: str, phone, instance: Optional[str], detail: str, sync: bool):
+        numero = self.key(phone)
+        detail = str(detail or '').replace('|', '/').replace('\n', ' ')[:200]
+        with self._lock:
+            self._file.write(f"{time.time():.3f}|{event}|{numero}|{instance or ''}|{detail}\n")
+            self.state[numero] = (IN_DOUBT if event == INTENT else event, instance or '')
+            if sync:
+                self._pending += 1
+                if self._pending >= self.fsync_every:
+                    self._sync()
+            else:
+                self._file.flush()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def intent(self, phone, instance: Optional[str] = None):
+        """Registra (e leva ao disco) a intenção de enviar, antes da chamada à API"""
+        self._write(INTENT, phone, instance, '', sync=True)
+
+    def outcome(self, phone, status: str, instance: Optional[str] = None, detail: str = ''):
+        """Registra o resultado (sent, failed, skipped ou deferred)"""
+        self._write(status, phone, instance, detail, sync=False)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Send Scheduler
+Agenda os envios respeitando o ritmo anti-bloqueio (token bucket por instância),
+preparando os próximos contatos enquanto espera
+"""
+
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+import metrics
+import profiler
+from resilience import AIMDRate
+
+
+_DONE = object()
+
+
+class TokenBucket:
+    """
+    Token bucket: libera no máximo 1 envio a cada `interval_seconds`,
+    acumulando até `burst` envios quando fica ocioso.
+    """
+
+    def __init__(self, interval_seconds: float, burst: int = 1, jitter: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            interval_seconds: Intervalo médio entre envios
+            burst: Envios que podem sair seguidos após um período ocioso
+            jitter: Atraso aleatório extra, em fração do intervalo (0.2 = até +20%)
+            clock: Relógio monotônico (substituível nos benchmarks)
+        """
+        self.interval = max(0.0, interval_seconds)
+        self.burst = max(1, burst)
+        self.jitter = max(0.0, jitter)
+        self.clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Reserva o próximo envio.
+
+        Returns:
+            Instante (no relógio do bucket) a partir do qual o envio pode sair
+        """
+        with self._lock:
+            now = self.clock()
+            if self.interval > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+            else:
+                self._tokens = float(self.burst)
+            self._updated = now
+
+            self._tokens -= 1
+            wait = -self._tokens * self.interval if self._tokens < 0 else 0.0
+
+        if self.jitter and self.interval:
+            wait += random.uniform(0, self.jitter * self.interval)
+        return now + wait
+
+    def refund(self):
+        """Devolve um envio reservado que não chegou a sair"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def acquire(self) -> float:
+        """Bloqueia até o próximo envio liberado; retorna o tempo esperado"""
+        at = self.reserve()
+        wait = at - self.clock()
+        if wait > 0:
+            time.sleep(wait)
+        return max(0.0, wait)
+
+
+class SendScheduler:
+    """
+    Envia uma sequência de contatos no ritmo do token bucket de cada instância.
+
+    Durante a espera entre dois envios, os próximos contatos já são
+    verificados e têm a mensagem renderizada em segundo plano, e o
+    'digitando...' é mostrado dentro do próprio intervalo. O tempo total
+    fica limitado pela taxa de envio, e não pela soma de esperas e
+    chamadas de rede.
+
+    Com `adaptive`, o intervalo de cada instância segue um AIMDRate:
+    abre quando a API devolve 429/5xx ou fica lenta e volta sozinho ao
+    intervalo configurado (que nunca é encurtado) conforme os envios dão
+    certo.
+    """
+
+    def __init__(self, api, interval_seconds: float = 60.0, typing_delay: float = 5.0,
+                 jitter: float = 0.2, burst: int = 1, lookahead: int = 5, adaptive: bool = True,
+                 media: Optional[str] = None):
+        """
+        Args:
+            api: Cliente da Evolution API (EvolutionAPI)
+            interval_seconds: Intervalo médio entre envios de uma mesma instância
+            typing_delay: Tempo mostrando 'digitando...' antes de cada envio
+            jitter: Variação aleatória do intervalo (fração)
+            burst: Envios seguidos permitidos após período ocioso
+            lookahead: Quantos contatos preparar antecipadamente
+            adaptive: Ajusta o intervalo de cada instância pelos erros e latência (AIMD)
+            media: Arquivo local enviado com a mensagem como legenda (opcional)
+        """
+        self.api = api
+        self.interval_seconds = interval_seconds
+        self.typing_delay = typing_delay
+        self.jitter = jitter
+        self.burst = burst
+        self.lookahead = max(1, lookahead)
+        self.adaptive = adaptive
+        self.media = media
+        self.buckets: dict[str, TokenBucket] = {}
+        self.rates: dict[str, AIMDRate] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, instance_name: str) -> TokenBucket:
+        """Token bucket da instância (criado sob demanda)"""
+        with self._lock:
+            if instance_name not in self.buckets:
+                self.buckets[instance_name] = TokenBucket(self.interval_seconds, self.burst, self.jitter)
+                self.rates[instance_name] = AIMDRate(self.interval_seconds)
+            return self.buckets[instance_name]
+
+    @staticmethod
+    def _sleep_until(at: float, instance_name: str = ''):
+        wait = at - time.monotonic()
+        if wait > 0:
+            with profiler.span("pacing", "sleep", instance=instance_name):
+                time.sleep(wait)
+            metrics.SLEEP_SECONDS.inc(wait, instance=instance_name)
+
+    def send(self, instance_name: str, phone: str, message: str) -> dict:
+        """
+        Envia uma mensagem respeitando o bucket da instância.
+
+        O 'digitando...' começa `typing_delay` segundos antes do horário
+        liberado, de modo que a presença não soma tempo ao intervalo.
+        Um erro permanente (ex: número inválido) devolve a reserva: a
+        mensagem não saiu e o próximo contato não precisa esperar por ela.
+        """
+        with profiler.span("send", instance=instance_name, contact=phone) as span:
+            result = self._send(instance_name, phone, message)
+            span.tag(error=bool(result.get("error")))
+        return result
+
+    def _send(self, instance_name: str, phone: str, message: str) -> dict:
+        bucket = self.bucket(instance_name)
+        slot = bucket.reserve()
+        typing_at = max(time.monotonic(), slot - self.typing_delay)
+        self._sleep_until(typing_at, instance_name)
+        if self.typing_delay > 0:
+            started = time.monotonic()
+            self.api.send_presence(instance_name, phone, "composing", self.typing_delay)
+            metrics.BUSY_SECONDS.inc(time.monotonic() - started, instance=instance_name)
+        self._sleep_until(max(slot, typing_at + self.typing_delay), instance_name)
+
+        started = time.monotonic()
+        if self.media:
+            result = self.api.send_media_file(instance_name, phone, self.media, caption=message)
+        else:
+            result = self.api.send_text(instance_name, phone, message)
+        latency = time.monotonic() - started
+        metrics.BUSY_SECONDS.inc(latency, instance=instance_name)
+        failed = bool(result.get("error"))
+        transient = failed and result.get("transient", True)
+        if self.adaptive:
+            bucket.interval = self.rates[instance_name].record(not failed, latency, transient)
+            metrics.SEND_INTERVAL.set(bucket.interval, instance=instance_name)
+        if failed and not transient:
+            bucket.refund()
+        return result
+
+    def run(self, instance_name: str, contacts: Iterable, phone: Callable, render: Callable,
+            verify: Optional[Callable[[str], Optional[bool]]] = None,
+            before_send: Optional[Callable] = None) -> Iterator[tuple]:
+        """
+        Envia para uma sequência de contatos.
+
+        Args:
+            instance_name: Instância que envia
+            contacts: Contatos (qualquer iterável, consumido sob demanda)
+            phone: Função contato -> telefone
+            render: Função contato -> mensagem
+            verify: Função telefone -> tem WhatsApp (opcional; None = não deu
+                    para verificar, e o contato sai como 'deferred')
+            before_send: Chamada (contato, instância) logo antes de cada envio
+
+        Yields:
+            (contato, status, resultado), com status 'sent', 'failed', 'skipped'
+            ou 'deferred' (erro passageiro da API, como 429/5xx ou circuito
+            aberto, que já esgotou os retries: o contato fica para o próximo
+            lote). 'failed' é só a recusa da API (ou o envio em dúvida,
+            com "in_doubt" no resultado); exceções locais ao verificar ou
+            renderizar (template ausente, verificador com erro) saem como
+            'deferred', porque nada foi enviado.
+        """
+        def prepare(contact):
+            try:
+                if verify:
+                    with profiler.span("verify", instance=instance_name, contact=phone(contact)):
+                        exists = verify(phone(contact))
+                    if exists is None:
+                        return contact, None, {"error": True, "transient": True,
+                                               "message": "Verificação do WhatsApp indisponível"}
+                    if not exists:
+                        return contact, None, None
+                with profiler.span("render", contact=phone(contact)):
+                    return contact, render(contact), None
+            except Exception as e:
+                return contact, None, {"error": True, "transient": True, "local": True, "message": str(e)}
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="prepare") as executor:
+            pending = []
+            iterator = iter(contacts)
+
+            def fill():
+                while len(pending) < self.lookahead:
+                    try:
+                        contact = next(iterator)
+                    except StopIteration:
+                        return
+                    pending.append(executor.submit(prepare, contact))
+
+            fill()
+            while pending:
+                started = time.monotonic()
+                with profiler.span("prepare_wait", instance=instance_name):
+                    contact, message, error = pending.pop(0).result()
+                metrics.PREPARE_WAIT_SECONDS.inc(time.monotonic() - started, instance=instance_name)
+                fill()
+                metrics.QUEUE_DEPTH.set(len(pending), instance=instance_name, queue="prepared")
+
+                if error:
+                    yield contact, "deferred" if error.get("transient") else "failed", error
+                    continue
+                if message is None:
+                    yield contact, "skipped", None
+                    continue
+
+                if before_send:
+                    before_send(contact, instance_name)
+                result = self.send(instance_name, phone(contact), message)
+                if not result.get("error"):
+                    yield contact, "sent", result
+                elif result.get("transient") and not result.get("in_doubt"):
+                    yield contact, "deferred", result
+                else:
+                    yield contact, "failed", result
+
+    def run_pool(self, pool, contacts: Iterable, phone: Callable, render: Callable,
+                 verify: Optional[Callable[[str], Optional[bool]]] = None,
+                 before_send: Optional[Callable] = None) -> Iterator[tuple]:
+        """
+        Envia distribuindo os contatos entre as instâncias de um InstancePool.
+
+        Cada instância envia em paralelo, no ritmo do seu próprio bucket,
+        então a vazão cresce com o número de instâncias conectadas.
+
+        Yields:
+            (contato, instância, status, resultado); contatos sem instância
+            disponível saem com status 'deferred' e instância None
+        """
+        results = queue.Queue()
+        # Filas limitadas: a leitura dos contatos anda no ritmo dos envios
+        inboxes = {name: queue.Queue(maxsize=self.lookahead * 2) for name in pool.instance_names}
+        failures: list[BaseException] = []
+        stop = threading.Event()
+
+        def worker(name):
+            try:
+                contacts_in = iter(inboxes[name].get, _DONE)
+                for contact, status, result in self.run(name, contacts_in, phone, render, verify, before_send):
+                    if status == "sent":
+                        pool.record_send(name, phone(contact))
+                    else:
+                        pool.release(name)
+                        if status == "deferred":
+                            # Erro passageiro: reavalia a instância antes de novas atribuições
+                            pool.mark_unhealthy(name)
+                    results.put((contact, name, status, result))
+                    if stop.is_set():
+                        break  # quem consumia parou: não envia os já preparados
+            except BaseException as e:
+                failures.append(e)
+            finally:
+                results.put(_DONE)
+
+        workers = {name: threading.Thread(target=worker, args=(name,), name=f"send-{name}", daemon=True)
+                   for name in pool.instance_names}
+        for thread in workers.values():
+            thread.start()
+
+        def deliver(name, item) -> bool:
+            """Entrega na fila da instância; False se a thread dela morreu"""
+            while workers[name].is_alive():
+                try:
+                    inboxes[name].put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def check_failures():
+            if failures:
+                raise failures[0]
+
+        running = len(workers)
+        finished = False
+        try:
+            for contact in contacts:
+                if pool.exhausted():
+                    break
+                name = pool.assign(phone(contact))
+                if name is None:
+                    yield contact, None, "deferred", None
+                elif deliver(name, contact):
+                    metrics.QUEUE_DEPTH.set(inboxes[name].qsize(), instance=name, queue="inbox")
+                else:
+                    pool.release(name)
+                    check_failures()
+                    raise RuntimeError(f"Thread de envio da instância {name} parou")
+
+                # Repassa os resultados que já chegaram sem travar a distribuição
+                while True:
+                    try:
+                        item = results.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        running -= 1
+                        check_failures()
+                    else:
+                        yield item
+            finished = True
+        finally:
+            if not finished:
+                # Erro ou consumo interrompido: descarta o que ainda não foi enviado
+                stop.set()
+                for name, inbox in inboxes.items():
+                    while True:
+                        try:
+                            inbox.get_nowait()
+                        except queue.Empty:
+                            break
+                        pool.release(name)
+            for name in inboxes:
+                deliver(name, _DONE)
+
+        while running:
+            item = results.get()
+            if item is _DONE:
+                running -= 1
+                check_failures()
+            else:
+                yield item
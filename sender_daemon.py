@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Sender Daemon
+Processo residente que mantém cliente da API, instâncias, templates e índices
+aquecidos, recebendo jobs por um socket Unix local
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOCKET_PATH = os.environ.get("SENDER_SOCKET", os.path.join(BASE_DIR, "campanhas", "sender.sock"))
+
+# Por quanto tempo a configuração/conexão verificada no setup() vale
+READY_TTL_SECONDS = 300
+
+
+class _JobOutput:
+    """
+    stdout compartilhado que envia o que cada job imprime para o cliente
+    daquele job (por thread); o resto vai para a saída do próprio daemon.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        sink = getattr(self.local, "sink", None)
+        if sink is None:
+            return self.fallback.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self):
+        if getattr(self.local, "sink", None) is None:
+            self.fallback.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    @property
+    def encoding(self) -> str:
+        return getattr(self.fallback, "encoding", "utf-8")
+
+
+class SenderDaemon:
+    """
+    Servidor de jobs num socket Unix.
+
+    Protocolo: o cliente manda uma linha JSON {"job", "args", "cwd"}; o
+    daemon responde com linhas {"out": texto} enquanto o job imprime e
+    termina com {"done": true, "code": N, "result": ...}.
+
+    Jobs que enviam mensagens ou rodam comandos do CLI rodam um de cada vez;
+    consultas (count, stats, ping) respondem em paralelo.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, instances: Optional[list[str]] = None):
+        """
+        Args:
+            socket_path: Caminho do socket Unix
+            instances: Instâncias que enviam (padrão: WHATSAPP_INSTANCES)
+        """
+        # Imports pesados só no daemon: o cliente não carrega openpyxl/requests
+        from instance_pool import instances_from_env
+        from suppression_index import SuppressionIndex
+        from whatsapp_sender import WhatsAppSender
+
+        self.socket_path = socket_path
+        self.instances = instances or instances_from_env()
+        self.sender = WhatsAppSender(instance_name=self.instances[0], instances=self.instances,
+                                     blocklist=SuppressionIndex())
+        self.started_at = time.time()
+        self.jobs_done = 0
+        self._ready_at = 0.0
+        # Reentrante: o job 'cli' (auto) chama job_send na mesma thread
+        self._exclusive = threading.RLock()
+        self._counts: dict[str, tuple[tuple, int]] = {}
+        self._server: Optional[socket.socket] = None
+        self._stop = threading.Event()
+
+        self.handlers: dict[str, Callable[[dict], object]] = {
+            "ping": self.job_ping,
+            "count": self.job_count,
+            "stats": self.job_stats,
+            "send": self.job_send,
+            "cli": self.job_cli,
+            "shutdown": self.job_shutdown,
+        }
+
+    # ==================== Jobs ====================
+
+    def job_ping(self, args: dict) -> dict:
+        """Estado do daemon"""
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "jobs": self.jobs_done,
+            "instances": self.instances,
+        }
+
+    def job_count(self, args: dict) -> int:
+        """Contatos válidos de uma planilha (em cache até o arquivo mudar)"""
+        from contacts import count_contacts
+
+        path = args["path"]
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 0
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._counts.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        total = count_contacts(path)
+        self._counts[path] = (key, total)
+        return total
+
+    def job_stats(self, args: dict) -> list:
+        """Agregados por campanha (CampaignStats, em cache no banco)"""
+        from campaign_store import CampaignStore
+
+        campanhas_dir = args.get("campanhas_dir") or os.path.join(BASE_DIR, "campanhas")
+        with CampaignStore(db_path=os.path.join(campanhas_dir, "estado.db"), campanhas_dir=campanhas_dir) as store:
+            store.sync()
+            return [list(row) for row in store.stats(args.get("campaigns"))]
+
+    def _ensure_ready(self) -> bool:
+        """Roda o setup() só na primeira vez e depois a cada READY_TTL_SECONDS"""
+        if time.time() - self._ready_at < READY_TTL_SECONDS:
+            return True
+        if not self.sender.setup():
+            return False
+        self._ready_at = time.time()
+        return True
+
+    def job_send(self, args: dict) -> dict:
+        """
+        Envia uma planilha ou lote .jsonl (equivalente a whatsapp_sender.py
+        <arquivo> <mensagem> -y [--resume] [--profile=trace.json])
+        """
+        import profiler
+        from send_journal import SendJournal, journal_path
+
+        with self._exclusive:
+            if args.get("profile"):
+                profiler.enable(args["profile"])
+            try:
+                with profiler.span("setup"):
+                    ready = self._ensure_ready()
+                if not ready:
+                    raise RuntimeError("Falha ao configurar. Verifique se o Docker está rodando.")
+
+                sender = self.sender
+                sender.sent_count = sender.failed_count = sender.skipped_count = 0
+                print(f"\n📂 Lendo contatos de: {args['xlsx']}")
+                with SendJournal(journal_path(args["xlsx"]), resume=bool(args.get("resume"))) as journal:
+                    return sender.send_messages(
+                        sender.iter_contacts_from_xlsx(args["xlsx"]),
+                        args["message"],
+                        delay_seconds=float(args.get("delay", 60.0)),
+                        verify_whatsapp=args.get("verify", True),
+                        journal=journal,
+                    )
+            finally:
+                profiler.finish()
+
+    def job_cli(self, args: dict) -> int:
+        """Comando do marketing_cli.py (auto, stats, merge...) no interpretador já aquecido"""
+        import marketing_cli
+
+        with self._exclusive:
+            cwd = os.getcwd()
+            try:
+                os.chdir(args.get("cwd") or cwd)
+                return marketing_cli.main(args.get("argv") or [], daemon=self)
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    return e.code or 0
+                print(e.code)
+                return 1
+            finally:
+                os.chdir(cwd)
+                _finish_profile()
+
+    def job_shutdown(self, args: dict) -> bool:
+        """Encerra o daemon depois de responder"""
+        self._stop.set()
+        return True
+
+    # ==================== Servidor ====================
+
+    def _handle(self, conn: socket.socket):
+        lock = threading.Lock()
+        broken = False
+
+        def send(message: dict):
+            nonlocal broken
+            if broken:
+                return
+            data = (json.dumps(message, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+            try:
+                with lock:
+                    conn.sendall(data)
+            except OSError:
+                # Cliente desconectou: o job continua até o fim (logs consistentes)
+                broken = True
+
+        try:
+            with conn, conn.makefile("r", encoding="utf-8") as reader:
+                request = json.loads(reader.readline() or "{}")
+                handler = self.handlers.get(request.get("job"))
+                if handler is None:
+                    send({"done": True, "code": 2, "error": f"Job desconhecido: {request.get('job')}"})
+                    return
+
+                sys.stdout.local.sink = lambda text: send({"out": text})
+                code, result, error = 0, None, None
+                try:
+                    result = handler(request.get("args") or {})
+                    if request.get("job") == "cli":
+                        code, result = result, None
+                except Exception as e:
+                    traceback.print_exc(file=sys.stdout)
+                    code, error = 1, str(e)
+                finally:
+                    sys.stdout.local.sink = None
+                self.jobs_done += 1
+                send({"done": True, "code": code, "result": result, "error": error})
+        except (OSError, ValueError):
+            pass
+
+    def _start_webhook(self):
+        """Sobe o receptor de webhooks da Evolution junto com o daemon (WEBHOOK_PORT=0 desliga)"""
+        from webhook_receiver import WebhookReceiver
+        if os.environ.get("WEBHOOK_PORT") == "0":
+            return
+        try:
+            WebhookReceiver().start_in_thread()
+        except ValueError as e:
+            print(f"⚠️  Webhook desligado: {e}")
+        except OSError as e:
+            print(f"⚠️  Webhook: não foi possível abrir a porta: {e}")
+
+    def serve_forever(self):
+        """Escuta o socket até receber o job 'shutdown' (ou Ctrl+C)"""
+        if os.path.exists(self.socket_path):
+            if ping(self.socket_path) is not None:
+                print(f"❌ Já existe um daemon em {self.socket_path}")
+                sys.exit(1)
+            os.unlink(self.socket_path)
+
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)  # só o próprio usuário pode mandar jobs
+        self._server.listen(16)
+        self._server.settimeout(0.5)
+
+        sys.stdout = _JobOutput(sys.stdout)
+        print(f"🟢 Daemon ouvindo em {self.socket_path} (pid {os.getpid()})")
+        print(f"   Instâncias: {', '.join(self.instances)}")
+        import metrics
+        metrics.start_from_env()  # METRICS_PORT / METRICS_JSONL: métricas de todos os jobs
+        self._start_webhook()
+        from campaign_store import export_metrics
+        export_metrics()  # campaign_contacts no /metrics e no JSONL
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = self._server.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.sender.close()
+            sys.stdout = sys.stdout.fallback
+            print("🔴 Daemon encerrado")
+
+
+# ==================== Cliente ====================
+
+def submit(job: str, args: Optional[dict] = None, socket_path: str = DEFAULT_SOCKET_PATH,
+           output=None) -> Optional[dict]:
+    """
+    Envia um job ao daemon, repassando a saída dele.
+
+    Args:
+        job: Nome do job (ping, count, stats, send, cli, shutdown)
+        args: Argumentos do job
+        socket_path: Caminho do socket Unix
+        output: Para onde vai o que o job imprime (padrão: sys.stdout)
+
+    Returns:
+        Mensagem final {"done", "code", "result", "error"}, ou None se o
+        daemon não estiver rodando
+    """
+    output = output or sys.stdout
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+    except OSError:
+        return None
+
+    with conn, conn.makefile("r", encoding="utf-8") as reader:
+        conn.sendall((json.dumps({"job": job, "args": args or {}, "cwd": os.getcwd()}) + "\n").encode("utf-8"))
+        for line in reader:
+            message = json.loads(line)
+            if "out" in message:
+                output.write(message["out"])
+                output.flush()
+            elif message.get("done"):
+                return message
+    return {"done": True, "code": 1, "error": "Conexão com o daemon encerrada"}
+
+
+def ping(socket_path: str = DEFAULT_SOCKET_PATH) -> Optional[dict]:
+    """Estado do daemon, ou None se não estiver rodando"""
+    reply = submit("ping", socket_path=socket_path)
+    return reply.get("result") if reply else None
+
+
+def _finish_profile():
+    """Fecha o perfil que um comando ligou (--profile) e não fechou, ex: saiu com sys.exit()"""
+    profiler = sys.modules.get("profiler")
+    if profiler is not None and profiler.enabled():
+        profiler.finish()
+
+
+def _run_local(job: str, args: dict) -> int:
+    """Executa o job neste processo (daemon fora do ar)"""
+    if job == "cli":
+        import marketing_cli
+        return marketing_cli.main(args["argv"])
+    if job == "count":
+        from contacts import count_contacts
+        print(count_contacts(args["path"]))
+        return 0
+    if job == "send":
+        os.execvp(sys.executable, [sys.executable, "-u", os.path.join(BASE_DIR, "whatsapp_sender.py"),
+                                   args["xlsx"], args["message"], "-y"] + (["--resume"] if args.get("resume") else [])
+                   + ([f"--profile={args['profile']}"] if args.get("profile") else []))
+    if job == "stats":
+        from campaign_store import CampaignStore
+        campanhas_dir = args.get("campanhas_dir") or os.path.join(BASE_DIR, "campanhas")
+        with CampaignStore(db_path=os.path.join(campanhas_dir, "estado.db"), campanhas_dir=campanhas_dir) as store:
+            store.sync()
+            print_stats([list(row) for row in store.stats()], args.get("campanhas_dir"), args.get("raw"))
+        return 0
+    print(f"❌ Daemon não está rodando ({DEFAULT_SOCKET_PATH})")
+    return 1
+
+
+def print_stats(rows: list, campanhas_dir: Optional[str] = None, raw: bool = False):
+    """Tabela por campanha, ou linhas caminho|linhas|válidos|enviados|pendentes|followup|bloqueados|responderam"""
+    base = campanhas_dir or os.path.join(BASE_DIR, "campanhas")
+    rows = [row for row in rows if os.path.isdir(row[0])]
+    if raw:
+        for row in rows:
+            print('|'.join(str(value) for value in row))
+        return
+    print(f"{'TIPO/CIDADE':<35} {'TOTAL':>7} {'VÁLIDOS':>8} {'ENVIADOS':>9} {'PENDENTES':>10} "
+          f"{'FOLLOW-UP':>10} {'BLOQ.':>6} {'RESP.':>6}")
+    print("-" * 97)
+    for path, total, valid, sent, pending, followup, blocked, replied in rows:
+        print(f"{os.path.relpath(path, base):<35} {total:>7} {valid:>8} {sent:>9} {pending:>10} "
+              f"{followup:>10} {blocked:>6} {replied:>6}")
+
+
+USAGE = """Uso: python3 sender_daemon.py <comando>
+
+  start                      Inicia o daemon (primeiro plano)
+  stop                       Encerra o daemon
+  status                     Mostra se o daemon está rodando
+  count <arquivo.xlsx>       Conta contatos válidos
+  stats [--raw] [campanhas_dir]
+                             Total/válidos/enviados/pendentes/follow-up/
+                             bloqueados/responderam por campanha
+  send <arquivo> <msg> [--resume] [--profile[=trace.json]]
+                             Envia uma planilha ou lote .jsonl (--resume: continua o lote;
+                             --profile: trace do Chrome/Perfetto + resumo por etapa)
+  cli <comando> [opções]     Executa um comando do marketing_cli.py no daemon
+
+Sem daemon rodando, count/stats/send/cli rodam localmente."""
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == "start":
+        sys.path.insert(0, BASE_DIR)
+        SenderDaemon().serve_forever()
+        return
+    if command == "status":
+        state = ping()
+        if state is None:
+            print("🔴 Daemon parado")
+            sys.exit(1)
+        print(f"🟢 Daemon rodando (pid {state['pid']}, {state['uptime']:.0f}s, {state['jobs']} jobs)")
+        return
+    if command == "stop":
+        reply = submit("shutdown")
+        print("🔴 Daemon encerrado" if reply else "Daemon não estava rodando")
+        return
+
+    if command == "count" and len(sys.argv) == 3:
+        job, args = "count", {"path": os.path.abspath(sys.argv[2])}
+    elif command == "stats":
+        paths = [arg for arg in sys.argv[2:] if arg != "--raw"]
+        job, args = "stats", {"campanhas_dir": os.path.abspath(paths[0]) if paths else None,
+                              "raw": "--raw" in sys.argv[2:]}
+    elif command == "send" and len(sys.argv) >= 4:
+        from profiler import path_from_argv
+        message = ' '.join(arg for arg in sys.argv[3:] if arg != "--resume" and not arg.startswith("--profile"))
+        profile = path_from_argv(sys.argv[3:])
+        job, args = "send", {"xlsx": os.path.abspath(sys.argv[2]), "message": message,
+                             "resume": "--resume" in sys.argv[3:],
+                             "profile": os.path.abspath(profile) if profile else None}
+    elif command == "cli" and len(sys.argv) >= 3:
+        job, args = "cli", {"argv": sys.argv[2:], "cwd": os.getcwd()}
+    else:
+        print(USAGE)
+        sys.exit(1)
+
+    reply = submit(job, args)
+    if reply is None:
+        sys.exit(_run_local(job, args))
+
+    if reply.get("error") and job != "cli":
+        print(f"❌ {reply['error']}", file=sys.stderr)
+    if job == "count":
+        print(reply.get("result") or 0)
+    elif job == "stats" and reply.get("result"):
+        print_stats(reply["result"], args.get("campanhas_dir"), args.get("raw"))
+    sys.exit(reply.get("code") or 0)
+
+
+if __name__ == "__main__":
+    main()
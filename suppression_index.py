@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Suppression Index
+Blocklist global compilada num arquivo mapeado em memória (campanhas/blocklist.idx):
+tabela hash de chaves de telefone com tamanho fixo, consultada sem carregar nada
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import Iterable, Optional
+
+from phone_numbers import normalize_many, normalize_phone, only_digits, phone_key
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CAMPANHAS_DIR = os.path.join(BASE_DIR, "campanhas")
+
+MAGIC = b"SUPIDX1\0"
+# magic, bits da tabela, chaves, offset lido do log, inode do log, fingerprint do trecho lido
+HEADER = struct.Struct("=8sIIQQ20s")
+HEADER_SIZE = 64
+MIN_BITS = 4
+# Linhas acrescentadas ao log depois da compilação que ficam só em memória;
+# passando disso, o índice é recompilado
+COMPACT_AFTER = 1024
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_HASHED = 1 << 63
+
+
+def encode_key(key: str) -> int:
+    """
+    Chave de telefone como inteiro de 64 bits (nunca 0, o slot vazio).
+
+    Até 18 dígitos vira "1" + dígitos (preserva zeros à esquerda);
+    chaves maiores ou não numéricas viram um hash com o bit alto ligado.
+    """
+    if 0 < len(key) <= 18 and key.isascii() and key.isdigit():
+        return int("1" + key)
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') | _HASHED
+
+
+def _slot(code: int, bits: int) -> int:
+    return ((code * _GOLDEN) & _MASK64) >> (64 - bits)
+
+
+def _fingerprint(f, offset: int) -> bytes:
+    """Hash do início e do trecho final já lido (mesma regra do CampaignStore)"""
+    digest = hashlib.sha1()
+    f.seek(0)
+    digest.update(f.read(min(offset, 4096)))
+    f.seek(max(0, offset - 256))
+    digest.update(f.read(min(offset, 256)))
+    return digest.digest()
+
+
+def _log_keys(data: bytes) -> list[str]:
+    """Chaves dos telefones em linhas telefone|motivo|timestamp"""
+    phones = [line.split('|', 1)[0].strip() for line in data.decode('utf-8', errors='replace').splitlines()]
+    return normalize_many([phone for phone in phones if phone], keys=True)
+
+
+def compile_index(log_path: str, index_path: str) -> int:
+    """
+    Compila o log inteiro (só linhas completas) num índice novo, trocado
+    atomicamente: quem já tem o antigo mapeado continua lendo o antigo.
+
+    Returns:
+        Quantidade de chaves
+    """
+    try:
+        with open(log_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+            offset = data.rfind(b'\n') + 1
+            fingerprint = _fingerprint(f, offset)
+        inode = st.st_ino
+    except FileNotFoundError:
+        data, offset, inode, fingerprint = b"", 0, 0, b"\0" * 20
+
+    codes = set(map(encode_key, _log_keys(data[:offset])))
+    bits = max(MIN_BITS, (2 * len(codes)).bit_length())  # ocupação <= 50%
+    size = 1 << bits
+    table = [0] * size
+    mask = size - 1
+    for code in codes:
+        slot = _slot(code, bits)
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = code
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, bits, len(codes), offset, inode, fingerprint).ljust(HEADER_SIZE, b"\0"))
+        f.write(struct.pack(f"={size}Q", *table))
+    os.replace(tmp_path, index_path)
+    return len(codes)
+
+
+class SuppressionIndex:
+    """
+    Blocklist global para consulta (telefone in index).
+
+    O blocklist.log continua sendo a fonte (texto, só acréscimos); o índice
+    compilado cobre o log até um offset, e as linhas acrescentadas depois
+    disso (opt-outs do webhook, blocklist add) são lidas a cada refresh()
+    para um set pequeno em memória. Com muitas linhas novas, ou se o log
+    for reescrito (blocklist remove), o índice é recompilado sob um lock
+    de arquivo, então execuções simultâneas (cron, menu, daemon) dividem
+    o mesmo arquivo sem se atrapalhar.
+    """
+
+    def __init__(self, campanhas_dir: str = DEFAULT_CAMPANHAS_DIR, log_path: Optional[str] = None,
+                 index_path: Optional[str] = None, compact_after: int = COMPACT_AFTER):
+        """
+        Args:
+            campanhas_dir: Pasta campanhas/ (blocklist.log e blocklist.idx)
+            log_path: Blocklist em texto (padrão: <campanhas_dir>/blocklist.log)
+            index_path: Índice compilado (padrão: <campanhas_dir>/blocklist.idx)
+            compact_after: Linhas novas em memória antes de recompilar
+        """
+        self.log_path = log_path or os.path.join(campanhas_dir, "blocklist.log")
+        self.index_path = index_path or os.path.join(campanhas_dir, "blocklist.idx")
+        self.compact_after = compact_after
+        self._map: Optional[mmap.mmap] = None
+        self._table = None
+        self._bits = MIN_BITS
+        self._count = 0
+        self._offset = 0
+        self._inode = 0
+        self._fingerprint = b""
+        self._tail: set[str] = set()
+        self._tail_bytes = 0
+        self._seen: Optional[tuple] = None
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        if not self._open():
+            self.compact()
+        self.refresh()
+
+    # ==================== Arquivo ====================
+
+    def _open(self) -> bool:
+        """Mapeia o índice compilado; False se não existe ou é de outro formato"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return False
+        if len(mapped) < HEADER_SIZE:
+            mapped.close()
+            return False
+        magic, bits, count, offset, inode, fingerprint = HEADER.unpack_from(mapped)
+        if magic != MAGIC or len(mapped) != HEADER_SIZE + 8 * (1 << bits):
+            mapped.close()
+            return False
+        self.close()
+        self._map = mapped
+        self._table = memoryview(mapped)[HEADER_SIZE:].cast('Q')
+        self._bits, self._count = bits, count
+        self._offset, self._inode, self._fingerprint = offset, inode, fingerprint
+        self._tail = set()
+        self._tail_bytes = 0
+        self._seen = None
+        return True
+
+    def _lock(self):
+        lock = open(f"{self.index_path}.lock", 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _read_tail(self) -> bool:
+        """
+        Lê só as linhas acrescentadas ao log desde a última vez.
+
+        Returns:
+            False se o log foi reescrito (o índice não vale mais)
+        """
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return self._offset == 0
+        seen = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if seen == self._seen:
+            return True
+        if st.st_ino != self._inode or st.st_size < self._offset + self._tail_bytes:
+            return False
+
+        with open(self.log_path, 'rb') as f:
+            if _fingerprint(f, self._offset) != self._fingerprint:
+                return False
+            f.seek(self._offset + self._tail_bytes)
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        self._tail_bytes += complete
+        self._tail.update(key for key in _log_keys(data[:complete]) if not self._lookup(key))
+        # Linha ainda sendo escrita: volta a olhar na próxima consulta
+        self._seen = seen if complete == len(data) else None
+        return True
+
+    def refresh(self):
+        """Acompanha o log; recompila se ele foi reescrito ou se acumulou linhas novas demais"""
+        if not self._read_tail() or len(self._tail) > self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """Recompila o índice com o log inteiro (sob lock; outro processo pode já ter feito)"""
+        with self._lock():
+            self._compact_locked()
+
+    def _compact_locked(self):
+        if self._open() and self._read_tail() and len(self._tail) <= self.compact_after:
+            return
+        compile_index(self.log_path, self.index_path)
+        self._open()
+
+    def close(self):
+        if self._table is not None:
+            self._table.release()
+            self._table = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ==================== Consulta ====================
+
+    def _lookup(self, key: str) -> bool:
+        table = self._table
+        if table is None or not self._count:
+            return False
+        code = encode_key(key)
+        bits = self._bits
+        mask = (1 << bits) - 1
+        slot = ((code * _GOLDEN) & _MASK64) >> (64 - bits)
+        while True:
+            value = table[slot]
+            if value == code:
+                return True
+            if not value:
+                return False
+            slot = (slot + 1) & mask
+
+    def __contains__(self, key) -> bool:
+        """Chave de telefone (phone_key) na blocklist? Não relê o log: use refresh()"""
+        return key in self._tail or self._lookup(key)
+
+    def __len__(self) -> int:
+        return self._count + len(self._tail)
+
+    def is_blocked(self, phone) -> bool:
+        """Telefone em qualquer formatação na blocklist (com refresh do log)"""
+        self.refresh()
+        return phone_key(phone) in self
+
+    def blocked_many(self, keys: Iterable[str]) -> list[bool]:
+        """Uma coluna de chaves de uma vez (sem reler o log)"""
+        tail, lookup = self._tail, self._lookup
+        return [key in tail or lookup(key) for key in keys]
+
+    # ==================== Escrita ====================
+
+    def add(self, phone, reason: str, timestamp: Optional[str] = None) -> bool:
+        """
+        Acrescenta o telefone ao blocklist.log (uma escrita, em modo append).
+
+        A consulta e a escrita são feitas sob o mesmo lock de remove(): um
+        opt-out nunca cai no log antigo enquanto ele é reescrito.
+
+        Returns:
+            False se já estava na blocklist
+        """
+        key = phone_key(phone)
+        numero = normalize_phone(str(phone)) or only_digits(str(phone))
+        timestamp = timestamp or datetime.now().astimezone().isoformat(timespec='seconds')
+        reason = reason.replace('|', '/').replace('\n', ' ')
+        line = f"{numero}|{reason}|{timestamp}\n".encode('utf-8')
+        with self._lock():
+            if not self._read_tail() or len(self._tail) > self.compact_after:
+                self._compact_locked()
+            if key in self:
+                return False
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self._read_tail()
+        return True
+
+    def remove(self, phone) -> bool:
+        """
+        Tira o telefone do blocklist.log (reescrito atomicamente) e recompila o índice.
+
+        Returns:
+            False se não estava na blocklist
+        """
+        key = phone_key(phone)
+        with self._lock():
+            try:
+                with open(self.log_path, 'r', encoding='utf-8', errors='replace') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                return False
+            kept = [line for line in lines
+                    if not line.strip() or phone_key(line.split('|', 1)[0].strip()) != key]
+            if len(kept) == len(lines):
+                return False
+            tmp_path = f"{self.log_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(kept)
+            os.replace(tmp_path, self.log_path)
+            compile_index(self.log_path, self.index_path)
+            self._open()
+        return True
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Uso: python3 suppression_index.py [compile | check <telefone> | bench [N]]
+    action = sys.argv[1] if len(sys.argv) > 1 else "compile"
+    if action == "compile":
+        start = time.perf_counter()
+        index = SuppressionIndex()
+        index.compact()
+        print(f"✅ {len(index)} número(s) em {index.index_path} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    elif action == "check" and len(sys.argv) > 2:
+        blocked = SuppressionIndex().is_blocked(sys.argv[2])
+        print("bloqueado" if blocked else "livre")
+        sys.exit(0 if blocked else 1)
+    elif action == "bench":
+        import random
+        import tempfile
+
+        total = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+        rng = random.Random(42)
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "blocklist.log"), 'w') as f:
+                for _ in range(total):
+                    f.write(f"55{rng.randrange(11, 99)}9{rng.randrange(10 ** 8):08d}|bench|2024-01-01\n")
+            start = time.perf_counter()
+            index = SuppressionIndex(tmp)
+            compiled = time.perf_counter() - start
+            start = time.perf_counter()
+            reopened = SuppressionIndex(tmp)
+            opened = time.perf_counter() - start
+            probes = [f"55{rng.randrange(11, 99)}9{rng.randrange(10 ** 8):08d}" for _ in range(100_000)]
+            start = time.perf_counter()
+            hits = sum(reopened.blocked_many(probes))
+            lookup = (time.perf_counter() - start) / len(probes)
+            size = os.path.getsize(index.index_path)
+            print(f"🔎 {len(index)} números | compilar: {compiled:.2f}s | abrir: {opened * 1000:.2f} ms | "
+                  f"consulta: {lookup * 1e9:.0f} ns | índice: {size / 1024 / 1024:.1f} MB | {hits} acertos")
+            index.close()
+            reopened.close()
+    else:
+        print("Uso: python3 suppression_index.py [compile | check <telefone> | bench [N]]")
+        sys.exit(1)
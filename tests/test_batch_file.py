@@ -0,0 +1,58 @@
+"""Lotes em JSON Lines: gravação atômica, leitura, contagem e cópia XLSX"""
+
+import pytest
+
+from batch_file import (GLOBAL_HEADERS, HEADERS, _headers, count_batch, export_xlsx, iter_batch_rows,
+                        read_batch, write_batch)
+from contacts import iter_contacts, iter_xlsx_rows
+
+ROWS = [
+    ("Padaria Sol", "61999990000", "Rua A, 1", 4.8, "padariasol.com.br"),
+    ("Café Ação ☕", "61988887777", None, None, None),
+]
+
+
+@pytest.fixture
+def batch(tmp_path):
+    path = str(tmp_path / "batch_atual.jsonl")
+    assert write_batch(path, iter(ROWS)) == len(ROWS)
+    return path
+
+
+def test_roundtrip_keeps_values_and_order(batch):
+    assert read_batch(batch) == ROWS
+    assert count_batch(batch) == len(ROWS)
+    assert _headers(batch) == HEADERS
+
+
+def test_write_replaces_the_previous_batch(batch, tmp_path):
+    write_batch(batch, ROWS[:1], GLOBAL_HEADERS)
+    assert read_batch(batch) == ROWS[:1]
+    assert _headers(batch) == GLOBAL_HEADERS
+    assert [path.name for path in tmp_path.iterdir()] == ["batch_atual.jsonl"]
+
+
+def test_missing_batch_counts_zero(tmp_path):
+    assert count_batch(str(tmp_path / "nao_existe.jsonl")) == 0
+
+
+def test_contacts_read_the_batch_directly(batch):
+    assert [(c.nome, c.telefone) for c in iter_contacts(batch)] == [(row[0], row[1]) for row in ROWS]
+
+
+def test_xlsx_copy_and_legacy_xlsx_batches(batch, tmp_path):
+    xlsx = str(tmp_path / "batch_atual.xlsx")
+    export_xlsx(xlsx, read_batch(batch))
+    assert next(iter_xlsx_rows(xlsx, min_row=1)) == HEADERS
+    # O XLSX não guarda células vazias no fim da linha
+    assert [row[:2] for row in iter_batch_rows(xlsx)] == [row[:2] for row in iter_batch_rows(batch)]
+
+
+def test_invalid_quota_keeps_the_daily_batch(batch, tmp_path, monkeypatch):
+    import marketing_cli
+
+    monkeypatch.setenv("WHATSAPP_INSTANCES", "inst1")
+    monkeypatch.setenv("WHATSAPP_QUOTA", "inst1:muito")
+    rows = [row + (str(tmp_path), "Olá {nome}") for row in ROWS]
+    assert marketing_cli.send_daily_batch(batch, rows) is False
+    assert read_batch(batch) == ROWS
@@ -0,0 +1,95 @@
+"""Rodízio ponderado do lote diário"""
+
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from batch_selector import BatchSelector, Source, campaign_weight, daily_offset, priority_from_spec
+
+
+def _rows(prefix: str, count: int, **extra) -> list[tuple]:
+    # (nome, telefone, endereco, avaliacao, website, numero)
+    return [(f"{prefix}{n}", f"119{prefix}{n:06d}", "", extra.get("avaliacao", "4,5"),
+             extra.get("website", ""), f"119{prefix}{n:06d}") for n in range(count)]
+
+
+def _source(name: str, count: int, weight: float = 1.0, opened: list = None, **extra) -> Source:
+    rows = _rows(name, count, **extra)
+
+    def open_rows():
+        if opened is not None:
+            opened.append(name)
+        return iter(rows)
+
+    return Source(name, open_rows, weight)
+
+
+@pytest.mark.parametrize("weights", [(1, 1, 1), (3, 1), (2, 1, 1), (1, 4)])
+def test_batch_follows_the_weights(weights):
+    sources = [_source(str(index + 1), 500, weight) for index, weight in enumerate(weights)]
+    batch = BatchSelector(sources).take(120)
+    counts = Counter(source.name for source, _ in batch)
+    for index, weight in enumerate(weights):
+        expected = 120 * weight / sum(weights)
+        assert abs(counts[str(index + 1)] - expected) <= 1
+
+
+def test_exhausted_source_leaves_the_rotation():
+    sources = [_source("1", 3), _source("2", 50)]
+    batch = BatchSelector(sources).take(20)
+    counts = Counter(source.name for source, _ in batch)
+    assert counts == {"1": 3, "2": 17}
+
+
+def test_limit_bigger_than_all_sources():
+    assert len(BatchSelector([_source("1", 2), _source("2", 3)]).take(10)) == 5
+
+
+def test_sources_open_only_when_needed():
+    opened = []
+    sources = [_source(str(n), 10, opened=opened) for n in range(1, 6)]
+    BatchSelector(sources).take(2)
+    assert opened == ["1", "2"]
+
+
+def test_start_rotates_who_goes_first():
+    sources = [_source("1", 5), _source("2", 5), _source("3", 5)]
+    batch = BatchSelector(sources, start=2).take(3)
+    assert [source.name for source, _ in batch] == ["3", "1", "2"]
+
+
+def test_shared_seen_never_repeats_a_number():
+    rows = _rows("1", 5)
+    seen = set()
+    first = BatchSelector([Source("a", lambda: iter(rows))], seen=seen)
+    second = BatchSelector([Source("b", lambda: iter(rows))], seen=seen)
+    picked = [row for _, row in first.take(3)] + [row for _, row in second.take(5)]
+    assert len(picked) == 5
+    assert len({row[-1] for row in picked}) == 5
+
+
+def test_priority_picks_the_best_in_the_window():
+    rows = _rows("1", 4)
+    rows[2] = rows[2][:3] + ("5,0",) + rows[2][4:]
+    batch = BatchSelector([Source("a", lambda: iter(rows))], priority=priority_from_spec("avaliacao")).take(1)
+    assert batch[0][1] == rows[2]
+
+
+def test_unknown_priority_rule():
+    with pytest.raises(ValueError):
+        priority_from_spec("sem_site,inexistente")
+    assert priority_from_spec("") is None
+
+
+def test_campaign_weight_file(tmp_path):
+    assert campaign_weight(str(tmp_path)) == 1.0
+    (tmp_path / "peso.txt").write_text("2,5\n")
+    assert campaign_weight(str(tmp_path)) == 2.5
+    (tmp_path / "peso.txt").write_text("-1")
+    assert campaign_weight(str(tmp_path)) == 1.0
+
+
+def test_daily_offset_changes_every_day():
+    assert daily_offset(0) == 0
+    assert daily_offset(3, date(2024, 1, 2)) == (daily_offset(3, date(2024, 1, 1)) + 1) % 3
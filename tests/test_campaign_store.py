@@ -0,0 +1,159 @@
+"""Índice SQLite das campanhas: importação incremental dos logs e seleção dos lotes"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from campaign_store import CampaignStore, due_at, parse_cadence
+from contacts import append_xlsx_rows
+
+
+def _campaign(campanhas, name, phones):
+    path = campanhas / "restaurantes" / name
+    path.mkdir(parents=True)
+    append_xlsx_rows(str(path / "contatos.xlsx"), [(f"Empresa {phone}", phone, "", None, None) for phone in phones])
+    return str(path)
+
+
+def _log(campaign_dir, name, *lines):
+    with open(os.path.join(campaign_dir, name), "a") as f:
+        f.writelines(f"{line}\n" for line in lines)
+
+
+@pytest.fixture
+def campanhas(tmp_path):
+    return tmp_path / "campanhas"
+
+
+@pytest.fixture
+def store(campanhas):
+    campanhas.mkdir()
+    with CampaignStore(str(campanhas / "estado.db"), str(campanhas)) as store:
+        yield store
+
+
+def _phones(rows):
+    return [row[1] for row in rows]
+
+
+def test_pending_in_spreadsheet_order_up_to_the_limit(campanhas, store):
+    _campaign(campanhas, "brasilia", ["61900000001", "61900000002", "61900000003"])
+    _campaign(campanhas, "goiania", ["62900000001", "62900000002"])
+    store.sync()
+    assert _phones(store.pending(limit=4)) == ["61900000001", "61900000002", "61900000003", "62900000001"]
+    assert store.pending(limit=1)[0][-1].endswith("brasilia")
+
+
+def test_sent_discarded_and_blocked_numbers_leave_the_batch(campanhas, store):
+    brasilia = _campaign(campanhas, "brasilia", ["61900000001", "61900000002", "61900000003", "61900000004"])
+    now = datetime.now().isoformat()
+    _log(brasilia, "enviados.log", f"5561900000001|{now}|1|inst1")
+    _log(brasilia, "descartados.log", f"61900000002|{now}|sem_whatsapp|inst1")
+    (campanhas / "blocklist.log").write_text(f"+55 61 90000-0003|opt-out|{now}\n")
+    store.sync()
+    assert _phones(store.pending()) == ["61900000004"]
+    assert store.is_suppressed("61900000003")
+
+
+def test_numbers_shared_between_campaigns(campanhas, store):
+    brasilia = _campaign(campanhas, "brasilia", ["61900000001", "61900000002"])
+    _campaign(campanhas, "goiania", ["61900000002", "62900000001"])
+    store.sync()
+    # Repetido entre campanhas sai uma vez só
+    assert _phones(store.pending()) == ["61900000001", "61900000002", "62900000001"]
+
+    _log(brasilia, "enviados.log", f"61900000002|{datetime.now().isoformat()}|1|inst1")
+    store.sync()
+    assert _phones(store.pending()) == ["61900000001", "62900000001"]
+    assert _phones(store.pending(any_campaign=False)) == ["61900000001", "61900000002", "62900000001"]
+
+
+def test_pending_for_some_campaigns(campanhas, store):
+    _campaign(campanhas, "brasilia", ["61900000001"])
+    goiania = _campaign(campanhas, "goiania", ["62900000001"])
+    store.sync()
+    assert _phones(store.pending([goiania])) == ["62900000001"]
+    assert store.pending([]) == []
+
+
+def test_logs_are_read_incrementally(campanhas, store):
+    brasilia = _campaign(campanhas, "brasilia", ["61900000001", "61900000002", "61900000003"])
+    now = datetime.now().isoformat()
+    _log(brasilia, "enviados.log", f"61900000001|{now}|1|inst1")
+    store.sync()
+    # Linha ainda sendo escrita (sem \n) só entra quando completa
+    with open(os.path.join(brasilia, "enviados.log"), "a") as f:
+        f.write(f"61900000002|{now}|1|inst2")
+    store.sync()
+    assert _phones(store.pending()) == ["61900000002", "61900000003"]
+    _log(brasilia, "enviados.log", "")
+    store.sync()
+    assert _phones(store.pending()) == ["61900000003"]
+    assert store.sends_by_instance(now[:10]) == {"inst1": 1, "inst2": 1}
+
+
+def test_rewritten_log_is_imported_again(campanhas, store):
+    brasilia = _campaign(campanhas, "brasilia", ["61900000001", "61900000002"])
+    now = datetime.now().isoformat()
+    _log(brasilia, "enviados.log", f"61900000001|{now}|1|inst1")
+    store.sync()
+    with open(os.path.join(brasilia, "enviados.log"), "w") as f:
+        f.write(f"61900000002|{now}|1|inst1\n")
+    store.sync()
+    assert _phones(store.pending()) == ["61900000001"]
+
+
+def test_followup_due_by_cadence(campanhas, store):
+    brasilia = _campaign(campanhas, "brasilia", ["61900000001", "61900000002", "61900000003"])
+    old = (datetime.now() - timedelta(hours=50)).isoformat()
+    _log(brasilia, "enviados.log", f"61900000001|{old}|1|inst1", f"61900000002|{old}|2|inst1",
+         f"61900000003|{datetime.now().isoformat()}|1|inst1")
+    store.sync()
+    assert [(row[1], row[-1]) for row in store.followup_due()] == [("61900000001", 1), ("61900000002", 2)]
+
+    (campanhas / "respostas.log").write_text(f"61900000001|{datetime.now().isoformat()}|inst1|oi\n")
+    with open(os.path.join(brasilia, "cadencia.txt"), "w") as f:
+        f.write("72h")  # um follow-up só: a 2ª mensagem encerra a cadência
+    store.sync()
+    assert store.followup_due() == []
+
+
+def test_stats(campanhas, store):
+    brasilia = _campaign(campanhas, "brasilia", ["61900000001", "61900000002", "61900000003"])
+    _log(brasilia, "enviados.log", f"61900000001|{datetime.now().isoformat()}|1|inst1")
+    store.sync()
+    stats = store.stats()
+    assert len(stats) == 1
+    assert (stats[0].rows, stats[0].valid, stats[0].sent, stats[0].pending) == (3, 3, 1, 2)
+    assert store.stats() == stats
+
+
+def test_merge_contacts_adds_only_new_numbers(campanhas, store, tmp_path):
+    brasilia = _campaign(campanhas, "brasilia", ["61900000001"])
+    _campaign(campanhas, "goiania", ["62900000001"])
+    scraped = str(tmp_path / "pesquisa.xlsx")
+    append_xlsx_rows(scraped, [("A", "61900000001"), ("B", "62900000001"), ("C", "61900000009"),
+                               ("C de novo", "(61) 90000-0009")])
+    assert store.merge_contacts(brasilia, scraped) == (1, 2, 1)
+    assert "61900000009" in _phones(store.pending())
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("48h, 7d", (48.0, 168.0)),
+    ("30m; 2 # comentário", (0.5, 2.0)),
+])
+def test_parse_cadence(text, expected):
+    assert parse_cadence(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "0h", "xh"])
+def test_invalid_cadence(text):
+    with pytest.raises(ValueError):
+        parse_cadence(text)
+
+
+def test_due_at():
+    assert due_at("2024-05-01T10:00:00", 1, (48.0,)) == "2024-05-03T10:00:00"
+    assert due_at("2024-05-01T10:00:00", 2, (48.0,)) is None
+    assert due_at("", 1, (48.0,)) is None
@@ -0,0 +1,84 @@
+"""Snapshot colunar da planilha: mesmas linhas do XLSX, reconstruído quando muda"""
+
+import os
+
+import pytest
+
+from contact_snapshot import ContactSnapshot, build_snapshot, count_valid, iter_rows, load_snapshot, snapshot_path
+from contacts import append_xlsx_rows, iter_contacts, iter_xlsx_rows
+
+ROWS = [
+    ("Padaria Sol", "61999990000", "Rua A, 1", 4.8, "padariasol.com.br"),
+    ("Café Ação ☕", 61988887777, None, 5, None),
+    ("Sem telefone", "N/A", "Rua C", None, None),
+    (None, "61977776666", "Rua D", 3.9, "instagram.com/d"),
+    ("Oficina", "(61) 3333-4444", "", "4,2", "wa.me/556133334444"),
+]
+
+
+@pytest.fixture
+def xlsx(tmp_path):
+    path = str(tmp_path / "contatos.xlsx")
+    append_xlsx_rows(path, ROWS)
+    return path
+
+
+def test_rows_match_the_spreadsheet(xlsx):
+    # Linhas curtas do XLSX (células vazias no fim) são completadas com None
+    expected = [row + (None,) * (5 - len(row)) for row in iter_xlsx_rows(xlsx)]
+    assert list(load_snapshot(xlsx).rows()) == expected
+    assert list(iter_rows(xlsx)) == expected
+
+
+def test_types_survive(xlsx):
+    snapshot = load_snapshot(xlsx)
+    assert snapshot.cell(1, 1) == 61988887777
+    assert snapshot.cell(0, 3) == 4.8
+    assert snapshot.cell(1, 2) is None
+    assert snapshot.column(0)[1] == "Café Ação ☕"
+
+
+def test_views_read_fields_lazily(xlsx):
+    view = load_snapshot(xlsx).view(0)
+    assert (view.nome, view.telefone, view.website) == ("Padaria Sol", "61999990000", "padariasol.com.br")
+    assert view.row() == ROWS[0]
+
+
+def test_count_valid(xlsx, tmp_path):
+    assert count_valid(xlsx) == 3
+    assert count_valid(str(tmp_path / "nao_existe.xlsx")) == 0
+
+
+def test_snapshot_is_reused_until_the_sheet_changes(xlsx):
+    snapshot = load_snapshot(xlsx)
+    assert load_snapshot(xlsx) is snapshot
+    append_xlsx_rows(xlsx, [("Nova", "61966665555", "", None, None)])
+    updated = load_snapshot(xlsx)
+    assert updated is not snapshot
+    assert len(updated) == len(ROWS) + 1
+    assert updated.matches(xlsx)
+
+
+@pytest.mark.parametrize("content", [b"", b"xx", b"lixo" * 100])
+def test_corrupt_snapshot_is_rebuilt(tmp_path, content):
+    xlsx = str(tmp_path / "contatos.xlsx")
+    append_xlsx_rows(xlsx, ROWS)
+    with open(snapshot_path(xlsx), "wb") as f:
+        f.write(content)
+    snapshot = load_snapshot(xlsx)
+    assert snapshot is not None and len(snapshot) == len(ROWS)
+
+
+def test_empty_sheet(tmp_path):
+    xlsx = str(tmp_path / "contatos.xlsx")
+    append_xlsx_rows(xlsx, [])
+    with ContactSnapshot(build_snapshot(xlsx)) as snapshot:
+        assert len(snapshot) == 0 and list(snapshot.rows()) == []
+
+
+def test_iter_contacts_same_with_or_without_snapshot(xlsx):
+    direct = [(c.nome, c.telefone, c.avaliacao) for c in iter_contacts(xlsx)]
+    cached = [(c.nome, c.telefone, c.avaliacao) for c in iter_contacts(xlsx, snapshot=True)]
+    assert direct == cached
+    assert [name for name, _, _ in direct] == ["Padaria Sol", "Café Ação ☕", "Oficina"]
+    assert os.path.exists(snapshot_path(xlsx))
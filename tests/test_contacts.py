@@ -0,0 +1,75 @@
+"""Leitura em streaming das planilhas de contatos e escrita incremental"""
+
+import subprocess
+import sys
+
+import pytest
+
+import contacts
+from contacts import HEADERS, Contact, append_xlsx_rows, count_contacts, is_valid_row, iter_contacts, iter_xlsx_rows
+
+ROWS = [
+    ("Padaria Sol", "61999990000", "Rua A, 1", 4.8, "padariasol.com.br"),
+    ("Sem telefone", "N/A", "Rua B", None, None),
+    (None, "61977776666", "Rua C", 3.9, None),
+    ("Oficina", 6133334444, None, None, None),
+    ("Curto", "123", "Rua D", 5, None),
+]
+
+
+@pytest.fixture
+def xlsx(tmp_path):
+    path = str(tmp_path / "contatos.xlsx")
+    append_xlsx_rows(path, ROWS)
+    return path
+
+
+@pytest.mark.parametrize("row, valid", [
+    (("A", "61999990000"), True),
+    (("A", "N/A"), False),
+    (("", "61999990000"), False),
+    (("A",), False),
+    (("A", None, "Rua"), False),
+])
+def test_is_valid_row(row, valid):
+    assert is_valid_row(row) is valid
+
+
+def test_iter_contacts_skips_invalid_rows(xlsx):
+    found = list(iter_contacts(xlsx))
+    assert [c.nome for c in found] == ["Padaria Sol", "Oficina", "Curto"]
+    assert found[0] == Contact("Padaria Sol", "61999990000", "Rua A, 1", "4.8", "padariasol.com.br")
+    assert found[1].telefone == "6133334444" and found[1].avaliacao is None
+
+
+def test_normalize_drops_rejected_numbers(xlsx):
+    def normalize(phone):
+        return f"55{phone}" if len(phone) >= 10 else None
+
+    assert [c.telefone for c in iter_contacts(xlsx, normalize=normalize)] == ["5561999990000", "556133334444"]
+
+
+def test_iter_contacts_is_lazy(xlsx):
+    found = iter_contacts(xlsx)
+    assert next(found).nome == "Padaria Sol"
+    found.close()
+
+
+def test_append_keeps_the_header_and_existing_rows(xlsx):
+    append_xlsx_rows(xlsx, [("Nova", "61966665555", "Rua E", 4, "nova.com")])
+    assert next(iter_xlsx_rows(xlsx, min_row=1)) == HEADERS
+    rows = list(iter_xlsx_rows(xlsx))
+    assert len(rows) == len(ROWS) + 1
+    assert rows[0] == ROWS[0] and rows[-1] == ("Nova", "61966665555", "Rua E", 4, "nova.com")
+
+
+def test_count_contacts(xlsx, tmp_path):
+    assert count_contacts(xlsx) == 3
+    assert count_contacts(str(tmp_path / "nao_existe.xlsx")) == 0
+
+
+def test_count_from_the_command_line(xlsx):
+    # Usado pelos scripts shell para decidir se há contatos suficientes
+    result = subprocess.run([sys.executable, contacts.__file__, "count", xlsx], capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == "3"
@@ -0,0 +1,91 @@
+"""Cotas por instância e distribuição dos contatos no pool"""
+
+import pytest
+
+from instance_pool import DEFAULT_DAILY_QUOTA, InstancePool, quotas_from_env
+from send_scheduler import SendScheduler
+
+INSTANCES = ["inst1", "inst2", "inst3"]
+
+
+class FakeAPI:
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.sent = []
+
+    def is_connected(self, name):
+        return name not in self.down
+
+    def circuit_open(self, name):
+        return False
+
+    def send_presence(self, instance_name, phone, presence, delay):
+        pass
+
+    def send_text(self, instance_name, phone, message):
+        self.sent.append((instance_name, phone))
+        return {"key": {"id": "1"}}
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("", {"inst1": DEFAULT_DAILY_QUOTA, "inst2": DEFAULT_DAILY_QUOTA, "inst3": DEFAULT_DAILY_QUOTA}),
+    ("60", {"inst1": 60, "inst2": 60, "inst3": 60}),
+    ("inst1:10,inst2:20", {"inst1": 10, "inst2": 20, "inst3": DEFAULT_DAILY_QUOTA}),
+    ("inst1:10,30", {"inst1": 10, "inst2": 30, "inst3": 30}),
+    ("30, inst1:10", {"inst1": 10, "inst2": 30, "inst3": 30}),
+])
+def test_quotas_from_env(monkeypatch, spec, expected):
+    monkeypatch.setenv("WHATSAPP_QUOTA", spec)
+    assert quotas_from_env(INSTANCES) == expected
+
+
+def test_malformed_quota(monkeypatch):
+    monkeypatch.setenv("WHATSAPP_QUOTA", "inst1:muito")
+    with pytest.raises(ValueError):
+        quotas_from_env(INSTANCES)
+
+
+def _pool(tmp_path, quota=2, used=None, down=()):
+    return InstancePool(FakeAPI(down), INSTANCES, quota=quota, used=used,
+                        assignments_path=str(tmp_path / "instancias.log"))
+
+
+def test_assign_balances_and_respects_quota_and_used(tmp_path):
+    pool = _pool(tmp_path, quota={"inst1": 2, "inst2": 2, "inst3": 2}, used={"inst1": 2})
+    names = [pool.assign(f"1191111000{n}") for n in range(5)]
+    assert names.count("inst1") == 0
+    assert sorted(name for name in names if name) == ["inst2", "inst2", "inst3", "inst3"]
+    assert names[-1] is None and pool.exhausted()
+
+
+def test_unhealthy_instances_get_nothing(tmp_path):
+    pool = _pool(tmp_path, quota=10, down={"inst2"})
+    assert {pool.assign(f"1191111000{n}") for n in range(6)} == {"inst1", "inst3"}
+
+
+def test_followup_sticks_to_the_instance_that_sent(tmp_path):
+    pool = _pool(tmp_path, quota=10)
+    pool.record_send("inst3", "11911110001")
+    assert _pool(tmp_path, quota=10).assign("+55 11 91111-0001") == "inst3"
+    pool = _pool(tmp_path, quota=10, down={"inst3"})
+    assert pool.assign("11911110001") is None  # fica para quando inst3 voltar
+
+
+def test_release_returns_the_quota(tmp_path):
+    pool = _pool(tmp_path, quota=1)
+    name = pool.assign("11911110001")
+    pool.release(name)
+    assert pool.has_capacity(name)
+
+
+def test_run_pool_stops_at_the_quota(tmp_path):
+    api = FakeAPI()
+    pool = InstancePool(api, ["inst1", "inst2"], quota={"inst1": 2, "inst2": 1}, used={"inst2": 1},
+                        assignments_path=str(tmp_path / "instancias.log"))
+    scheduler = SendScheduler(api, interval_seconds=0, typing_delay=0, jitter=0)
+    phones = [f"1191111000{n}" for n in range(5)]
+    results = list(scheduler.run_pool(pool, phones, phone=str, render=str))
+
+    assert [(name, status) for _, name, status, _ in results] == [("inst1", "sent"), ("inst1", "sent")]
+    assert [name for name, _ in api.sent] == ["inst1", "inst1"]
+    assert (tmp_path / "instancias.log").read_text().count("|inst1|") == 2
@@ -0,0 +1,105 @@
+"""Filtros de leads: plataformas genéricas por host e pipeline por colunas"""
+
+import pytest
+
+from lead_filters import (FilterConfig, LeadPipeline, PlatformIndex, hostname, load_config,
+                          needs_professional_site)
+
+GENERIC = [
+    "instagram.com/escritorio",
+    "https://www.Instagram.com/escritorio/",
+    "http://m.facebook.com/pages/x",
+    "facebook.com.br/escritorio",
+    "x.com/escritorio",
+    "olx.com.br/anuncio/1",
+    "www.olx.com/anuncio",
+    "https://escritorio.wixsite.com/site",
+    "sites.google.com/view/escritorio",
+    "https://google.com/maps/place/escritorio",
+    "google.com.br/maps?cid=1",
+    "linktree.com.br/escritorio",
+    "wa.me/5561999990000",
+    "user@x.com:8080/perfil",
+]
+
+OWN_SITES = [
+    "fox.com",
+    "https://www.fox.com/news",
+    "xbox.com",
+    "ox.com.br",
+    "escritorio.com.br",
+    "advocacia-silva.adv.br",
+    "instagram.com.golpe.net",
+    "notinstagram.com",
+    "uberlandia.com.br",
+    "google.com/search?q=x",
+    "mylinktree.com",
+]
+
+
+@pytest.mark.parametrize("url", GENERIC)
+def test_generic_platforms_match(url):
+    assert PlatformIndex().match(url)
+    assert needs_professional_site(url)
+
+
+@pytest.mark.parametrize("url", OWN_SITES)
+def test_own_domains_do_not_match(url):
+    assert not PlatformIndex().match(url)
+    assert not needs_professional_site(url)
+
+
+@pytest.mark.parametrize("website", [None, "", "N/A", "-", "   "])
+def test_no_website_needs_a_site(website):
+    assert needs_professional_site(website)
+
+
+def test_extra_platforms_with_country_domain():
+    index = PlatformIndex(["meusite.com.br", "catalogo.net/loja"])
+    assert index.match("https://meusite.com/empresa")
+    assert index.match("loja.meusite.com.br")
+    assert index.match("catalogo.net.br/loja/1")
+    assert not index.match("catalogo.net/blog")
+
+
+def test_hostname():
+    assert hostname("HTTPS://user@WWW.Exemplo.com.br:443/a?b#c") == ("exemplo.com.br", "/a?b#c")
+    assert hostname("N/A") == ("", "")
+
+
+def _row(name, phone, rating="4,5", website=""):
+    return (name, phone, "", rating, website)
+
+
+def test_pipeline_combines_filters():
+    rows = [
+        _row("A", "11911110001", website="instagram.com/a"),
+        _row("B", "11911110002", website="empresa-b.com.br"),
+        _row("C", "N/A"),
+        _row("D", "11911110004", rating="3,0"),
+        _row("E", "11911110005"),
+        _row("", "11911110006"),
+        _row("G", "11911110007"),
+    ]
+    pipeline = LeadPipeline(FilterConfig(site="sem_site", min_rating=4.0),
+                            blocked={"5511911110005"}, sent={"5511911110007"})
+    assert [row[0] for row in pipeline.filter(rows)] == ["A"]
+
+
+def test_pipeline_take_stops_reading():
+    read = []
+
+    def rows():
+        for n in range(10_000):
+            read.append(n)
+            yield _row(f"C{n}", f"119{n:08d}")
+
+    assert len(LeadPipeline().take(rows(), 5)) == 5
+    assert len(read) <= 16
+
+
+def test_load_config(tmp_path):
+    assert load_config(str(tmp_path)) == FilterConfig()
+    (tmp_path / "filtros.txt").write_text("site = sem_site  # só quem não tem\n"
+                                          "avaliacao_min = 4,2\nplataformas = a.com, b.com.br\n")
+    assert load_config(str(tmp_path)) == FilterConfig("sem_site", 4.2, ("a.com", "b.com.br"))
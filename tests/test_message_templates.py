@@ -0,0 +1,85 @@
+"""Templates pré-compilados: renderização, variáveis e cache por arquivo"""
+
+import os
+
+import pytest
+
+import message_templates
+from contacts import Contact
+from message_templates import (FIELDS, MessageTemplate, TemplateError, clear_cache, compile_template,
+                               load_template, register_columns)
+
+ROW = ("Padaria Sol", "61999990000", "Rua A, 1", "4,8", "padariasol.com.br")
+
+
+@pytest.fixture(autouse=True)
+def fields(monkeypatch):
+    # register_columns mexe no dicionário global: cada teste começa do padrão
+    monkeypatch.setattr(message_templates, "FIELDS", dict(FIELDS))
+    clear_cache()
+    yield
+    clear_cache()
+
+
+@pytest.mark.parametrize("text", [
+    "Olá {nome}!",
+    "{nome}{endereco}",
+    "Sem variáveis",
+    "",
+    "{nome}, vi que a {nome} fica em {endereco} ({avaliacao} ⭐) - {website}",
+])
+def test_render_row_matches_str_format(text):
+    values = dict(zip(("nome", "telefone", "endereco", "avaliacao", "website"), ROW))
+    assert MessageTemplate(text).render_row(ROW) == text.format(**values)
+
+
+def test_unknown_variables_stay_in_the_text():
+    template = MessageTemplate("Oi {nome}, {cupom} e {}")
+    assert template.unknown == ["cupom"]
+    assert template.render_row(ROW) == "Oi Padaria Sol, {cupom} e {}"
+    with pytest.raises(TemplateError):
+        MessageTemplate("Oi {cupom}", strict=True)
+
+
+def test_empty_values_use_the_defaults():
+    template = MessageTemplate("Olá {nome}, {website}")
+    assert template.render_row(("", "61999990000"), defaults={"nome": "empresa"}) == "Olá empresa, "
+    assert template.render({"nome": None}, defaults={"nome": "empresa"}) == "Olá empresa, "
+    assert template.render_contact(Contact("", "61999990000"), defaults={"nome": "empresa"}) == "Olá empresa, "
+
+
+def test_variables_in_order():
+    assert MessageTemplate("{website} {nome} {website}").variables == ["website", "nome"]
+
+
+def test_register_columns_from_header():
+    register_columns(("Nome", "Telefone", "Endereço", "Avaliação", "Website", "Categoria", "Horário"))
+    row = ROW + ("Padaria", "7h às 19h")
+    assert compile_template("{categoria}: {horario}").render_row(row) == "Padaria: 7h às 19h"
+
+
+def test_compile_template_is_cached():
+    assert compile_template("Olá {nome}") is compile_template("Olá {nome}")
+
+
+def test_load_template_strips_and_caches(tmp_path):
+    path = tmp_path / "01_apresentacao.txt"
+    path.write_text("\n  Olá {nome}!\n\n", encoding="utf-8")
+    template = load_template(str(path))
+    assert template.text == "Olá {nome}!"
+    assert load_template(str(path)) is template
+
+
+def test_load_template_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "01_apresentacao.txt"
+    path.write_text("Olá {nome}", encoding="utf-8")
+    load_template(str(path))
+    path.write_text("Bom dia, {nome}!", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_template(str(path)).render_row(ROW) == "Bom dia, Padaria Sol!"
+
+
+def test_missing_template_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_template(str(tmp_path / "nao_existe.txt"))
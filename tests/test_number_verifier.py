@@ -0,0 +1,103 @@
+"""Verificação em bloco com cache em disco (TTL, falhas da API e compactação)"""
+
+import time
+
+import number_verifier
+from number_verifier import NumberVerifier
+
+
+class FakeAPI:
+    """Responde /chat/whatsappNumbers: números terminados em 0 não têm WhatsApp"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def whatsapp_numbers(self, instance_name, phones):
+        self.calls.append(list(phones))
+        if self.fail:
+            return None
+        # Números sem WhatsApp às vezes nem voltam na resposta
+        return {phone: True for phone in phones if not phone.endswith("0")}
+
+
+def _phones(count):
+    return [f"119111{n:05d}" for n in range(1, count + 1)]
+
+
+def _verifier(tmp_path, api, **kwargs):
+    return NumberVerifier(api, "inst1", cache_path=str(tmp_path / "verificados.log"), **kwargs)
+
+
+def test_verify_in_chunks_and_reuse_the_cache(tmp_path):
+    api = FakeAPI()
+    verifier = _verifier(tmp_path, api, chunk_size=50)
+    phones = _phones(120)
+    results = verifier.verify(phones)
+    verifier.close()
+
+    assert sorted(len(chunk) for chunk in api.calls) == [20, 50, 50]
+    assert results["5511911100001"] is True
+    assert results["5511911100010"] is False
+    assert verifier.verify(phones) == results
+    assert len(api.calls) == 3
+
+
+def test_cache_survives_a_new_process(tmp_path):
+    verifier = _verifier(tmp_path, FakeAPI())
+    verifier.verify(_phones(5))
+    verifier.close()
+
+    api = FakeAPI()
+    verifier = _verifier(tmp_path, api)
+    assert verifier.has_whatsapp("+55 (11) 91110-0003") is True
+    assert api.calls == []
+
+
+def test_expired_entries_are_verified_again(tmp_path):
+    old = time.time() - 2 * 3600
+    (tmp_path / "verificados.log").write_text(f"5511911100001|0|{old:.0f}\n")
+    api = FakeAPI()
+    verifier = _verifier(tmp_path, api, ttl_hours=1)
+    assert verifier.cached("11911100001") is None
+    assert verifier.has_whatsapp("11911100001") is True
+    assert api.calls == [["5511911100001"]]
+
+
+def test_api_failure_is_not_cached(tmp_path):
+    api = FakeAPI(fail=True)
+    verifier = _verifier(tmp_path, api)
+    assert verifier.has_whatsapp("11911100001") is None
+    assert not (tmp_path / "verificados.log").exists()
+
+    api.fail = False
+    assert verifier.has_whatsapp("11911100001") is True
+    assert len(api.calls) == 2
+
+
+def test_log_is_compacted_on_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(number_verifier, "COMPACT_MIN_LINES", 10)
+    now = time.time()
+    lines = [f"5511911100001|{n % 2}|{now:.0f}\n" for n in range(20)]
+    (tmp_path / "verificados.log").write_text("".join(lines) + "linha quebrada\n")
+
+    verifier = _verifier(tmp_path, FakeAPI())
+    assert verifier.cached("11911100001") is True
+    assert (tmp_path / "verificados.log").read_text().splitlines() == [f"5511911100001|1|{now:.0f}"]
+
+
+def test_prefetch_iter_keeps_order_and_verifies_ahead(tmp_path):
+    api = FakeAPI()
+    verifier = _verifier(tmp_path, api, chunk_size=4)
+    phones = _phones(10)
+    assert list(verifier.prefetch_iter(iter(phones))) == phones
+    verifier.close()
+    assert sum(len(chunk) for chunk in api.calls) == 10
+    assert all(verifier.cached(phone) is not None for phone in phones)
+
+
+def test_without_cache_path_nothing_is_written(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    verifier = NumberVerifier(FakeAPI(), "inst1", cache_path=None)
+    assert verifier.has_whatsapp("11911100001") is True
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,52 @@
+"""Normalização de telefones: uma chave só para API, caches e índices"""
+
+import pytest
+
+from evolution_client import EvolutionAPI
+from phone_numbers import normalize_many, normalize_phone, phone_key
+
+SAMPLES = [
+    ("11987654321", "5511987654321"),
+    ("(11) 98765-4321", "5511987654321"),
+    ("+55 11 98765-4321", "5511987654321"),
+    ("011 98765-4321", "5511987654321"),
+    ("5511987654321", "5511987654321"),
+    ("0055 11 98765-4321", "5511987654321"),
+    ("61 3333-4444", "556133334444"),
+    ("+1 212 555 1234", "12125551234"),
+    ("+351 912 345 678", "351912345678"),
+    (11987654321, "5511987654321"),
+]
+
+
+@pytest.mark.parametrize("raw, expected", SAMPLES)
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(str(raw)) == expected
+
+
+@pytest.mark.parametrize("raw", ["", "abc", "12345", "+1 212", "0000000000"])
+def test_invalid_phones_are_none(raw):
+    assert normalize_phone(raw) is None
+
+
+@pytest.mark.parametrize("raw", ["11 90001-0000", "11900010000", "(11) 91234-5678"])
+def test_sao_paulo_mobile_is_not_a_us_number(raw):
+    # 11 dígitos começando em 1: celular de SP (DDD 11 + 9), e não +1
+    assert phone_key(raw).startswith("5511")
+
+
+@pytest.mark.parametrize("raw", [raw for raw, _ in SAMPLES] + ["12345", "abc 61 99999", None])
+def test_api_format_matches_phone_key(raw):
+    # O número enviado à API é a mesma chave dos logs, journals e caches
+    assert EvolutionAPI._format_phone(raw) == phone_key(raw)
+
+
+def test_phone_key_keeps_digits_of_invalid_numbers():
+    assert phone_key("12-345") == "12345"
+    assert phone_key("abc") == ""
+
+
+def test_normalize_many_matches_unit_path():
+    phones = [raw for raw, _ in SAMPLES] + ["12345", None, "11987654321"]
+    assert normalize_many(phones) == [normalize_phone(str(p or "")) for p in phones]
+    assert normalize_many(phones, keys=True) == [phone_key(p or "") for p in phones]
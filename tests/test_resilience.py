@@ -0,0 +1,173 @@
+"""Circuit breaker, AIMD e políticas de retry"""
+
+import dataclasses
+import socket
+
+import pytest
+
+from evolution_client import EvolutionAPI
+from fake_evolution import FakeConfig, FakeEvolutionServer
+from resilience import (DEFAULT_POLICIES, DEFAULT_POLICY, AIMDRate, CircuitBreaker, RetryPolicy,
+                        backoff_delay, instance_of, parse_retry_after, resolve_policy)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+
+
+def test_opens_after_threshold_consecutive_failures(breaker):
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open() and not breaker.allow()
+
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_a_single_probe_through(breaker, clock):
+    for _ in range(3):
+        breaker.failure()
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # o teste ainda não terminou
+    assert breaker.is_open()
+
+
+def test_probe_success_closes(breaker, clock):
+    for _ in range(3):
+        breaker.failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_failure_reopens(breaker, clock):
+    for _ in range(3):
+        breaker.failure()
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 5
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_lost_probe_frees_the_next_one(breaker, clock):
+    for _ in range(3):
+        breaker.failure()
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_aimd_halves_on_transient_errors_and_recovers_additively():
+    rate = AIMDRate(base_interval=60, increase=0.25)
+    assert rate.record(False) == 120
+    assert rate.record(False) == 240
+    assert rate.record(True) == pytest.approx(60 / 0.5)
+    assert rate.record(True) == pytest.approx(60 / 0.75)
+    assert rate.record(True) == 60
+    assert rate.record(True) == 60  # nunca mais rápido que o configurado
+
+
+def test_aimd_is_bounded_and_ignores_permanent_errors():
+    rate = AIMDRate(base_interval=10, max_factor=4)
+    for _ in range(10):
+        rate.record(False)
+    assert rate.interval == 40
+    rate = AIMDRate(base_interval=10)
+    assert rate.record(False, transient=False) == 10
+
+
+def test_aimd_slows_down_a_little_on_high_latency():
+    rate = AIMDRate(base_interval=10, slow_latency=5)
+    assert 10 < rate.record(True, latency=6) < 20
+
+
+def test_resolve_policy_uses_the_longest_prefix():
+    assert resolve_policy(DEFAULT_POLICIES, "/chat/sendPresence/inst") is DEFAULT_POLICIES["/chat/sendPresence/"]
+    assert resolve_policy(DEFAULT_POLICIES, "/message/sendText/inst") is DEFAULT_POLICIES["/message/"]
+    assert resolve_policy(DEFAULT_POLICIES, "/instance/fetchInstances") is DEFAULT_POLICY
+
+
+def test_sends_are_never_idempotent():
+    assert not resolve_policy(DEFAULT_POLICIES, "/message/sendText/inst").is_idempotent("POST")
+    assert RetryPolicy().is_idempotent("GET") and not RetryPolicy().is_idempotent("POST")
+
+
+def test_instance_of():
+    assert instance_of("/message/sendText/inst1") == "inst1"
+    assert instance_of("/instance/connectionState/inst2?x=1") == "inst2"
+    assert instance_of("/instance/fetchInstances") is None
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    assert all(0 <= backoff_delay(attempt, policy) <= 4 for attempt in range(10))
+    assert backoff_delay(0, policy, retry_after=2) == 2
+    assert backoff_delay(0, policy, retry_after=60) == 4
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("amanhã") is None
+
+
+def _no_backoff(policies=DEFAULT_POLICIES):
+    return {prefix: dataclasses.replace(policy, base_delay=0, max_delay=0) for prefix, policy in policies.items()}
+
+
+def test_client_opens_the_circuit_without_touching_the_network():
+    with FakeEvolutionServer(FakeConfig(error_rate=1.0, seed=1)) as fake:
+        with EvolutionAPI(fake.url, policies=_no_backoff(), breaker_threshold=2, events_url=None) as api:
+            first = api.send_text("inst1", "11987654321", "oi")
+            api.send_text("inst1", "11987654321", "oi")
+            before = sum(fake.requests.values())
+            refused = api.send_text("inst1", "11987654321", "oi")
+            assert first["error"] and first["transient"]
+            assert refused.get("circuit_open")
+            assert sum(fake.requests.values()) == before
+            assert api.circuit_open("inst1") and not api.circuit_open("inst2")
+
+
+def test_refused_connection_is_retried_and_never_in_doubt():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with EvolutionAPI(f"http://127.0.0.1:{port}", policies=_no_backoff(), events_url=None) as api:
+        result = api.send_text("inst1", "11987654321", "oi")
+    assert result["error"] and result["transient"]
+    assert result["attempts"] == DEFAULT_POLICIES["/message/"].max_attempts
+    assert not result.get("in_doubt")
@@ -0,0 +1,103 @@
+"""Journal de envios: queda no meio do lote, retomada e consolidação"""
+
+import pytest
+
+from batch_file import write_batch
+from send_journal import (IN_DOUBT, SendJournal, apply_journal, journal_path, journal_status,
+                          read_journal)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "lote.jsonl.journal")
+
+
+def test_outcome_closes_the_intent(path):
+    with SendJournal(path) as journal:
+        journal.intent("11987654321", "inst1")
+        journal.outcome("11987654321", "sent", "inst1")
+    assert read_journal(path) == {"5511987654321": ("sent", "inst1")}
+
+
+def test_intent_without_outcome_is_in_doubt(path):
+    journal = SendJournal(path)
+    journal.intent("11987654321", "inst1")
+    journal._file.close()  # queda: o resultado nunca foi gravado
+
+    resumed = SendJournal(path, resume=True)
+    assert resumed.in_doubt() == ["5511987654321"]
+    assert resumed.is_done("(11) 98765-4321")
+    resumed.close()
+
+
+def test_torn_last_line_is_ignored(path):
+    with SendJournal(path) as journal:
+        journal.outcome("11987654321", "sent", "inst1")
+    with open(path, "a") as f:
+        f.write("1700000000.000|intent|55119")  # queda no meio da escrita
+
+    assert read_journal(path) == {"5511987654321": ("sent", "inst1")}
+
+
+def test_resume_after_torn_line_keeps_new_entries(path):
+    with SendJournal(path) as journal:
+        journal.outcome("11987654321", "sent", "inst1")
+    with open(path, "a") as f:
+        f.write("1700000000.000|intent|55119")
+
+    with SendJournal(path, resume=True) as journal:
+        journal.intent("11911112222", "inst2")
+
+    assert read_journal(path) == {"5511987654321": ("sent", "inst1"),
+                                  "5511911112222": (IN_DOUBT, "inst2")}
+    with open(path) as f:
+        assert all(line.count("|") == 4 for line in f)
+
+
+def test_new_journal_refuses_an_interrupted_one(path):
+    with SendJournal(path) as journal:
+        journal.intent("11987654321")
+    with pytest.raises(FileExistsError):
+        SendJournal(path)
+
+
+def test_empty_journal_can_be_restarted(path):
+    SendJournal(path).close()
+    SendJournal(path).close()
+
+
+def test_detail_cannot_break_the_line(path):
+    with SendJournal(path) as journal:
+        journal.outcome("11987654321", "failed", "inst1", "erro|com\nquebra")
+    with open(path) as f:
+        assert f.read().endswith("|failed|5511987654321|inst1|erro/com quebra\n")
+
+
+@pytest.mark.parametrize("status, result, expected", [
+    ("sent", {}, "sent"),
+    ("failed", {"message": "400"}, "failed"),
+    ("failed", {"in_doubt": True}, IN_DOUBT),
+    ("skipped", None, "skipped"),
+])
+def test_journal_status(status, result, expected):
+    assert journal_status(status, result) == expected
+
+
+def test_apply_journal_logs_sent_in_doubt_and_discards(tmp_path):
+    batch = str(tmp_path / "lote.jsonl")
+    rows = [("A", "11911110001"), ("B", "11911110002"), ("C", "11911110003"),
+            ("D", "11911110004"), ("E", "11911110005")]
+    write_batch(batch, rows)
+    with SendJournal(journal_path(batch)) as journal:
+        journal.outcome(rows[0][1], "sent", "inst1")
+        journal.intent(rows[1][1], "inst2")
+        journal.outcome(rows[2][1], "skipped", "inst1")
+        journal.outcome(rows[3][1], "deferred", "inst1")
+    sent_log, discard_log = tmp_path / "enviados.log", tmp_path / "descartados.log"
+
+    written = apply_journal(batch, str(sent_log), discard_log=str(discard_log))
+
+    assert written == 2
+    assert [line.split("|")[0] for line in sent_log.read_text().splitlines()] == ["11911110001", "11911110002"]
+    assert [line.split("|")[::2] for line in discard_log.read_text().splitlines()] == [["11911110003", "skipped"]]
+    assert not (tmp_path / "lote.jsonl.journal").exists()
@@ -0,0 +1,132 @@
+"""Ritmo de envio (token bucket) e classificação dos resultados do agendador"""
+
+import pytest
+
+from send_scheduler import SendScheduler, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAPI:
+    """Cliente que responde de uma tabela telefone -> resultado (padrão: enviado)"""
+
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.sent = []
+        self.presences = 0
+
+    def send_presence(self, instance_name, phone, presence, delay):
+        self.presences += 1
+
+    def send_text(self, instance_name, phone, message):
+        self.sent.append((instance_name, phone, message))
+        return self.results.get(phone, {"key": {"id": "1"}})
+
+
+def test_bucket_spaces_reservations_by_the_interval():
+    clock = Clock()
+    bucket = TokenBucket(10, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [100, 110, 120]
+
+
+def test_bucket_refills_while_idle_up_to_burst():
+    clock = Clock()
+    bucket = TokenBucket(10, burst=2, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 100
+    assert [bucket.reserve() for _ in range(3)] == [200, 200, 210]
+
+
+def test_bucket_refund_gives_the_slot_back():
+    clock = Clock()
+    bucket = TokenBucket(10, clock=clock)
+    bucket.reserve()
+    bucket.refund()
+    assert bucket.reserve() == 100
+
+
+def test_bucket_jitter_only_delays():
+    clock = Clock()
+    bucket = TokenBucket(10, jitter=0.5, clock=clock)
+    bucket.reserve()
+    assert 110 <= bucket.reserve() <= 115
+
+
+def _run(api, phones, verify=None, render=lambda phone: f"oi {phone}"):
+    scheduler = SendScheduler(api, interval_seconds=0, typing_delay=0, jitter=0)
+    intents = []
+    results = list(scheduler.run("inst1", phones, phone=lambda phone: phone, render=render, verify=verify,
+                                 before_send=lambda phone, instance: intents.append(phone)))
+    return {phone: (status, result) for phone, status, result in results}, intents, scheduler
+
+
+def test_statuses():
+    api = FakeAPI({
+        "400": {"error": True, "status": 400, "transient": False, "message": "número inválido"},
+        "503": {"error": True, "status": 503, "transient": True, "message": "indisponível"},
+        "lost": {"error": True, "status": None, "transient": True, "in_doubt": True, "message": "timeout"},
+    })
+    exists = {"ok": True, "400": True, "503": True, "lost": True, "none": False, "down": None}
+    results, intents, _ = _run(api, list(exists), verify=exists.get)
+
+    assert {phone: status for phone, (status, _) in results.items()} == {
+        "ok": "sent", "400": "failed", "503": "deferred", "lost": "failed", "none": "skipped", "down": "deferred",
+    }
+    assert results["lost"][1]["in_doubt"]
+    assert intents == ["ok", "400", "503", "lost"]
+    assert [phone for _, phone, _ in api.sent] == intents
+
+
+def test_local_errors_are_deferred_and_nothing_is_sent():
+    def render(phone):
+        raise FileNotFoundError("01_apresentacao.txt")
+
+    def verify(phone):
+        raise RuntimeError("verificador fora do ar")
+
+    api = FakeAPI()
+    results, intents, _ = _run(api, ["a"], render=render)
+    assert results["a"][0] == "deferred" and results["a"][1]["local"]
+    results, _, _ = _run(api, ["b"], verify=verify)
+    assert results["b"][0] == "deferred" and results["b"][1]["local"]
+    assert api.sent == [] and intents == []
+
+
+def test_contacts_are_read_lazily():
+    read = []
+
+    def contacts():
+        for n in range(1000):
+            read.append(n)
+            yield str(n)
+
+    scheduler = SendScheduler(FakeAPI(), interval_seconds=0, typing_delay=0, jitter=0, lookahead=3)
+    results = scheduler.run("inst1", contacts(), phone=str, render=str)
+    next(results)
+    results.close()
+    assert len(read) <= 5
+
+
+@pytest.mark.parametrize("result, refunded", [
+    ({"error": True, "transient": False, "message": "400"}, True),
+    ({"error": True, "transient": True, "message": "503"}, False),
+])
+def test_permanent_error_refunds_the_slot(result, refunded):
+    scheduler = SendScheduler(FakeAPI({"x": result}), interval_seconds=60, typing_delay=0, jitter=0,
+                              adaptive=False)
+    scheduler.send("inst1", "x", "oi")
+    assert (scheduler.bucket("inst1")._tokens == 1) is refunded
+
+
+def test_adaptive_interval_opens_on_transient_errors():
+    scheduler = SendScheduler(FakeAPI({"x": {"error": True, "transient": True}}), interval_seconds=0.001,
+                              typing_delay=0, jitter=0)
+    scheduler.send("inst1", "x", "oi")
+    assert scheduler.bucket("inst1").interval == pytest.approx(0.002)
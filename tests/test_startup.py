@@ -0,0 +1,49 @@
+"""Orçamento de partida dos comandos do marketing_cli.py"""
+
+import sys
+
+import pytest
+
+import marketing_cli
+
+
+@pytest.fixture(scope="module")
+def startup():
+    return {entry["command"]: entry for entry in marketing_cli.check_startup(runs=3)}
+
+
+def test_every_command_is_measured(startup):
+    assert set(startup) == set(marketing_cli.COMMANDS)
+
+
+@pytest.mark.parametrize("name", sorted(marketing_cli.COMMANDS))
+def test_command_runs_without_error(startup, name):
+    assert not startup[name]["error"]
+
+
+@pytest.mark.parametrize("name", sorted(marketing_cli.COMMANDS))
+def test_command_does_not_import_heavy_modules(startup, name):
+    assert startup[name]["heavy"] == ""
+
+
+@pytest.mark.parametrize("name", sorted(marketing_cli.COMMANDS))
+def test_command_starts_within_budget(startup, name):
+    entry = startup[name]
+    assert entry["ms"] <= entry["budget_ms"], f"{name}: {entry['ms']} ms (orçamento {entry['budget_ms']} ms)"
+
+
+def test_heavy_imports_reads_importtime_output():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   sqlite3",
+        "import time:        80 |         80 |     requests.compat",
+        "import time:       900 |       1500 | requests",
+    ])
+    assert marketing_cli._heavy_imports(output) == ["requests"]
+
+
+def test_main_does_not_grow_sys_path(capsys):
+    before = list(sys.path)
+    for _ in range(3):
+        marketing_cli.main(["blocklist", "list"])
+    assert sys.path == before
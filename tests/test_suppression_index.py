@@ -0,0 +1,109 @@
+"""Blocklist compilada: consulta, acréscimos, remoção e recompilação entre processos"""
+
+import multiprocessing
+
+import pytest
+
+from suppression_index import SuppressionIndex, compile_index, encode_key
+
+
+@pytest.fixture
+def campanhas(tmp_path):
+    return str(tmp_path)
+
+
+def _add_many(campanhas, phones):
+    with SuppressionIndex(campanhas, compact_after=4) as index:
+        for phone in phones:
+            index.add(phone, "teste")
+
+
+def _run(target, *args):
+    process = multiprocessing.get_context("fork").Process(target=target, args=args)
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+
+def test_lookup_in_any_format(campanhas):
+    with SuppressionIndex(campanhas) as index:
+        assert index.add("(11) 98765-4321", "opt-out")
+        assert index.is_blocked("+55 11 98765-4321")
+        assert index.is_blocked("11987654321")
+        assert not index.is_blocked("11987654322")
+
+
+def test_add_twice_is_a_no_op(campanhas):
+    with SuppressionIndex(campanhas) as index:
+        assert index.add("11987654321", "opt-out")
+        assert not index.add("5511987654321", "de novo")
+    with open(f"{campanhas}/blocklist.log") as f:
+        assert len(f.readlines()) == 1
+
+
+def test_reason_cannot_break_the_line(campanhas):
+    with SuppressionIndex(campanhas) as index:
+        index.add("11987654321", "motivo|com\nquebra")
+    with open(f"{campanhas}/blocklist.log") as f:
+        assert f.read().split("|")[1] == "motivo/com quebra"
+
+
+def test_other_process_additions_are_seen(campanhas):
+    with SuppressionIndex(campanhas) as index:
+        assert not index.is_blocked("11911110001")
+        _run(_add_many, campanhas, ["11911110001"])
+        assert index.is_blocked("11911110001")
+
+
+def test_concurrent_writers_lose_nothing(campanhas):
+    # Mais acréscimos que compact_after: os processos recompilam no meio
+    phones = [[f"119{worker}{n:07d}" for n in range(25)] for worker in range(1, 5)]
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_add_many, args=(campanhas, chunk)) for chunk in phones]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    with SuppressionIndex(campanhas) as index:
+        assert len(index) == 100
+        assert all(index.is_blocked(phone) for chunk in phones for phone in chunk)
+    with open(f"{campanhas}/blocklist.log") as f:
+        assert len(f.readlines()) == 100
+
+
+def test_remove_in_other_process_is_seen(campanhas):
+    with SuppressionIndex(campanhas) as index:
+        index.add("11911110001", "a")
+        index.add("11911110002", "b")
+
+        def remove():
+            with SuppressionIndex(campanhas) as other:
+                assert other.remove("11911110001")
+
+        _run(remove)
+        assert not index.is_blocked("11911110001")
+        assert index.is_blocked("11911110002")
+        assert not index.remove("11911110001")
+
+
+def test_tail_is_compiled_past_compact_after(campanhas):
+    with SuppressionIndex(campanhas, compact_after=2) as index:
+        for n in range(5):
+            index.add(f"1191111000{n}", "teste")
+        assert len(index._tail) <= 2
+        assert len(index) == 5
+        assert all(f"551191111000{n}" in index for n in range(5))
+
+
+def test_compiled_index_skips_torn_last_line(tmp_path):
+    log = tmp_path / "blocklist.log"
+    log.write_text("5511911110001|a|2024-01-01\n5511911110002|b|2024")
+    assert compile_index(str(log), str(tmp_path / "blocklist.idx")) == 1
+
+
+def test_encode_key_keeps_leading_zeros_and_hashes_long_keys():
+    assert encode_key("0123") != encode_key("123")
+    assert encode_key("1" * 30) >> 63 == 1
+    assert encode_key("") != 0
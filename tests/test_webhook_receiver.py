@@ -0,0 +1,125 @@
+"""Receptor de webhooks: autenticação, limites do HTTP, eventos e opt-out"""
+
+import json
+import socket
+import threading
+
+import pytest
+import requests
+
+from suppression_index import SuppressionIndex
+from webhook_receiver import MAX_BODY_BYTES, WebhookReceiver, is_opt_out, wait_for_state
+
+TOKEN = "segredo"
+
+
+@pytest.fixture
+def receiver(tmp_path, monkeypatch):
+    monkeypatch.delenv("WEBHOOK_TOKEN", raising=False)
+    receiver = WebhookReceiver(str(tmp_path), host="127.0.0.1", port=0, token=TOKEN)
+    receiver.start_in_thread()
+    receiver.url = "http://127.0.0.1:%d" % receiver._server.sockets[0].getsockname()[1]
+    yield receiver
+    receiver.stop()
+
+
+def _post(receiver, payload, path="/webhook", token=TOKEN):
+    data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return requests.post(f"{receiver.url}{path}", params={"token": token} if token else None, data=data, timeout=5)
+
+
+def _reply(phone, text, from_me=False):
+    return {"event": "messages.upsert", "instance": "inst1",
+            "data": {"key": {"remoteJid": f"{phone}@s.whatsapp.net", "fromMe": from_me},
+                     "message": {"conversation": text}}}
+
+
+def test_token_is_required_off_loopback(tmp_path, monkeypatch):
+    monkeypatch.delenv("WEBHOOK_TOKEN", raising=False)
+    with pytest.raises(ValueError):
+        WebhookReceiver(str(tmp_path), host="0.0.0.0", port=0)
+
+
+@pytest.mark.parametrize("method, path", [("post", "/webhook"), ("get", "/state/inst1"),
+                                          ("get", "/health"), ("get", "/qualquer")])
+@pytest.mark.parametrize("token", [None, "errado"])
+def test_every_route_requires_the_token(receiver, method, path, token):
+    response = requests.request(method, f"{receiver.url}{path}", params={"token": token} if token else None,
+                                data=b"{}", timeout=5)
+    assert response.status_code == 401
+
+
+def test_oversized_body_is_rejected_unread(receiver):
+    port = receiver._server.sockets[0].getsockname()[1]
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(f"POST /webhook?token={TOKEN} HTTP/1.1\r\nHost: x\r\n"
+                     f"Content-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode())
+        assert sock.recv(1024).startswith(b"HTTP/1.1 413 ")
+
+
+@pytest.mark.parametrize("body", [b"{nao e json", b"[1, 2]", b'"texto"'])
+def test_malformed_events_are_400(receiver, body):
+    assert _post(receiver, body).status_code == 400
+
+
+@pytest.mark.parametrize("timeout", ["abc", "nan-x"])
+def test_bad_state_timeout_is_400(receiver, timeout):
+    response = requests.get(f"{receiver.url}/state/inst1",
+                            params={"token": TOKEN, "until": "open", "timeout": timeout}, timeout=5)
+    assert response.status_code == 400
+
+
+def test_unknown_route_is_404(receiver):
+    assert requests.get(f"{receiver.url}/nada", params={"token": TOKEN}, timeout=5).status_code == 404
+
+
+def test_connection_event_wakes_the_waiter(receiver):
+    def connect():
+        _post(receiver, {"event": "CONNECTION_UPDATE", "data": {"instance": "inst1", "state": "open"}})
+
+    timer = threading.Timer(0.2, connect)
+    timer.start()
+    try:
+        assert wait_for_state(receiver.url, "inst1", "open", timeout=10, token=TOKEN) == "open"
+    finally:
+        timer.join()
+
+
+def test_state_wait_times_out_with_current_state(receiver):
+    assert wait_for_state(receiver.url, "inst2", "open", timeout=0.1, token=TOKEN) == "unknown"
+    assert wait_for_state("http://127.0.0.1:9", "inst2", timeout=0.1, token=TOKEN) is None
+
+
+def test_reply_is_logged_and_opt_out_blocks(receiver, tmp_path):
+    assert _post(receiver, _reply("5561999990001", "Quanto custa o site?")).status_code == 200
+    assert _post(receiver, _reply("5561999990002", "Pare, por favor!")).status_code == 200
+    assert _post(receiver, _reply("5561999990003", "sair", from_me=True)).status_code == 200
+
+    replies = (tmp_path / "respostas.log").read_text().splitlines()
+    assert [line.split("|")[0] for line in replies] == ["5561999990001", "5561999990002"]
+    with SuppressionIndex(str(tmp_path)) as blocklist:
+        assert blocklist.is_blocked("5561999990002")
+        assert not blocklist.is_blocked("5561999990001")
+        assert not blocklist.is_blocked("5561999990003")
+
+
+def test_delivery_acks_are_logged(receiver, tmp_path):
+    _post(receiver, {"event": "messages.update",
+                     "data": [{"keyId": "ABC", "remoteJid": "5561999990001@s.whatsapp.net", "status": 4}]})
+    assert (tmp_path / "acks.log").read_text().split("|")[:3] == ["ABC", "5561999990001", "READ"]
+
+
+@pytest.mark.parametrize("text", [
+    "sair", "SAIR", "Pare.", "stop 🙏", "por favor, parar", "Não quero mais receber",
+    "nao me mande mensagens", "me tire da lista", "Sem interesse, obrigado",
+])
+def test_opt_out(text):
+    assert is_opt_out(text)
+
+
+@pytest.mark.parametrize("text", [
+    "", "Quero cancelar meu site atual e fazer outro", "Para quando fica pronto?",
+    "Pode parar de ligar e mandar por aqui", "Quero saber o preço", "Ok, obrigado",
+])
+def test_not_opt_out(text):
+    assert not is_opt_out(text)
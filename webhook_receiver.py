@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Webhook Receiver
+Recebe os eventos da Evolution API (conexão, confirmações de entrega e
+respostas) num servidor asyncio, atualizando o estado das campanhas
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from phone_numbers import phone_key
+from suppression_index import SuppressionIndex
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CAMPANHAS_DIR = os.path.join(BASE_DIR, "campanhas")
+DEFAULT_PORT = int(os.environ.get("WEBHOOK_PORT", 8090))
+# O container da Evolution precisa alcançar o receptor (host.docker.internal),
+# por isso ele escuta em todas as interfaces e exige o WEBHOOK_TOKEN
+DEFAULT_HOST = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+# Maior corpo aceito (os eventos da Evolution têm poucos KB; mídia não vem em base64)
+MAX_BODY_BYTES = 1024 * 1024
+# Espera máxima de um GET /state/<instância>?until=... (o cliente repete se precisar)
+MAX_WAIT_SECONDS = 60
+
+# Respostas que, sozinhas (ignorando "por favor", pontuação e emojis), significam
+# "não me mande mais mensagens"
+OPT_OUT_COMMANDS = (
+    "sair", "parar", "pare", "para", "stop", "remover", "remova", "descadastrar", "cancelar",
+    "bloquear", "unsubscribe", "chega",
+)
+# Frases explícitas de saída, valem em qualquer parte da resposta
+OPT_OUT_PHRASES = (
+    "nao quero", "nao me mande", "nao mande mais", "nao envie", "pare de mandar", "pare de enviar",
+    "parem de mandar", "parem de enviar", "sem interesse", "nao tenho interesse", "descadastrar",
+    "descadastre", "me remova", "me tire da lista", "unsubscribe",
+)
+_OPT_OUT = re.compile(r'\b(' + '|'.join(re.escape(phrase) for phrase in OPT_OUT_PHRASES) + r')\b')
+# Palavras de cortesia ignoradas ao comparar a resposta com os comandos
+_POLITE = {"por", "favor", "pf", "pfv", "pfvr", "obrigado", "obrigada", "ok"}
+
+# Status de entrega da Evolution (numéricos nas versões antigas)
+ACK_STATUSES = {0: "ERROR", 1: "PENDING", 2: "SERVER_ACK", 3: "DELIVERY_ACK", 4: "READ", 5: "PLAYED"}
+
+WEBHOOK_EVENTS = metrics.REGISTRY.counter(
+    "webhook_events_total", "Eventos recebidos da Evolution API", ("event",))
+MESSAGE_ACKS = metrics.REGISTRY.counter(
+    "message_acks_total", "Confirmações de entrega por status", ("status",))
+REPLIES = metrics.REGISTRY.counter(
+    "webhook_replies_total", "Respostas recebidas (opt_out = pediram para sair)", ("kind",))
+
+
+def _clean(text: str) -> str:
+    """Texto sem acentos, minúsculo (para comparar com as palavras-chave)"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return text.lower()
+
+
+def is_opt_out(text: str) -> bool:
+    """
+    A resposta pede para não receber mais mensagens? Só quando ela inteira é
+    um comando ("sair", "pare", "stop") ou traz uma frase explícita ("não
+    quero", "não me mande"): "quero cancelar meu site atual" é uma resposta.
+    """
+    if not text:
+        return False
+    cleaned = _clean(text)
+    words = [word for word in re.findall(r'[a-z0-9]+', cleaned) if word not in _POLITE]
+    if len(words) == 1 and words[0] in OPT_OUT_COMMANDS:
+        return True
+    return _OPT_OUT.search(' '.join(re.findall(r'[a-z0-9]+', cleaned))) is not None
+
+
+def _field(text) -> str:
+    """Valor seguro para os logs separados por '|'"""
+    return str(text or '').replace('|', '/').replace('\n', ' ').strip()[:200]
+
+
+def _message_text(message: dict) -> str:
+    """Texto de uma mensagem recebida (conversa, texto estendido ou legenda)"""
+    if not isinstance(message, dict):
+        return ""
+    for key in ("conversation",):
+        if message.get(key):
+            return str(message[key])
+    for key in ("extendedTextMessage", "imageMessage", "videoMessage", "buttonsResponseMessage",
+                "listResponseMessage"):
+        inner = message.get(key)
+        if isinstance(inner, dict):
+            for field in ("text", "caption", "selectedDisplayText", "title"):
+                if inner.get(field):
+                    return str(inner[field])
+    return ""
+
+
+class WebhookReceiver:
+    """
+    Servidor HTTP mínimo (asyncio) para os webhooks da Evolution API.
+
+    - connection.update: guarda o estado de cada instância e acorda quem
+      espera por ele (GET /state/<instância>?until=open&timeout=180)
+    - messages.upsert: respostas recebidas vão para respostas.log (e param
+      os follow-ups); pedidos de saída entram na blocklist.log
+    - messages.update: confirmações de entrega/leitura vão para acks.log
+
+    Os arquivos seguem o formato dos demais logs das campanhas e são
+    importados pelo CampaignStore.
+    """
+
+    def __init__(self, campanhas_dir: str = DEFAULT_CAMPANHAS_DIR, host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT, token: Optional[str] = None):
+        """
+        Args:
+            campanhas_dir: Pasta campanhas/ (respostas.log, acks.log, blocklist.log)
+            host: Interface de escuta
+            port: Porta
+            token: Exige ?token=... na URL do webhook (padrão: WEBHOOK_TOKEN)
+
+        Raises:
+            ValueError: Sem token, escutando fora do loopback
+        """
+        self.campanhas_dir = campanhas_dir
+        self.host = host
+        self.port = port
+        self.token = token if token is not None else os.environ.get("WEBHOOK_TOKEN") or None
+        if not self.token and host not in LOOPBACK_HOSTS:
+            raise ValueError(f"WEBHOOK_TOKEN obrigatório para escutar em {host} "
+                             "(o mesmo token do docker-compose.yml), ou use WEBHOOK_HOST=127.0.0.1")
+        self.replies_path = os.path.join(campanhas_dir, "respostas.log")
+        self.acks_path = os.path.join(campanhas_dir, "acks.log")
+        self.states: dict[str, str] = {}
+        self._changed: Optional[asyncio.Condition] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.blocklist = SuppressionIndex(campanhas_dir)
+
+    @staticmethod
+    def _append(path: str, line: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+
+    # ==================== Eventos ====================
+
+    async def handle_event(self, payload: dict, event: Optional[str] = None):
+        """Processa um evento (corpo do webhook); o que não for objeto JSON é ignorado"""
+        if not isinstance(payload, dict):
+            return
+        event = str(payload.get("event") or event or "").lower().replace('_', '.').replace('-', '.')
+        instance = payload.get("instance") or ""
+        if isinstance(instance, dict):
+            instance = instance.get("instanceName", "")
+        instance = str(instance)
+        data = payload.get("data") or {}
+        items = [item for item in (data if isinstance(data, list) else [data]) if isinstance(item, dict)]
+        WEBHOOK_EVENTS.inc(event=event or "unknown")
+
+        if event == "connection.update":
+            if isinstance(data, dict):
+                await self._on_connection(str(data.get("instance") or instance), data.get("state"))
+        elif event == "messages.upsert":
+            for message in items:
+                self._on_message(instance, message)
+        elif event == "messages.update":
+            for update in items:
+                self._on_ack(update)
+
+    async def _on_connection(self, instance: str, state: Optional[str]):
+        if not instance or not state:
+            return
+        self.states[instance] = str(state)
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _on_message(self, instance: str, message: dict):
+        key = message.get("key")
+        key = key if isinstance(key, dict) else {}
+        jid = str(key.get("remoteJid") or "")
+        if key.get("fromMe") or not jid.endswith("@s.whatsapp.net"):
+            return  # mensagens nossas, grupos e status não contam como resposta
+        numero = phone_key(jid.split('@', 1)[0])
+        text = _message_text(message.get("message"))
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        self._append(self.replies_path, f"{numero}|{timestamp}|{instance}|{_field(text)}")
+
+        if is_opt_out(text):
+            REPLIES.inc(kind="opt_out")
+            if self.blocklist.add(numero, f"opt-out: {_field(text)[:80]}", timestamp):
+                print(f"🚫 Opt-out de {numero}: \"{_field(text)[:40]}\" (adicionado à blocklist)")
+        else:
+            REPLIES.inc(kind="reply")
+            print(f"💬 Resposta de {numero}: \"{_field(text)[:40]}\"")
+
+    def _on_ack(self, update: dict):
+        key = update.get("key")
+        key = key if isinstance(key, dict) else {}
+        status = update.get("status")
+        status = ACK_STATUSES.get(status, str(status)) if isinstance(status, (int, str)) else "UNKNOWN"
+        message_id = update.get("keyId") or update.get("id") or key.get("id") or ""
+        jid = str(update.get("remoteJid") or key.get("remoteJid") or "")
+        MESSAGE_ACKS.inc(status=status)
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        self._append(self.acks_path, f"{_field(message_id)}|{phone_key(jid.split('@', 1)[0])}|{status}|{timestamp}")
+
+    async def wait_state(self, instance: str, until: str = "open", timeout: float = 180) -> Optional[str]:
+        """Espera a instância chegar ao estado `until` (ou o timeout); devolve o estado atual"""
+        try:
+            async with self._changed:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self.states.get(instance) == until), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.states.get(instance)
+
+    # ==================== HTTP ====================
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: object):
+        body = json.dumps(payload).encode()
+        reason = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+                  413: "Payload Too Large"}.get(status, "OK")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length < 0 or length > MAX_BODY_BYTES:
+                    # O corpo não é lido: responde e encerra a conexão
+                    await self._respond(writer, 413, {"error": f"corpo maior que {MAX_BODY_BYTES} bytes"})
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                url = urlsplit(target)
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                status, payload = await self._route(method, url.path, query, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, query: dict, body: bytes) -> tuple[int, object]:
+        # Todas as rotas exigem o token: o receptor escuta fora do loopback
+        if self.token and query.get("token") != self.token:
+            return 401, {"error": "token inválido"}
+        if method == "POST" and path.startswith("/webhook"):
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {"error": "JSON inválido"}
+            if not isinstance(payload, dict):
+                return 400, {"error": "o evento deve ser um objeto JSON"}
+            # Com WEBHOOK_BY_EVENTS a Evolution posta em /webhook/<evento>
+            event = path[len("/webhook"):].strip('/') or None
+            await self.handle_event(payload, event)
+            return 200, {"ok": True}
+        if method == "GET" and path.startswith("/state/"):
+            instance = path[len("/state/"):]
+            if "until" in query:
+                try:
+                    timeout = min(max(0.0, float(query.get("timeout", MAX_WAIT_SECONDS))), MAX_WAIT_SECONDS)
+                except ValueError:
+                    return 400, {"error": "timeout inválido"}
+                state = await self.wait_state(instance, query["until"], timeout)
+            else:
+                state = self.states.get(instance)
+            return 200, {"instance": instance, "state": state}
+        if method == "GET" and path == "/health":
+            return 200, {"ok": True, "states": self.states}
+        return 404, {"error": "rota desconhecida"}
+
+    async def start(self):
+        """Abre o servidor no event loop atual"""
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Condition()
+        self._server = await asyncio.start_server(self._client, self.host, self.port)
+        print(f"🪝 Webhook em http://{self.host}:{self.port}/webhook")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self) -> threading.Thread:
+        """Roda o receptor num event loop próprio, numa thread (usado pelo daemon)"""
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start())
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name="webhook", daemon=True)
+        thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return thread
+
+    def stop(self):
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def wait_for_state(receiver_url: str, instance: str, until: str = "open", timeout: float = MAX_WAIT_SECONDS,
+                   session=None, token: Optional[str] = None) -> Optional[str]:
+    """
+    Espera (uma única requisição, de até MAX_WAIT_SECONDS) o receptor ver a
+    instância no estado `until`. O token é o WEBHOOK_TOKEN, se não for passado.
+
+    Returns:
+        Estado atual ("unknown" se nenhum evento chegou), ou None se o
+        receptor não estiver no ar
+    """
+    import requests
+
+    http = session or requests
+    timeout = min(timeout, MAX_WAIT_SECONDS)
+    params = {"until": until, "timeout": timeout}
+    token = token if token is not None else os.environ.get("WEBHOOK_TOKEN")
+    if token:
+        params["token"] = token
+    try:
+        response = http.get(f"{receiver_url.rstrip('/')}/state/{instance}", params=params, timeout=timeout + 5)
+        return (response.json().get("state") or "unknown") if response.ok else None
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python3 webhook_receiver.py   (WEBHOOK_PORT, WEBHOOK_HOST, WEBHOOK_TOKEN)
+    try:
+        receiver = WebhookReceiver()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    try:
+        asyncio.run(receiver.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -7,22 +7,22 @@ Envia mensagens WhatsApp para contatos de um arquivo XLSX (gerado pelo Google Sc
 import os
 import sys
 import time
-import re
-from typing import Optional
-from dataclasses import dataclass
+from datetime import date
+from itertools import chain
+from typing import Iterable, Iterator, Optional
 
-from openpyxl import load_workbook
+import metrics
+import profiler
+from campaign_store import CampaignStore
+from contacts import Contact, iter_contacts
 from evolution_client import EvolutionAPI
-
-
-@dataclass
-class Contact:
-    """Representa um contato para envio"""
-    nome: str
-    telefone: str
-    endereco: Optional[str] = None
-    avaliacao: Optional[str] = None
-    website: Optional[str] = None
+from instance_pool import InstancePool, instances_from_env, quotas_from_env
+from message_templates import compile_template
+from number_verifier import NumberVerifier
+from phone_numbers import normalize_phone
+from send_journal import SendJournal, journal_path, journal_status
+from send_scheduler import SendScheduler
+from suppression_index import SuppressionIndex
 
 
 class WhatsAppSender:
@@ -30,13 +30,31 @@ class WhatsAppSender:
     
     def __init__(self, instance_name: str = "business_sender",
                  api_url: str = "http://localhost:8080",
-                 api_key: str = "whatsapp_sender_secret_key_2024"):
+                 api_key: str = "whatsapp_sender_secret_key_2024",
+                 instances: Optional[list[str]] = None,
+                 blocklist: Optional[SuppressionIndex] = None):
+        """
+        Args:
+            instance_name: Instância principal (configuração e verificação de números)
+            api_url: URL da Evolution API
+            api_key: Chave de autenticação
+            instances: Instâncias que dividem os envios (padrão: só a principal)
+            blocklist: Blocklist global consultada antes de cada envio (padrão: nenhuma)
+        """
         self.instance_name = instance_name
+        self.instances = instances or [instance_name]
+        self.blocklist = blocklist
         self.api = EvolutionAPI(api_url, api_key)
+        self.verifier = NumberVerifier(self.api, instance_name)
         self.sent_count = 0
         self.failed_count = 0
         self.skipped_count = 0
     
+    def close(self):
+        """Encerra as threads do verificador e as conexões com a API"""
+        self.verifier.close()
+        self.api.close()
+    
     def setup(self) -> bool:
         """Configura a instância e verifica conexão"""
         print("🔧 Configurando WhatsApp Sender...")
@@ -148,37 +166,17 @@ class WhatsAppSender:
             print("   ❌ Timeout - QR Code não foi escaneado")
             return False
     
-    def load_contacts_from_xlsx(self, filepath: str) -> list[Contact]:
-        """Carrega contatos de um arquivo XLSX"""
+    def iter_contacts_from_xlsx(self, filepath: str) -> Iterator[Contact]:
+        """Lê os contatos de um arquivo XLSX sob demanda (streaming, memória constante)"""
         if not os.path.exists(filepath):
             print(f"❌ Arquivo não encontrado: {filepath}")
-            return []
-        
-        wb = load_workbook(filepath)
-        ws = wb.active
-        
-        contacts = []
-        for row in ws.iter_rows(min_row=2, values_only=True):  # Pula cabeçalho
-            nome = row[0] if len(row) > 0 else None
-            telefone = row[1] if len(row) > 1 else None
-            endereco = row[2] if len(row) > 2 else None
-            avaliacao = row[3] if len(row) > 3 else None
-            website = row[4] if len(row) > 4 else None
-            
-            # Só adiciona se tiver nome e telefone válido
-            if nome and telefone and telefone != "N/A":
-                # Formata telefone para padrão internacional
-                formatted_phone = self.format_phone_international(str(telefone))
-                if formatted_phone:
-                    contacts.append(Contact(
-                        nome=nome,
-                        telefone=formatted_phone,
-                        endereco=endereco,
-                        avaliacao=str(avaliacao) if avaliacao else None,
-                        website=website
-                    ))
-        
-        return contacts
+            return iter(())
+        normalize = profiler.wrap(self.format_phone_international, "format_phone_international", "parse")
+        return profiler.traced(iter_contacts(filepath, normalize=normalize), "read_contacts")
+    
+    def load_contacts_from_xlsx(self, filepath: str) -> list[Contact]:
+        """Carrega contatos de um arquivo XLSX"""
+        return list(self.iter_contacts_from_xlsx(filepath))
     
     def format_phone_international(self, phone: str) -> Optional[str]:
         """
@@ -193,115 +191,148 @@ class WhatsAppSender:
         - México: +52
         - E outros com código de país já incluso
         
+        Usa a mesma normalização da API e dos caches (phone_numbers).
+        
         Returns:
             Telefone formatado (ex: "5511999999999") ou None se inválido
         """
         if not phone:
             return None
-        
-        # Remove tudo que não for número
-        digits = re.sub(r'\D', '', phone)
-        
-        if not digits or len(digits) < 8:
-            return None
-        
-        # Detecta padrão pelo tamanho e prefixo
-        
-        # Já tem código de país internacional (começa com um código válido)
-        # Lista de códigos de país comuns
-        country_codes = {
-            '1': 11,    # EUA/Canadá (1 + 10 dígitos)
-            '44': 12,   # UK
-            '49': 12,   # Alemanha
-            '33': 11,   # França
-            '34': 11,   # Espanha
-            '351': 12,  # Portugal
-            '39': 12,   # Itália
-            '52': 12,   # México
-            '54': 12,   # Argentina
-            '55': 12,   # Brasil (55 + 11 dígitos = 13 total)
-            '56': 11,   # Chile
-            '57': 12,   # Colômbia
-            '58': 12,   # Venezuela
-            '61': 11,   # Austrália
-            '81': 12,   # Japão
-            '86': 13,   # China
-            '91': 12,   # Índia
-            '971': 12,  # Emirados
-        }
-        
-        # Verifica se já tem código de país
-        for code, expected_len in country_codes.items():
-            if digits.startswith(code) and len(digits) >= expected_len:
-                return digits
-        
-        # Assume Brasil se não tiver código de país
-        # Números brasileiros: 10-11 dígitos (DDD + número)
-        if len(digits) >= 10 and len(digits) <= 11:
-            # Adiciona código do Brasil
-            return f"55{digits}"
-        
-        # Se for muito longo, assume que já está completo
-        if len(digits) >= 12:
-            return digits
-        
-        # Telefone muito curto, inválido
-        return None
+        return normalize_phone(str(phone))
     
     def format_message(self, template: str, contact: Contact) -> str:
         """Formata a mensagem com os dados do contato"""
-        message = template
-        message = message.replace("{nome}", contact.nome)
-        message = message.replace("{telefone}", contact.telefone)
-        message = message.replace("{endereco}", contact.endereco or "")
-        message = message.replace("{avaliacao}", contact.avaliacao or "")
-        message = message.replace("{website}", contact.website or "")
-        return message
+        return compile_template(template).render_contact(contact)
     
-    def send_messages(self, contacts: list[Contact], message_template: str,
-                      delay_seconds: float = 5.0, verify_whatsapp: bool = True) -> dict:
+    def send_messages(self, contacts: Iterable[Contact], message_template: str,
+                      delay_seconds: float = 5.0, verify_whatsapp: bool = True,
+                      typing_delay: float = 5.0, jitter: float = 0.2,
+                      journal: Optional[SendJournal] = None, media: Optional[str] = None) -> dict:
         """
         Envia mensagens para todos os contatos
         
         Args:
-            contacts: Lista de contatos
+            contacts: Contatos (lista ou gerador, consumido sob demanda)
             message_template: Template da mensagem (use {nome}, {endereco}, etc)
-            delay_seconds: Atraso entre mensagens (evita bloqueio)
+            delay_seconds: Intervalo médio entre mensagens (evita bloqueio)
             verify_whatsapp: Se True, verifica se o número tem WhatsApp antes
+            typing_delay: Tempo mostrando 'digitando...' antes de cada envio
+            jitter: Variação aleatória do intervalo (fração do delay)
+            journal: Journal do lote; contatos já resolvidos nele são pulados
+                     sem verificar nem esperar de novo (retomada). Quem abriu fecha
+            media: Arquivo local (imagem, PDF...) enviado com a mensagem como legenda
         
         Returns:
-            Resumo do envio
+            Resumo do envio, ou None se a WHATSAPP_QUOTA for inválida
         """
-        total = len(contacts)
-        print(f"\n📤 Iniciando envio para {total} contatos...")
+        quotas = used = None
+        if len(self.instances) > 1:
+            # Cota diária por instância, descontando o que cada uma já enviou hoje
+            try:
+                quotas = quotas_from_env(self.instances)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return None
+            with CampaignStore() as store:
+                store.sync()
+                used = store.sends_by_instance(date.today().isoformat())
+        total = len(contacts) if hasattr(contacts, "__len__") else None
+        resumed = 0
+        if journal and journal.state:
+            in_doubt = journal.in_doubt()
+            if in_doubt:
+                print(f"⚠️  {len(in_doubt)} envio(s) interrompido(s) sem confirmação; não serão repetidos")
+            
+            def pending(items):
+                nonlocal resumed
+                for contact in items:
+                    if journal.is_done(contact.telefone):
+                        resumed += 1
+                    else:
+                        yield contact
+            
+            contacts = pending(contacts)
+            total = None
+        if self.blocklist is not None:
+            # Relê só o que entrou no blocklist.log desde a última consulta: um
+            # opt-out que chega pelo webhook no meio do lote já vale
+            blocklist = self.blocklist
+            
+            def allowed(items):
+                for contact in items:
+                    if blocklist.is_blocked(contact.telefone):
+                        print(f"   🚫 Na blocklist: {contact.telefone}")
+                        self.skipped_count += 1
+                        if journal:
+                            journal.outcome(contact.telefone, "skipped", detail="blocklist")
+                    else:
+                        yield contact
+            
+            contacts = allowed(contacts)
+            total = None
+        print(f"\n📤 Iniciando envio para {total if total is not None else 'todos os'} contatos...")
         print(f"   Delay entre mensagens: {delay_seconds}s")
         print(f"   Verificar WhatsApp: {'Sim' if verify_whatsapp else 'Não'}")
+        if media:
+            # Codifica uma vez antes do primeiro envio; todos os contatos reaproveitam
+            with profiler.span("encode_media", "io", media=media):
+                encoded = self.api.media.get(media)
+            print(f"   Mídia: {encoded.file_name} ({encoded.media_type}, {encoded.size / 1024:.0f} KB)")
         print("-" * 50)
         
-        for i, contact in enumerate(contacts, 1):
-            print(f"\n[{i}/{total}] {contact.nome[:40]}...")
+        # Verifica os números em bloco (em segundo plano), à frente do envio
+        if verify_whatsapp:
+            contacts = self.verifier.prefetch_iter(contacts, phone=lambda contact: contact.telefone)
+        
+        # O delay vira a taxa do token bucket: verificação, renderização e
+        # "digitando..." dos próximos contatos acontecem durante a espera
+        scheduler = SendScheduler(self.api, interval_seconds=delay_seconds,
+                                  typing_delay=typing_delay, jitter=jitter, media=media)
+        send_args = dict(
+            phone=lambda contact: contact.telefone,
+            render=compile_template(message_template).render_contact,
+            verify=self.verifier.has_whatsapp if verify_whatsapp else None,
+            before_send=(lambda contact, instance: journal.intent(contact.telefone, instance)) if journal else None,
+        )
+        pool = None
+        if quotas is not None:
+            # Várias instâncias: cada uma envia em paralelo no seu próprio ritmo
+            pool = InstancePool(self.api, self.instances, quota=quotas, used=used)
+            print("   Cota do dia: " + ", ".join(f"{name} {used.get(name, 0)}/{quotas[name]}"
+                                               for name in self.instances))
+            pool.start_probing()
+            results = scheduler.run_pool(pool, contacts, **send_args)
+        else:
+            results = ((contact, self.instance_name, status, result)
+                       for contact, status, result in scheduler.run(self.instance_name, contacts, **send_args))
+        
+        processed = 0
+        try:
+            for processed, (contact, instance, status, result) in enumerate(results, 1):
+                print(f"\n[{processed}/{total if total is not None else '?'}] {contact.nome[:40]}...")
+                metrics.MESSAGES.inc(instance=instance or '', status=status)
+                if journal:
+                    detail = result.get("message", "") if status in ("failed", "deferred") and result else ""
+                    with profiler.span("journal", "io", contact=contact.telefone):
+                        journal.outcome(contact.telefone, journal_status(status, result), instance, detail)
             
-            # Verifica se tem WhatsApp
-            if verify_whatsapp:
-                if not self.api.has_whatsapp(self.instance_name, contact.telefone):
+                if status == "deferred":
+                    reason = str(result.get("message", ""))[:50] if result else "nenhuma instância disponível"
+                    print(f"   ⏸️  Adiado ({reason}): {contact.telefone}")
+                    self.skipped_count += 1
+                elif status == "skipped":
                     print(f"   ⚠️  Sem WhatsApp: {contact.telefone}")
                     self.skipped_count += 1
-                    continue
-            
-            # Formata e envia mensagem (com indicador de "digitando...")
-            message = self.format_message(message_template, contact)
-            result = self.api.send_text_with_typing(self.instance_name, contact.telefone, message, typing_delay=5.0)
-            
-            if result.get("error"):
-                print(f"   ❌ Erro: {result.get('message', 'Desconhecido')[:50]}")
-                self.failed_count += 1
-            else:
-                print(f"   ✓ Enviado para {contact.telefone}")
-                self.sent_count += 1
-            
-            # Delay para evitar bloqueio
-            if i < total:
-                time.sleep(delay_seconds)
+                elif status == "failed":
+                    print(f"   ❌ Erro: {str(result.get('message', 'Desconhecido'))[:50]}")
+                    self.failed_count += 1
+                else:
+                    print(f"   ✓ Enviado para {contact.telefone}" + (f" via {instance}" if pool else ""))
+                    self.sent_count += 1
+        finally:
+            results.close()  # encerra as threads de envio se o laço parou no meio
+            if pool:
+                pool.stop()
         
         # Resumo
         print("\n" + "=" * 50)
@@ -310,13 +341,16 @@ class WhatsAppSender:
         print(f"   ✓ Enviados:  {self.sent_count}")
         print(f"   ❌ Erros:     {self.failed_count}")
         print(f"   ⚠️  Pulados:   {self.skipped_count}")
-        print(f"   📋 Total:     {total}")
+        print(f"   📋 Total:     {processed}")
+        if resumed:
+            print(f"   ⏭️  Já feitos:  {resumed} (retomada)")
         
         return {
             "sent": self.sent_count,
             "failed": self.failed_count,
             "skipped": self.skipped_count,
-            "total": total
+            "total": processed,
+            "resumed": resumed
         }
 
 
@@ -329,6 +363,10 @@ def main():
 ╠═══════════════════════════════════════════════════════════════╣
 ║  Uso:                                                         ║
 ║    python3 whatsapp_sender.py <arquivo.xlsx> [mensagem]       ║
+║      -y        Pula a confirmação                             ║
+║      --resume  Continua um lote interrompido (sem reenviar)   ║
+║      --media=arquivo  Envia a imagem/PDF com a mensagem       ║
+║      --profile[=trace.json]  Mede cada etapa (trace + resumo) ║
 ║                                                               ║
 ║  Exemplos:                                                    ║
 ║    python3 whatsapp_sender.py contatos.xlsx                   ║
@@ -350,10 +388,18 @@ def main():
         sys.exit(1)
     
     xlsx_file = sys.argv[1]
+    flags = {"-y", "--yes", "--resume"}
+    message_args = [arg for arg in sys.argv[2:]
+                    if arg not in flags and not arg.startswith(("--media=", "--profile"))]
+    resume = "--resume" in sys.argv
+    media = next((arg.split('=', 1)[1] for arg in sys.argv[2:] if arg.startswith("--media=")), None)
+    if media and not os.path.isfile(media):
+        print(f"❌ Arquivo de mídia não encontrado: {media}")
+        sys.exit(1)
     
     # Mensagem padrão ou customizada
-    if len(sys.argv) > 2:
-        message_template = ' '.join(sys.argv[2:])
+    if message_args:
+        message_template = ' '.join(message_args)
     else:
         message_template = """Olá! Tudo bem?
 
@@ -369,31 +415,47 @@ Gostaria de saber mais? Responda esta mensagem!
 
 _Mensagem enviada via sistema automatizado_"""
     
-    sender = WhatsAppSender()
+    # Perfil da execução (--profile): trace do Chrome/Perfetto + resumo na saída,
+    # mesmo se o envio for interrompido
+    profile_path = profiler.path_from_argv(sys.argv[2:])
+    if profile_path:
+        import atexit
+        profiler.enable(profile_path)
+        atexit.register(profiler.finish)
+    
+    # Instâncias que enviam: WHATSAPP_INSTANCES=inst1,inst2 (padrão: business_sender)
+    instances = instances_from_env()
+    sender = WhatsAppSender(instance_name=instances[0], instances=instances, blocklist=SuppressionIndex())
     
     # Configura e conecta
-    if not sender.setup():
+    with profiler.span("setup"):
+        ready = sender.setup()
+    if not ready:
         print("\n❌ Falha ao configurar. Verifique se o Docker está rodando.")
         print("   Execute: docker-compose up -d")
         sys.exit(1)
     
-    # Carrega contatos
-    print(f"\n📂 Carregando contatos de: {xlsx_file}")
-    contacts = sender.load_contacts_from_xlsx(xlsx_file)
+    # Lê contatos em streaming (o envio começa sem carregar a planilha inteira)
+    print(f"\n📂 Lendo contatos de: {xlsx_file}")
+    contacts = sender.iter_contacts_from_xlsx(xlsx_file)
+    sample_contact = next(contacts, None)
     
-    if not contacts:
+    if sample_contact is None:
         print("❌ Nenhum contato válido encontrado no arquivo.")
         sys.exit(1)
     
-    print(f"   ✓ {len(contacts)} contatos com telefone válido")
+    contacts = chain([sample_contact], contacts)
     
     # Confirmação
     print(f"\n📝 Mensagem que será enviada:")
     print("-" * 40)
-    sample_contact = contacts[0]
     print(sender.format_message(message_template, sample_contact))
     print("-" * 40)
     
+    unknown = compile_template(message_template).unknown
+    if unknown:
+        print(f"⚠️  Variáveis desconhecidas (ficam como estão): {', '.join('{' + name + '}' for name in unknown)}")
+    
     # Verifica flag -y para pular confirmação
     skip_confirm = "-y" in sys.argv or "--yes" in sys.argv
     
@@ -405,8 +467,25 @@ _Mensagem enviada via sistema automatizado_"""
     else:
         print("\n⚡ Confirmação pulada (-y). Iniciando envio...")
     
+    # Métricas (METRICS_PORT / METRICS_JSONL), se configuradas
+    metrics.start_from_env()
+    
+    # Journal ao lado da planilha: cada envio é registrado antes e depois da chamada
+    try:
+        journal = SendJournal(journal_path(xlsx_file), resume=resume)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if resume and journal.state:
+        print(f"🔁 Retomando lote: {len(journal.state)} contato(s) já registrados no journal")
+    
     # Envia mensagens
-    sender.send_messages(contacts, message_template, delay_seconds=60.0, verify_whatsapp=True)
+    try:
+        sender.send_messages(contacts, message_template, delay_seconds=60.0, verify_whatsapp=True,
+                             journal=journal, media=media)
+    finally:
+        journal.close()
+        sender.close()
 
 
 if __name__ == "__main__":